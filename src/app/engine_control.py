@@ -0,0 +1,170 @@
+# engine_control.py
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.config import ENGINE_SOCKET_PATH, ENGINE_CONTROL_TIMEOUT
+
+# Commands of the funding rate engine, each one returns a JSON object
+EngineHandlers = Dict[str, Callable[[], Awaitable[dict]]]
+
+
+class EngineUnavailable(Exception):
+    """The engine process can't be reached (not running, socket missing or no reply in time)."""
+
+
+class EngineControl:
+    """Control of an engine living in this process, same interface as EngineControlClient."""
+
+    def __init__(self, handlers: EngineHandlers):
+        self.handlers = handlers
+
+    async def call(self, command: str) -> dict:
+        handler = self.handlers.get(command)
+        if handler is None:
+            raise ValueError(f"Unknown engine command '{command}'")
+        return await handler()
+
+
+class EngineControlServer:
+    """
+    Unix socket server of the engine process. The protocol is JSON lines: every request is
+    {"id": ..., "command": ...} and gets one reply {"id": ..., "ok": true, "result": {...}} or
+    {"id": ..., "ok": false, "error": "..."}. A connection can send any number of requests.
+    """
+
+    def __init__(self, control: EngineControl, path: str = ENGINE_SOCKET_PATH):
+        self.control = control
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.stats = {
+            "connections": 0,
+            "requests": 0,
+            "errors": 0
+        }
+
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Socket left behind by a killed engine
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        # Only the user running the engine (and the API) can control it
+        os.chmod(self.path, 0o600)
+        print(f"Engine control listening on {self.path}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        try:
+            while line := await reader.readline():
+                self.stats["requests"] += 1
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    reply = {"id": request_id, "ok": True, "result": await self.control.call(request["command"])}
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    reply = {"id": request_id, "ok": False, "error": str(e)}
+
+                # default=str: datetimes and the like in the metrics
+                writer.write(json.dumps(reply, default=str).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class EngineControlClient:
+    """
+    API side of the control channel. One connection is kept open and reused, requests go one at a
+    time; the connection is reopened once when the engine was restarted in between.
+    """
+
+    def __init__(self, path: str = ENGINE_SOCKET_PATH, timeout: float = ENGINE_CONTROL_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._next_id = 0
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            writer, self._reader, self._writer = self._writer, None, None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _request(self, command: str) -> Any:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+
+        self._next_id += 1
+        self._writer.write(json.dumps({"id": self._next_id, "command": command}).encode() + b"\n")
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionResetError("Engine closed the control connection")
+        return json.loads(line)
+
+    async def call(self, command: str) -> dict:
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    reply = await asyncio.wait_for(self._request(command), self.timeout)
+                    break
+                except (OSError, asyncio.TimeoutError) as e:
+                    await self.close()
+                    if attempt or isinstance(e, asyncio.TimeoutError):
+                        raise EngineUnavailable(f"Funding rate engine unavailable on {self.path}: {e!r}") from e
+
+        if not reply["ok"]:
+            raise ValueError(reply["error"])
+        return reply["result"]
+
+
+async def _benchmark(calls: int = 2000) -> dict:
+    """Round trip of a status command over the socket, against a local call."""
+    import tempfile
+
+    async def status():
+        return {"status": "running"}
+
+    control = EngineControl({"status": status})
+    path = os.path.join(tempfile.mkdtemp(), "engine.sock")
+    server = EngineControlServer(control, path)
+    await server.start()
+    client = EngineControlClient(path)
+
+    results = {}
+    for name, target in (("local", control), ("socket", client)):
+        latencies = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            await target.call("status")
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        results[name] = {"p50_ms": round(latencies[len(latencies) // 2], 4), "p99_ms": round(latencies[int(len(latencies) * 0.99)], 4)}
+
+    await client.close()
+    await server.close()
+    return results
+
+
+if __name__ == "__main__":
+    print(asyncio.run(_benchmark()))
@@ -0,0 +1,46 @@
+# analysis_executor.py
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal, Optional
+
+from src.config import ANALYSIS_EXECUTOR_MODE, ANALYSIS_EXECUTOR_WORKERS
+
+
+class AnalysisExecutor:
+    """
+    Runs CPU bound chart analyses away from the event loop.
+
+    Submitted functions must be module level (picklable) and take/return plain data
+    (dicts, lists, numpy arrays), so the loop only does I/O and order timing while
+    several symbols are analysed in parallel across cores.
+    """
+
+    def __init__(self, mode: Literal['process', 'thread'] = ANALYSIS_EXECUTOR_MODE, max_workers: int = ANALYSIS_EXECUTOR_WORKERS):
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"Unsupported analysis executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> Executor:
+        """Create the pool, call it at startup so the first analysis doesn't pay the spawn cost."""
+        if self._executor is None:
+            if self.mode == 'process':
+                # 'spawn' keeps the workers clear of the parent's threads, sockets and event loop
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chart-analysis")
+        return self._executor
+
+    async def submit(self, function: Callable[..., Any], *args) -> Any:
+        """Run function(*args) in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.start(), function, *args)
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
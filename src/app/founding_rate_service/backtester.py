@@ -0,0 +1,275 @@
+# backtester.py
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.app.utils import latency_summary
+from src.app.founding_rate_service.candle_store import CANDLE_DTYPE, CandleStore
+from src.app.founding_rate_service.funding_rate_archive import FundingRateArchive
+from src.app.founding_rate_service.chart_analysis import FundingEventIndex, analyze_symbol, past_funding_rates_signal, two_days_signal
+from src.app.founding_rate_service.order_windows import analysis_for, decision_orders, order_window, pre_analysis_orders
+from src.app.founding_rate_service.strategy_params import DEFAULT_PARAMS, StrategyParams
+from src.config import AMOUNT_ORDER, CANDLE_STORE_DIR, FUNDING_ARCHIVE_DIR, LEVERAGE
+
+MINUTE_MS = 60 * 1000
+
+# As in the live service: analysis 5 minutes before the funding time over 16h of 1 minute
+# candles (2 funding periods), the 2 days check over 42h of 15 minute candles, and the 20
+# funding events returned by the funding history endpoint
+ANALYSIS_LEAD_MS = 5 * MINUTE_MS
+ANALYSIS_WINDOW_MS = 2 * 8 * 60 * MINUTE_MS
+TWO_DAYS_WINDOW_MS = 42 * 60 * MINUTE_MS
+FUNDING_HISTORY_ROWS = 20
+
+TRADE_DTYPE = np.dtype([
+    ('symbol', 'U24'),
+    ('funding_time', '<i8'),
+    ('funding_rate', '<f4'),
+    ('side', 'U5'),
+    ('type', 'U16'),
+    ('open_time', '<i8'),
+    ('close_time', '<i8'),
+    ('entry_price', '<f8'),
+    ('exit_price', '<f8'),
+    ('price_return', '<f8'),     # % of notional
+    ('funding_payment', '<f8'),  # % of notional, positive when received
+    ('pnl', '<f8')               # % of notional, after fees
+])
+
+
+def window_columns(candles: np.ndarray, start_time: int, end_time: int) -> dict:
+    """Candle columns of [start_time, end_time) as views, the format taken by the analysis functions."""
+    low, high = np.searchsorted(candles['timestamp'], [start_time, end_time], side='left')
+    window = candles[low:high]
+    return {name: window[name] for name in ('timestamp', 'open', 'high', 'low', 'close')}
+
+
+def resample_columns(columns: dict, period_ms: int) -> dict:
+    """Aggregate 1 minute candle columns into `period_ms` candles aligned to the period boundaries."""
+    if columns['timestamp'].size == 0:
+        return columns
+
+    buckets = columns['timestamp'] // period_ms
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [buckets.size]])
+    return {
+        'timestamp': buckets[starts] * period_ms,
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends - 1]
+    }
+
+
+def prices_at(candles: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+    Prices at arbitrary epoch ms times, linearly interpolated between the open and close of the
+    1 minute candle containing each time. NaN where there is no candle.
+    """
+    timestamps = candles['timestamp']
+    index = np.searchsorted(timestamps, times, side='right') - 1
+    valid = index >= 0
+    safe_index = np.where(valid, index, 0)
+    elapsed = times - timestamps[safe_index]
+    valid &= (elapsed >= 0) & (elapsed < MINUTE_MS)
+
+    open_price = candles['open'][safe_index]
+    close_price = candles['close'][safe_index]
+    prices = open_price + (close_price - open_price) * (elapsed / MINUTE_MS)
+    return np.where(valid, prices, np.nan)
+
+
+def decide(candles: np.ndarray, funding_times: np.ndarray, crypto: dict, analysis_time: int, params: StrategyParams = DEFAULT_PARAMS,
+           events: Optional[FundingEventIndex] = None) -> dict:
+    """Replay FundingRateChart.run_analysis for one candidate at `analysis_time`, `events` indexes every funding event of the symbol."""
+    columns = window_columns(candles, analysis_time - ANALYSIS_WINDOW_MS, analysis_time)
+    if columns['timestamp'].size == 0:
+        return {"result": False, "side": None}
+
+    # Newest first, as returned by the funding history endpoint
+    past = funding_times[:np.searchsorted(funding_times, analysis_time, side='left')]
+    funding_times_ms = past[::-1][:FUNDING_HISTORY_ROWS].tolist()
+
+    if analysis_for(crypto, params) == 'past_funding_rates':
+        return past_funding_rates_signal(columns, funding_times_ms, events)
+
+    decision = analyze_symbol(columns, funding_times_ms, params, events)
+    if not decision.get("needs_2d"):
+        return decision
+
+    two_days = resample_columns(window_columns(candles, analysis_time - TWO_DAYS_WINDOW_MS, analysis_time), 15 * MINUTE_MS)
+    return two_days_signal(two_days, params)
+
+
+def backtest_symbol(symbol: str, candles: np.ndarray, funding_times: np.ndarray, funding_rates: np.ndarray,
+                    params: StrategyParams = DEFAULT_PARAMS, latency_ms: float = 50.0, fee_rate: float = 0.06,
+                    start_time: Optional[int] = None, end_time: Optional[int] = None) -> Tuple[np.ndarray, List[float]]:
+    """
+    Replay every funding event of a symbol through the live decision rules and price the orders.
+    Returns the trades (TRADE_DTYPE) and the decision compute latencies in milliseconds.
+    """
+    low = np.searchsorted(funding_times, start_time, side='left') if start_time is not None else 0
+    high = np.searchsorted(funding_times, end_time, side='right') if end_time is not None else len(funding_times)
+
+    # Long candidates, as picked by the screener
+    candidates = low + np.flatnonzero(funding_rates[low:high] <= params.min_funding_rate)
+
+    # The event windows are shared by the analyses of the following events
+    events = FundingEventIndex(candles, funding_times)
+    orders = []
+    decision_latencies = []
+    for event in candidates.tolist():
+        funding_time = int(funding_times[event])
+        crypto = {"symbol": symbol, "fundingRate": float(funding_rates[event])}
+
+        started = time.perf_counter()
+        decision = decide(candles, funding_times, crypto, funding_time - ANALYSIS_LEAD_MS, params, events)
+        decision_latencies.append((time.perf_counter() - started) * 1000)
+
+        for side, type in pre_analysis_orders(crypto, params) + decision_orders(crypto, decision, params):
+            open_offset, close_offset = order_window(side, type)
+            orders.append((funding_time, crypto["fundingRate"], side, type, open_offset * 1000, close_offset * 1000))
+
+    trades = np.zeros(len(orders), dtype=TRADE_DTYPE)
+    if not orders:
+        return trades, decision_latencies
+
+    funding_time, funding_rate, side, type, open_offset, close_offset = (np.array(column) for column in zip(*orders))
+    trades['symbol'] = symbol
+    trades['funding_time'] = funding_time
+    trades['funding_rate'] = funding_rate
+    trades['side'] = side
+    trades['type'] = type
+    # Orders are filled `latency_ms` after being sent at the scheduled time
+    trades['open_time'] = funding_time + open_offset + int(latency_ms)
+    trades['close_time'] = funding_time + close_offset + int(latency_ms)
+
+    # Vectorized over every order of the symbol
+    trades['entry_price'] = prices_at(candles, trades['open_time'])
+    trades['exit_price'] = prices_at(candles, trades['close_time'])
+    sign = np.where(side == 'long', 1.0, -1.0)
+    trades['price_return'] = sign * (trades['exit_price'] - trades['entry_price']) / trades['entry_price'] * 100
+
+    # Positions held at the funding time pay or receive it (longs receive negative rates)
+    held = (trades['open_time'] < funding_time) & (trades['close_time'] >= funding_time)
+    trades['funding_payment'] = np.where(held, -sign * funding_rate, 0.0)
+    trades['pnl'] = trades['price_return'] + trades['funding_payment'] - 2 * fee_rate
+
+    return trades[~np.isnan(trades['pnl'])], decision_latencies
+
+
+def _backtest_stored_symbol(symbol: str, candle_store_dir: str, archive_dir: str, settings: dict) -> Tuple[np.ndarray, List[float], int]:
+    """Worker job: load (memory map) the symbol's data and backtest it."""
+    candles = CandleStore(candle_store_dir).load(symbol, '1m')
+    funding_times, funding_rates = FundingRateArchive(archive_dir).load(symbol)
+    trades, latencies = backtest_symbol(symbol, candles, np.asarray(funding_times), np.asarray(funding_rates), **settings)
+    return trades, latencies, len(funding_times)
+
+
+def summarize(trades: np.ndarray, decision_latencies: List[float], latency_ms: float) -> dict:
+    pnl = trades['pnl']
+    leverage = float(LEVERAGE)
+
+    by_order = {}
+    for side, type in sorted(set(zip(trades['side'].tolist(), trades['type'].tolist()))):
+        group = pnl[(trades['side'] == side) & (trades['type'] == type)]
+        by_order[f"{side}:{type}"] = {
+            "trades": int(group.size),
+            "win_rate": round(float((group > 0).mean()), 4),
+            "mean_pnl_pct": round(float(group.mean()), 4),
+            "total_pnl_pct": round(float(group.sum()), 4)
+        }
+
+    return {
+        "trades": int(pnl.size),
+        "symbols": int(np.unique(trades['symbol']).size) if pnl.size else 0,
+        "win_rate": round(float((pnl > 0).mean()), 4) if pnl.size else None,
+        "mean_pnl_pct": round(float(pnl.mean()), 4) if pnl.size else None,
+        "total_pnl_pct": round(float(pnl.sum()), 4),
+        # AMOUNT_ORDER is the margin of every order, the notional is margin * leverage
+        "total_pnl_usdt": round(float(pnl.sum()) / 100 * AMOUNT_ORDER * leverage, 2),
+        "funding_received_pct": round(float(trades['funding_payment'].sum()), 4),
+        "by_order": by_order,
+        "order_latency_ms": latency_ms,
+        "decision_latency": latency_summary(decision_latencies)
+    }
+
+
+def run_backtest(symbols: Optional[Iterable[str]] = None, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                 candle_store_dir: str = CANDLE_STORE_DIR, archive_dir: str = FUNDING_ARCHIVE_DIR, workers: int = 1,
+                 params: StrategyParams = DEFAULT_PARAMS, latency_ms: float = 50.0, fee_rate: float = 0.06) -> dict:
+    """
+    Backtest the stored symbols (1 minute candles of the CandleStore and the FundingRateArchive
+    events). Symbols are spread over `workers` processes, each one memory maps its own files.
+    """
+    started = time.perf_counter()
+    symbols = list(symbols) if symbols is not None else FundingRateArchive(archive_dir).symbols()
+    settings = {"params": params, "latency_ms": latency_ms, "fee_rate": fee_rate, "start_time": start_time, "end_time": end_time}
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(
+                _backtest_stored_symbol, symbols, [candle_store_dir] * len(symbols), [archive_dir] * len(symbols), [settings] * len(symbols)
+            ))
+    else:
+        results = [_backtest_stored_symbol(symbol, candle_store_dir, archive_dir, settings) for symbol in symbols]
+
+    trades = np.concatenate([result[0] for result in results]) if results else np.zeros(0, dtype=TRADE_DTYPE)
+    decision_latencies = [latency for result in results for latency in result[1]]
+
+    summary = summarize(trades, decision_latencies, latency_ms)
+    summary["funding_events"] = int(sum(result[2] for result in results))
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return {"summary": summary, "trades": trades}
+
+
+def synthetic_dataset(base_dir: str, symbols: int = 20, days: int = 30, seed: int = 0) -> Tuple[str, str]:
+    """Random-walk 1 minute candles and 8h funding events, written where run_backtest reads them."""
+    rng = np.random.default_rng(seed)
+    candle_dir, archive_dir = os.path.join(base_dir, 'candles'), os.path.join(base_dir, 'funding_rates')
+    store, archive = CandleStore(candle_dir), FundingRateArchive(archive_dir)
+
+    start = 1_700_006_400_000  # A funding time (00:00 UTC)
+    minutes = days * 24 * 60
+    for i in range(symbols):
+        candles = np.zeros(minutes, dtype=CANDLE_DTYPE)
+        candles['timestamp'] = start + np.arange(minutes, dtype=np.int64) * MINUTE_MS
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.002, minutes)))
+        candles['open'] = np.concatenate([[close[0]], close[:-1]])
+        candles['close'] = close
+        spread = np.abs(rng.normal(0, 0.001, minutes)) * close
+        candles['high'] = np.maximum(candles['open'], close) + spread
+        candles['low'] = np.minimum(candles['open'], close) - spread
+        candles['volume'] = rng.lognormal(5, 1, minutes)
+        store.save(f"SYM{i}USDT", '1m', candles)
+
+        funding_times = start + np.arange(1, days * 3, dtype=np.int64) * 8 * 60 * MINUTE_MS
+        funding_rates = rng.normal(-0.1, 0.5, funding_times.size).astype(np.float32)
+        archive.save(f"SYM{i}USDT", (funding_times, funding_rates))
+
+    return candle_dir, archive_dir
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Backtest the funding rate decision rules")
+    parser.add_argument("--synthetic", nargs=2, type=int, metavar=("SYMBOLS", "DAYS"), help="Run over a generated dataset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            candle_dir, archive_dir = synthetic_dataset(tmp_dir, *args.synthetic)
+            result = run_backtest(candle_store_dir=candle_dir, archive_dir=archive_dir, workers=args.workers, latency_ms=args.latency_ms)
+    else:
+        result = run_backtest(workers=args.workers, latency_ms=args.latency_ms)
+
+    print(result["summary"])
@@ -1,11 +1,11 @@
-from fastapi.encoders import jsonable_encoder
 from fastapi import HTTPException
-from typing import Optional, Literal
+from typing import Optional, Literal, Tuple
+from dataclasses import dataclass, field
+from collections import deque
 from datetime import datetime, timedelta
 from datetime import timezone as dttimezone
 from zoneinfo import ZoneInfo
 import pandas as pd
-from pytz import timezone
 import asyncio
 import aiohttp
 import hmac
@@ -15,7 +15,28 @@ import time
 import numpy as np
 import pytz
 
-from src.config import BITGET_APIKEY, BITGET_PASSPHRASE, BITGET_SECRET_KEY, LEVERAGE, COINMARKETCAP_APIKEY
+from src.app.utils import latency_summary
+from src.app.founding_rate_service.candle_store import CANDLE_DTYPE, CandleStore, candles_to_rows
+from src.app.founding_rate_service.candle_decoder import decode_candles
+from src.app.founding_rate_service.single_flight import SingleFlight
+from src.app.founding_rate_service.market_cap_cache import MarketCapCache
+from src.app.founding_rate_service.funding_rate_archive import FundingRateArchive
+from src.app.founding_rate_service.rate_limiter import BitgetRateLimiter, PRIORITY_CRITICAL, PRIORITY_NORMAL, PRIORITY_BULK
+from src.config import (
+    BITGET_APIKEY,
+    BITGET_PASSPHRASE,
+    BITGET_SECRET_KEY,
+    LEVERAGE,
+    COINMARKETCAP_APIKEY,
+    BITGET_POOL_LIMIT,
+    BITGET_POOL_LIMIT_PER_HOST,
+    BITGET_KEEPALIVE_TIMEOUT,
+    BITGET_DNS_CACHE_TTL,
+    CANDLE_PAGE_CONCURRENCY,
+    CANDLE_PAGE_RETRIES,
+    CANDLES_CACHE_TTL,
+    FUNDING_HISTORY_CACHE_TTL
+)
 
 # Define all possible granularity values
 Granularity = Literal[
@@ -27,16 +48,115 @@ Granularity = Literal[
     '6Hutc', '12Hutc', '1Dutc', '3Dutc', '1Wutc', '1Mutc' 
 ]
 
+# Granularity names used across the analysis code mapped to the ones of the v2 mix candles API
+GRANULARITY_ALIASES = {
+    '1min': '1m', '5min': '5m', '15min': '15m', '30min': '30m',
+    '1h': '1H', '4h': '4H', '12h': '12H',
+    '1day': '1D', '1week': '1W'
+}
+
+
+@dataclass
+class PreparedOrder:
+    """An order request serialized ahead of time, ready to be sent at the deadline."""
+    action: Literal['open', 'close']
+    symbol: str
+    url: str
+    headers: dict
+    body: bytes
+    prepared_at: float = field(default_factory=time.perf_counter)
 
 
 class BitgetClient:
-    def __init__(self):
+    def __init__(self, candle_store: Optional[CandleStore] = None, rate_limiter: Optional[BitgetRateLimiter] = None, funding_archive: Optional[FundingRateArchive] = None):
         self.apikey = BITGET_APIKEY
         self.api_secret_key = BITGET_SECRET_KEY
         self.passphrase = BITGET_PASSPHRASE
         self.api_url = "https://api.bitget.com"
+        self.order_executor_url = "http://3.141.197.183:8000"
         self._api_timezone = pytz.utc
 
+        # Measured send-to-ack latency of every order
+        self.order_latencies = deque(maxlen=500)
+        # Fencing token of the leader lease, sent with every order when leader election is on
+        self.fencing_token: Optional[int] = None
+
+        # When set, candle ranges are served from the local store and only the missing parts are downloaded
+        self.candle_store = candle_store
+
+        # When set, the funding rate history is read from the local archive, synced once per funding hour
+        self.funding_archive = funding_archive
+
+        # Every outgoing request takes a token of its endpoint family, orders and tickers go first
+        self.rate_limiter = rate_limiter or BitgetRateLimiter()
+
+        # Identical concurrent fetches (candles, funding history) share one request
+        self.single_flight = SingleFlight()
+
+        # Market caps are served from memory and refreshed in one batched call in the background
+        self.market_cap_cache = MarketCapCache(self.get_market_caps)
+
+        # Shared connection pool, opened in the app lifespan (or lazily on first use)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pool_stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0
+        }
+
+    async def open(self) -> aiohttp.ClientSession:
+        """Create the long-lived session with keep-alive, DNS cache and per-host limits."""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        connector = aiohttp.TCPConnector(
+            limit=BITGET_POOL_LIMIT,
+            limit_per_host=BITGET_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=BITGET_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=BITGET_DNS_CACHE_TTL,
+            use_dns_cache=True
+        )
+        self._session = aiohttp.ClientSession(connector=connector, trace_configs=[self._build_trace_config()])
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared session and release every pooled connection."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            return await self.open()
+        return self._session
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name: str):
+            async def increment(session, trace_config_ctx, params):
+                self._pool_stats[name] += 1
+            return increment
+
+        trace_config.on_request_start.append(counter("requests"))
+        trace_config.on_connection_create_end.append(counter("connections_created"))
+        trace_config.on_connection_reuseconn.append(counter("connections_reused"))
+        trace_config.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace_config
+
+    def pool_stats(self) -> dict:
+        """Connection pool counters, reuse_rate is the share of connections served from the pool."""
+        stats = dict(self._pool_stats)
+        acquired = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_rate"] = round(stats["connections_reused"] / acquired, 4) if acquired else 0.0
+        stats["session_open"] = self._session is not None and not self._session.closed
+        stats["limit"] = BITGET_POOL_LIMIT
+        stats["limit_per_host"] = BITGET_POOL_LIMIT_PER_HOST
+        return stats
+
 
     def get_timestamp(self) -> str:
         # Generate timestamp in milliseconds
@@ -80,100 +200,149 @@ class BitgetClient:
         url = f"{self.api_url}{request_path}?{query_string}"
         headers = self.get_headers(method, request_path, query_string, "")
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                data = await response.json()
-                return data
+        session = await self.get_session()
+        await self.rate_limiter.acquire('market', PRIORITY_CRITICAL)
+        async with session.get(url, headers=headers) as response:
+            data = await response.json()
+            return data
 
     def fetch_future_cryptos(self, dict_data: dict):
         data = dict_data["data"]
         sorted_data = [{"symbol": d["symbol"], "fundingRate": float(d["fundingRate"]) * 100} for d in sorted(data, key=lambda x: float(x["fundingRate"]))]
         return sorted_data
 
-    async def open_order(self, symbol: str, amount: str, mode: Literal['short', 'long'] = 'Buy', price: Optional[str] = None):
-        print(f"Opening order: {symbol}")
-        url = "http://3.141.197.183:8000/open_order_futures_normal"
+    def _order_headers(self) -> dict:
         headers = {
             "password": "mierda69",
             "Content-Type": "application/json"  
         }
+        if self.fencing_token is not None:
+            headers["X-Fencing-Token"] = str(self.fencing_token)
+        return headers
+
+    def prepare_open_order(self, symbol: str, amount: str, mode: Literal['short', 'long'] = 'Buy') -> PreparedOrder:
+        """Build and serialize an open order so that only the send is left at the deadline."""
         data = {
             "symbol": symbol,
             "mode": mode,
             "amount_usdt": amount,  
             "leverage": LEVERAGE
         }
+        return PreparedOrder(
+            action='open',
+            symbol=symbol,
+            url=f"{self.order_executor_url}/open_order_futures_normal",
+            headers=self._order_headers(),
+            body=json.dumps(data).encode()
+        )
+
+    def prepare_close_order(self, symbol: str) -> PreparedOrder:
+        """Build and serialize a close order so that only the send is left at the deadline."""
+        data = {
+            "price": 0
+        }
+        return PreparedOrder(
+            action='close',
+            symbol=symbol,
+            url=f"{self.order_executor_url}/close_order/{symbol}",
+            headers=self._order_headers(),
+            body=json.dumps(data).encode()
+        )
+
+    async def warm_up(self, prepared: PreparedOrder) -> bool:
+        """Open (or refresh) a pooled keep-alive connection to the order executor before the deadline."""
+        session = await self.get_session()
+        try:
+            await self.rate_limiter.acquire('order', PRIORITY_CRITICAL)
+            async with session.get(self.order_executor_url, timeout=aiohttp.ClientTimeout(total=3)) as response:
+                await response.read()
+                return response.status < 500
+        except Exception as e:
+            print(f"Could not pre-open the connection for {prepared.symbol}: {e}")
+            return False
+
+    async def send_prepared_order(self, prepared: PreparedOrder):
+        """Send a pre-built order and record its send-to-ack latency."""
+        session = await self.get_session()
+        await self.rate_limiter.acquire('order', PRIORITY_CRITICAL)
+        sent_at = time.perf_counter()
+        async with session.post(prepared.url, headers=prepared.headers, data=prepared.body) as response:
+            latency_ms = (time.perf_counter() - sent_at) * 1000
+            self.order_latencies.append({
+                "symbol": prepared.symbol,
+                "action": prepared.action,
+                "latency_ms": round(latency_ms, 3),
+                "status": response.status,
+                "sent_at": time.time()
+            })
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                content_type = response.headers.get('Content-Type')
-                if content_type and 'application/json' in content_type:
-                    data = await response.json()
-                else:
-                    data = await response.text()  
-                return data
+            content_type = response.headers.get('Content-Type')
+            if content_type and 'application/json' in content_type:
+                data = await response.json()
+            else:
+                data = await response.text()
+                if prepared.action == 'close' and data == 'Internal Server Error':
+                    raise HTTPException(status_code=400, detail=f"Internal server error while closing the operation: {data}")
+            if response.status >= 400:
+                raise HTTPException(status_code=response.status, detail=f"Order executor rejected the {prepared.action} of {prepared.symbol}: {data}")
+            return data
+
+    def order_latency_stats(self) -> dict:
+        """Send-to-ack latency summary per order action."""
+        return {
+            action: latency_summary(o["latency_ms"] for o in self.order_latencies if o["action"] == action)
+            for action in ('open', 'close')
+        }
 
+    async def open_order(self, symbol: str, amount: str, mode: Literal['short', 'long'] = 'Buy', price: Optional[str] = None):
+        print(f"Opening order: {symbol}")
+        prepared = self.prepare_open_order(symbol, amount, mode)
+        return await self.send_prepared_order(prepared)
 
     async def close_order(self, symbol):
         print(f"Closing order: {symbol}")
-        url = f"http://3.141.197.183:8000/close_order/{symbol}"
-        headers = {
-            "password": "mierda69",
-            "Content-Type": "application/json"  
-        }
-        data = {
-            "price": 0
-        }
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                content_type = response.headers.get('Content-Type')
-                if content_type and 'application/json' in content_type:
-                    data = await response.json()
-                else:
-                    data = await response.text()
-                    if data == 'Internal Server Error':
-                        raise HTTPException(status_code=400, detail=f"Internal server error while closing the operation: {data}")
-                return data
+        prepared = self.prepare_close_order(symbol)
+        return await self.send_prepared_order(prepared)
 
     async def get_pnl_order(self, symbol):
         print("Trying to get the last order values")
-        url = f"http://3.141.197.183:8000/get_historical_possition/{symbol}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                content_type = response.headers.get('Content-Type')
-                if content_type and 'application/json' in content_type:
-                    data = await response.json()
-                else:
-                    data = await response.text()
-                    if data == 'Internal Server Error':
-                        raise HTTPException(status_code=400, detail=f"Internal server error while closing the operation: {data}")
-                result =  data["data"]["list"][0]
+        url = f"{self.order_executor_url}/get_historical_possition/{symbol}"
+        session = await self.get_session()
+        await self.rate_limiter.acquire('order', PRIORITY_NORMAL)
+        async with session.get(url) as response:
+            content_type = response.headers.get('Content-Type')
+            if content_type and 'application/json' in content_type:
+                data = await response.json()
+            else:
+                data = await response.text()
+                if data == 'Internal Server Error':
+                    raise HTTPException(status_code=400, detail=f"Internal server error while closing the operation: {data}")
+            result =  data["data"]["list"][0]
            
-                # Fetch Data
-                last_pnl_order = {
-                    "id": result.get('positionId'),
-                    "symbol": result.get('symbol'),
-                    "operation_datetime": datetime.fromtimestamp(int(result.get('utime', 0)) / 1000, tz=ZoneInfo('UTC')).astimezone(ZoneInfo('Europe/Amsterdam')).isoformat() if result.get('utime') else None,
-                    "pnl": result.get('pnl'),
-                    "avg_entry_price": result.get('openAvgPrice'),
-                    "side": result.get('holdSide'),
-                    "closed_value": result.get('closeAvgPrice'),
-                    "opening_fee": result.get('openFee'),
-                    "closing_fee": result.get('closeFee'),
-                    "net_profits": result.get('netProfit')
-                }
-                
-                return last_pnl_order
+            # Fetch Data
+            last_pnl_order = {
+                "id": result.get('positionId'),
+                "symbol": result.get('symbol'),
+                "operation_datetime": datetime.fromtimestamp(int(result.get('utime', 0)) / 1000, tz=ZoneInfo('UTC')).astimezone(ZoneInfo('Europe/Amsterdam')).isoformat() if result.get('utime') else None,
+                "pnl": result.get('pnl'),
+                "avg_entry_price": result.get('openAvgPrice'),
+                "side": result.get('holdSide'),
+                "closed_value": result.get('closeAvgPrice'),
+                "opening_fee": result.get('openFee'),
+                "closing_fee": result.get('closeFee'),
+                "net_profits": result.get('netProfit')
+            }
+            
+            return last_pnl_order
 
     def calculate_api_calls(self, start_time: int, end_time: int, granularity_ms: int):
         time_diff = end_time - start_time
-        total_candles = time_diff // granularity_ms
+        total_candles = time_diff // granularity_ms + 1  # Both ends of the range are included
         max_candles_per_call = 1000
 
         print(f"Total candles: {total_candles}, time difference: {time_diff}, granularity in ms: {granularity_ms}")
 
-        if total_candles == 0:
+        if total_candles <= 0:
             return []
 
         calls = []
@@ -181,7 +350,7 @@ class BitgetClient:
 
         while total_candles > 0:
             candles_in_this_call = min(total_candles, max_candles_per_call)
-            current_end_time = current_start_time + (candles_in_this_call * granularity_ms)
+            current_end_time = current_start_time + ((candles_in_this_call - 1) * granularity_ms)
 
             calls.append({
                 "start_time": current_start_time,
@@ -196,6 +365,7 @@ class BitgetClient:
         return calls
 
     def convert_granularity_to_ms(self, granularity: str) -> int:
+        granularity = GRANULARITY_ALIASES.get(granularity, granularity)
         if granularity == "1m":
             return 60 * 1000
         elif granularity == "5m":
@@ -220,66 +390,98 @@ class BitgetClient:
             raise ValueError(f"Unsupported granularity: {granularity}")   
 
     async def get_candlestick_chart(self, symbol: str, granularity: str, start_time: int = None, end_time: int = None) -> np.ndarray:
-            final_result = np.empty((0, 7))
-            base_url = 'https://api.bitget.com/api/v2/mix/market/candles'
+        """(N, 7) float64 candle rows [timestamp, open, high, low, close, volume, notional] of the time range."""
+        return candles_to_rows(await self.get_candles(symbol, granularity, start_time, end_time))
+
+    async def get_candles(self, symbol: str, granularity: str, start_time: int, end_time: int) -> np.ndarray:
+        """CANDLE_DTYPE candles of the time range, served from the candle store when the client has one."""
+        granularity = GRANULARITY_ALIASES.get(granularity, granularity)
+        return await self.single_flight.do(
+            ('candles', symbol, granularity, start_time, end_time),
+            lambda: self._get_candles(symbol, granularity, start_time, end_time),
+            ttl=CANDLES_CACHE_TTL
+        )
+
+    async def _get_candles(self, symbol: str, granularity: str, start_time: int, end_time: int) -> np.ndarray:
+        if self.candle_store is None:
+            return await self.download_candles(symbol, granularity, start_time, end_time)
+
+        return await self.candle_store.get_range(
+            symbol, granularity, self.convert_granularity_to_ms(granularity), start_time, end_time, self.download_candles
+        )
+
+    async def download_candles(self, symbol: str, granularity: str, start_time: int, end_time: int) -> np.ndarray:
+        """
+        Download the candles of the time range, all 1000-candle pages are requested concurrently.
+        Raises HTTPException when a page fails, an empty result only means the exchange has no candles.
+        """
+        granularity = GRANULARITY_ALIASES.get(granularity, granularity)
+        base_url = f'{self.api_url}/api/v2/mix/market/candles'
+
+        # Get how many times do I need to call the API
+        granularity_ms = self.convert_granularity_to_ms(granularity)
+        api_calls = self.calculate_api_calls(start_time, end_time, granularity_ms)
+        if not api_calls:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        # Every page writes into its own slice of one preallocated array
+        capacities = [call['candles'] for call in api_calls]
+        offsets = np.concatenate([[0], np.cumsum(capacities)[:-1]])
+        final_result = np.empty(sum(capacities), dtype=CANDLE_DTYPE)
+
+        session = await self.get_session()
+        semaphore = asyncio.Semaphore(CANDLE_PAGE_CONCURRENCY)
+
+        async def fetch_page(i: int, call: dict) -> int:
             params = {
                 'symbol': symbol,
                 'granularity': granularity,
                 'productType': 'USDT-FUTURES',
-                'limit': 1000
+                'limit': 1000,
+                'startTime': str(call['start_time']),
+                'endTime': str(call['end_time'])
             }
 
-            # Get how many times do I need to call the API
-            granularity_ms = self.convert_granularity_to_ms(granularity)
-            api_calls = self.calculate_api_calls(start_time, end_time, granularity_ms)
-            # total_candles = (end_time - start_time) // granularity_ms
-       
-            
-            async with aiohttp.ClientSession() as session:
-                for i, call in enumerate(api_calls):
-                    if start_time:
-                        params['startTime'] = str(call['start_time'])
-                    if end_time:
-                        params['endTime'] = str(call['end_time'])
-
+            for attempt in range(CANDLE_PAGE_RETRIES + 1):
+                async with semaphore:
+                    await self.rate_limiter.acquire('market', PRIORITY_BULK)
                     async with session.get(base_url, params=params) as response:
                         if response.status == 200:
                             result = await response.json()
                             data = result.get("data", [])
+                            break
+                        elif response.status == 429 and attempt < CANDLE_PAGE_RETRIES:
+                            # Rate limited, back off before retrying this page
+                            retry_after = float(response.headers.get('Retry-After', 2 ** attempt))
+                        else:
+                            # Fail the whole download, a partial result would be stored with a hole
+                            print(f"Error fetching candlestick data: {response.status}")
+                            raise HTTPException(status_code=response.status, detail=f"Error fetching the {symbol} candles of {call['start_time']}-{call['end_time']}: {response.status}")
+                await asyncio.sleep(retry_after)
 
-                            if not data:
-                                print(f"there wasn't data in attempt {i}")
-                                break
-
-                            np_data = np.array([
-                                [
-                                    int(item[0]),    # The timestamp in milliseconds
-                                    float(item[1]),  # Open price
-                                    float(item[2]),  # High price
-                                    float(item[3]),  # Low price
-                                    float(item[4]),  # Close price
-                                    float(item[5]),  # Volume (traded amount in the base currency)
-                                    float(item[6])   # Notional value (the total traded value in quote currency)
-                                ]
-                                for item in data
-                            ], dtype=object)
+            if not data:
+                print(f"there wasn't data in attempt {i}")
+                return 0
 
-                            final_result = np.vstack([final_result, np_data])
+            np_data = decode_candles(data[:capacities[i]])
+            final_result[offsets[i]:offsets[i] + len(np_data)] = np_data
+            return len(np_data)
 
-                            last_timestamp = int(data[-1][0])
+        pages = [asyncio.ensure_future(fetch_page(i, call)) for i, call in enumerate(api_calls)]
+        try:
+            counts = await asyncio.gather(*pages)
+        except BaseException:
+            # No page outlives a failed (or cancelled) download
+            for page in pages:
+                page.cancel()
+            raise
 
-                            # If the last fetched timestamp reaches or exceeds the requested end_time, stop fetching data
-                            if end_time and last_timestamp >= end_time:
-                                break
+        # Keep the filled rows only, in time order and without the candles shared by two windows
+        filled = np.concatenate([np.arange(offset, offset + count) for offset, count in zip(offsets, counts)])
+        final_result = final_result[filled]
+        _, unique_index = np.unique(final_result['timestamp'], return_index=True)
 
-                            # Update startTime to last_timestamp + 1 to continue fetching the next 1000 candles
-                            params['startTime'] = str(last_timestamp + 1)
-
-                        else:
-                            print(f"Error fetching candlestick data: {response.status}")
-                            break
-
-            return final_result
+        return final_result[unique_index]
 
     async def get_1min_candlestick_chart(self, symbol: str, startTime: int, endTime: int) -> np.ndarray:
         url = "https://api.bitget.com/api/v2/spot/market/candles"
@@ -293,110 +495,131 @@ class BitgetClient:
             "endTime": str(endTime)  
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    data = result.get("data", [])
-
-                    if not data:
-                        print("No data returned from the API.")
-                        return np.array([])
-
-                    # Convert the data to a NumPy array with timezone conversion
-                    utc = pytz.utc
-                    amsterdam_tz = pytz.timezone('Europe/Amsterdam')
-
-                    np_data = np.array([
-                        [
-                            datetime.fromtimestamp(int(item[0]) / 1000, tz=utc).astimezone(amsterdam_tz).timestamp(),  # Convert to Amsterdam timezone
-                            float(item[1]),  # open price
-                            float(item[2]),  # high price
-                            float(item[3]),  # low price
-                            float(item[4]),  # close price
-                            float(item[5])   # volume in base currency
-                        ]
-                        for item in data if isinstance(item, list) and len(item) >= 6  # Ensure valid format
-                    ])
-                    return np_data
-                else:
-                    print(f"Error fetching candlestick data: {response.status}")
-                    print(f"Api response: {await response.text()}")
+        session = await self.get_session()
+        await self.rate_limiter.acquire('market', PRIORITY_BULK)
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                result = await response.json()
+                data = result.get("data", [])
+
+                if not data:
+                    print("No data returned from the API.")
                     return np.array([])
 
+                # Convert the data to a NumPy array with timezone conversion
+                utc = pytz.utc
+                amsterdam_tz = pytz.timezone('Europe/Amsterdam')
+
+                np_data = np.array([
+                    [
+                        datetime.fromtimestamp(int(item[0]) / 1000, tz=utc).astimezone(amsterdam_tz).timestamp(),  # Convert to Amsterdam timezone
+                        float(item[1]),  # open price
+                        float(item[2]),  # high price
+                        float(item[3]),  # low price
+                        float(item[4]),  # close price
+                        float(item[5])   # volume in base currency
+                    ]
+                    for item in data if isinstance(item, list) and len(item) >= 6  # Ensure valid format
+                ])
+                return np_data
+            else:
+                print(f"Error fetching candlestick data: {response.status}")
+                print(f"Api response: {await response.text()}")
+                return np.array([])
+
 
     
     async def get_market_cap(self, symbol: str):
-        """Retrieve the market capitalization for a given cryptocurrency symbol using CoinMarketCap API."""
+        """Retrieve the market capitalization for a given cryptocurrency symbol (cached, see MarketCapCache)."""
+        return await self.market_cap_cache.get(symbol)
+
+    async def get_market_caps(self, symbols: list) -> dict:
+        """
+        Market caps of many base symbols ('BTC', 'ETH', ...) using CoinMarketCap API, 100 symbols per
+        call. Symbols CoinMarketCap doesn't know map to None, the ones of a failed call are left out.
+        """
         base_url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
         headers = {
             "X-CMC_PRO_API_KEY": COINMARKETCAP_APIKEY,
             "Accept": "application/json"
         }
 
-        if symbol.lower().endswith('usdt'):
-            symbol = symbol[:-4]
-        
-        params = {
-            "symbol": symbol,
-            "convert": "USD"
-        }
+        market_caps = {}
+        session = await self.get_session()
+        for i in range(0, len(symbols), 100):
+            batch = symbols[i:i + 100]
+            params = {
+                "symbol": ",".join(batch),
+                "convert": "USD",
+                # Unknown symbols are reported instead of failing the whole batch
+                "skip_invalid": "true"
+            }
 
-        async with aiohttp.ClientSession() as session:
+            await self.rate_limiter.acquire('coinmarketcap', PRIORITY_NORMAL)
             async with session.get(base_url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    try:
-                        market_cap = data['data'][symbol]['quote']['USD']['market_cap']
-                        return market_cap
-                    except KeyError:
-                        print(f"Market cap not found for symbol: {symbol}")
-                        return None
-                else:
+                if response.status != 200:
                     print(f"Error fetching market cap data: {response.status}")
-                    return None
+                    continue
+                data = (await response.json()).get('data', {})
 
+            for symbol in batch:
+                try:
+                    market_caps[symbol] = data[symbol]['quote']['USD']['market_cap']
+                except (KeyError, TypeError):
+                    print(f"Market cap not found for symbol: {symbol}")
+                    market_caps[symbol] = None
+
+        return market_caps
 
-    async def get_historical_funding_rate(self, symbol: str):
-        url = "https://api.bitget.com/api/v2/mix/market/history-fund-rate"
-        params = {"symbol": symbol, "productType": "USDT-FUTURES"}
 
+    async def get_historical_funding_rate(self, symbol: str):
+        # Errors propagate through the single flight, so a failed fetch is never cached
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        data = result.get("data", [])
-
-                        # Define a unique dtype for the structured array
-                        dtype = [
-                            ('fundingRateTimes100', 'float32'),  
-                            ('fundingTimeEurope', 'U25'),
-                            ('fundingTimeDefault', 'float32')  
-                        ]
-                        
-                        # Convert the fetched data to a NumPy structured array
-                        np_data = np.array([
-                            (
-                                float(fr["fundingRate"]) * 100,  # Funding rate times 100
-                                datetime.utcfromtimestamp(int(fr["fundingTime"]) / 1000)  # Funding time as ISO string format
-                                .replace(tzinfo=timezone('UTC'))
-                                .astimezone(timezone('Europe/Amsterdam'))
-                                .isoformat(),
-                                float(fr["fundingTime"]),  # Funding time in default format
-                            )
-                            for fr in data
-                        ], dtype=dtype)
-                        
-                        # Convert NumPy array to list of Python native types for serialization
-                        return jsonable_encoder(np_data.tolist())
-                    else:
-                        print(f"Error fetching funding rate data: {response.status}")
-                        return []
+            return await self.single_flight.do(
+                ('funding_history', symbol), lambda: self._get_historical_funding_rate(symbol), ttl=FUNDING_HISTORY_CACHE_TTL
+            )
         except Exception as e:
             print(f"An error occurred: {e}")
             return []
 
+    async def _get_historical_funding_rate(self, symbol: str, rows: int = 20):
+        """The last `rows` funding events, newest first, as [rate * 100, Amsterdam ISO time, epoch ms] lists."""
+        if self.funding_archive is not None:
+            if not self.funding_archive.is_current(symbol):
+                await self.funding_archive.sync(symbol, self.download_funding_history)
+            times, rates = self.funding_archive.query(symbol)
+            # The sync logs and swallows its errors, nothing stored and no sync is a failure too
+            if not len(times) and not self.funding_archive.is_current(symbol):
+                raise HTTPException(status_code=502, detail=f"No funding rate history of {symbol}, the archive sync failed")
+        else:
+            times, rates = await self.download_funding_history(symbol, page_size=rows)
+
+        amsterdam_tz = ZoneInfo('Europe/Amsterdam')
+        return [
+            [rate, datetime.fromtimestamp(funding_time / 1000, tz=amsterdam_tz).isoformat(), float(funding_time)]
+            for funding_time, rate in zip(times[::-1][:rows].tolist(), rates[::-1][:rows].tolist())
+        ]
+
+    async def download_funding_history(self, symbol: str, page_size: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Latest funding events of the symbol as (epoch ms int64, rate * 100 float32) columns sorted by
+        time. Only the first page is requested (100 events, the API maximum), older events aren't.
+        """
+        url = f"{self.api_url}/api/v2/mix/market/history-fund-rate"
+        params = {"symbol": symbol, "productType": "USDT-FUTURES", "pageSize": str(page_size)}
+
+        session = await self.get_session()
+        await self.rate_limiter.acquire('market', PRIORITY_BULK)
+        async with session.get(url, params=params) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=response.status, detail=f"Error fetching funding rate data: {response.status}")
+            data = (await response.json()).get("data") or []
+
+        times = np.fromiter((int(fr["fundingTime"]) for fr in data), dtype=np.int64, count=len(data))
+        rates = np.fromiter((float(fr["fundingRate"]) * 100 for fr in data), dtype=np.float32, count=len(data))
+        order = np.argsort(times, kind='stable')
+        return times[order], rates[order]
+
 
     @property
     def api_timezone(self):
@@ -412,6 +635,8 @@ async def main_testing():
 
     mk = await bitget_layer.get_market_cap('BTCUSDT')
     print("marketcap ->", mk)
+    print("pool stats ->", bitget_layer.pool_stats())
+    await bitget_layer.close()
 
     """
     res = await bitget_layer.get_candlestick_chart('BTCUSDT', granularity, start_time, end_time)
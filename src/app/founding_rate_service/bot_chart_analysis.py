@@ -4,25 +4,28 @@
 
 import pandas as pd
 import numpy as np
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
 from datetime import datetime
 from scipy.signal import argrelextrema
 import pytz, asyncio
 
-from app.founding_rate_service.bitget_layer import BitgetClient
+from src.app.founding_rate_service.bitget_layer import BitgetClient, GRANULARITY_ALIASES
+from src.app.founding_rate_service.candle_store import candles_to_rows
+from src.app.founding_rate_service.indicators import INDICATOR_COLUMNS, IndicatorEngine, indicator_engine as shared_indicator_engine
 
 
 class BotChartAnalysis():
     """
     Analysis if funding rate is more than 1.3
     """
-    def __init__(self, symbol: str, current_funding_rate: float, last_fr_exec_time: int, frequency = 8):
+    def __init__(self, symbol: str, current_funding_rate: float, last_fr_exec_time: int, frequency = 8, bitget_client: Optional[BitgetClient] = None, indicator_engine: Optional[IndicatorEngine] = None):
         self.symbol = symbol
         self.current_funding_rate = current_funding_rate
         self.last_fr_exec_time = last_fr_exec_time
         self.frequency = frequency
         self.volatility_weight = None
-        self.bitget_service = BitgetClient()
+        self.bitget_service = bitget_client or BitgetClient()
+        self.indicator_engine = indicator_engine or shared_indicator_engine
         self.api_timezone = pytz.utc
 
     async def get_whole_analysis(self):
@@ -49,8 +52,11 @@ class BotChartAnalysis():
         pass
 
     async def get_volatility_weight(self):
-        bitcoin_marketcap = await self.bitget_service.get_market_cap('BTCUSDT')
-        crypto_marketcap = await self.bitget_service.get_market_cap(self.symbol)
+        # The BTC market cap is shared by every symbol analysed at the same time
+        bitcoin_marketcap, crypto_marketcap = await asyncio.gather(
+            self.bitget_service.get_market_cap('BTCUSDT'),
+            self.bitget_service.get_market_cap(self.symbol)
+        )
 
         # Calculate the logarithmic volatility weight
         volatility_weight = np.log(crypto_marketcap) / np.log(bitcoin_marketcap)
@@ -82,40 +88,20 @@ class BotChartAnalysis():
             end_time = current_time
 
         # Get Chart and turn it into a DataFrame
-        needed_chart = await self.bitget_service.get_candlestick_chart(
-            self.symbol, granularity, start_time=starting_time, end_time=end_time
-        )
+        granularity = GRANULARITY_ALIASES.get(granularity, granularity)
+        candles = await self.bitget_service.get_candles(self.symbol, granularity, starting_time, end_time)
 
-        df = pd.DataFrame(needed_chart, columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume', 'National_Value'])
+        df = pd.DataFrame(candles_to_rows(candles), columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume', 'National_Value'])
 
         df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='ms')
-        df['Open'] = pd.to_numeric(df['Open'], errors='coerce')
-        df['High'] = pd.to_numeric(df['High'], errors='coerce')
-        df['Low'] = pd.to_numeric(df['Low'], errors='coerce')
-        df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
-        df['Volume'] = pd.to_numeric(df['Volume'], errors='coerce')
         df.set_index('Timestamp', inplace=True)
 
-        # Simple Moving Average (20)
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-
-        # Relative Strength Index (14)
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI_14'] = 100 - (100 / (1 + rs))
-
-        # Moving Average Convergence Divergence (MACD)
-        ema_12 = df['Close'].ewm(span=12, adjust=False).mean()
-        ema_26 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_12 - ema_26
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-
-        # Bollinger Bands (20, 2)
-        df['Middle_Band'] = df['Close'].rolling(window=20).mean()
-        df['Upper_Band'] = df['Middle_Band'] + (df['Close'].rolling(window=20).std() * 2)
-        df['Lower_Band'] = df['Middle_Band'] - (df['Close'].rolling(window=20).std() * 2)
+        # SMA_20, RSI_14, MACD, Signal_Line and Bollinger Bands (20, 2), only the new candles are computed
+        indicators = self.indicator_engine.update(
+            self.symbol, granularity, candles, self.bitget_service.convert_granularity_to_ms(granularity)
+        )
+        for column in INDICATOR_COLUMNS:
+            df[column] = indicators[column]
 
         return df
 
@@ -0,0 +1,103 @@
+# candle_decoder.py
+
+import time
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from src.app.founding_rate_service.candle_store import CANDLE_DTYPE
+
+
+def decode_candles(data: list) -> np.ndarray:
+    """
+    Decode a page of raw Bitget candles (lists of strings [ts, open, high, low, close, baseVolume, quoteVolume])
+    into a contiguous CANDLE_DTYPE array. The strings are parsed by numpy in one flat pass over the
+    whole page instead of converting every item in a Python comprehension.
+    """
+    if not data:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    fields = len(CANDLE_DTYPE.names)
+    rows = data
+    if not all(len(item) == fields for item in data):
+        # Extra fields are cut, rows missing fields can't be decoded and are dropped
+        rows = [item[:fields] for item in data if len(item) >= fields]
+        if len(rows) < len(data):
+            print(f"Dropped {len(data) - len(rows)} of {len(data)} candles with less than {fields} fields")
+        if not rows:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+    values = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * fields).reshape(-1, fields)
+
+    candles = np.empty(len(rows), dtype=CANDLE_DTYPE)
+    # Epoch milliseconds are far below 2**53, parsing them as float64 is exact
+    candles['timestamp'] = values[:, 0].astype(np.int64)
+    for column, name in enumerate(CANDLE_DTYPE.names[1:], start=1):
+        candles[name] = values[:, column]
+
+    return candles
+
+
+def _legacy_decode(data: list) -> pd.DataFrame:
+    """The previous path: object rows built item by item, then pd.to_numeric on every column."""
+    np_data = np.array([
+        [int(item[0]), float(item[1]), float(item[2]), float(item[3]), float(item[4]), float(item[5]), float(item[6])]
+        for item in data
+    ], dtype=object)
+
+    df = pd.DataFrame(np_data, columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume', 'National_Value'])
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='ms')
+    for column in ['Open', 'High', 'Low', 'Close', 'Volume', 'National_Value']:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def _typed_decode(data: list) -> pd.DataFrame:
+    candles = decode_candles(data)
+    return pd.DataFrame({
+        'Timestamp': pd.to_datetime(candles['timestamp'], unit='ms'),
+        'Open': candles['open'],
+        'High': candles['high'],
+        'Low': candles['low'],
+        'Close': candles['close'],
+        'Volume': candles['volume'],
+        'National_Value': candles['notional']
+    })
+
+
+def benchmark_decoder(sizes=(10_000, 100_000), repeat: int = 3) -> list:
+    """Compare the legacy object path against decode_candles on synthetic pages of the given sizes."""
+    rng = np.random.default_rng(0)
+    results = []
+
+    for size in sizes:
+        timestamps = 1_700_000_000_000 + np.arange(size, dtype=np.int64) * 60_000
+        prices = 100 + np.cumsum(rng.normal(0, 0.1, size))
+        data = [
+            [str(ts), f"{p:.4f}", f"{p + 0.5:.4f}", f"{p - 0.5:.4f}", f"{p + 0.1:.4f}", "1520.25", "152031.7"]
+            for ts, p in zip(timestamps, prices)
+        ]
+
+        timings = {}
+        for name, decoder in (('legacy', _legacy_decode), ('typed', _typed_decode)):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                decoder(data)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best * 1000
+
+        results.append({
+            "candles": size,
+            "legacy_ms": round(timings['legacy'], 2),
+            "typed_ms": round(timings['typed'], 2),
+            "speedup": round(timings['legacy'] / timings['typed'], 2)
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark_decoder():
+        print(result)
@@ -0,0 +1,314 @@
+# candle_store.py
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from src.config import CANDLE_STORE_DIR, CANDLES_CACHE_TTL
+
+# One candle as stored on disk, timestamps in epoch milliseconds
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('notional', '<f8')
+])
+
+CandleFetcher = Callable[[str, str, int, int], Awaitable[np.ndarray]]
+Range = Tuple[int, int]
+
+
+def candles_to_rows(candles: np.ndarray) -> np.ndarray:
+    """Convert CANDLE_DTYPE candles back into (N, 7) float64 rows."""
+    return recfunctions.structured_to_unstructured(candles, dtype=np.float64)
+
+
+def merge_candles(existing: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Merge two candle arrays sorted by timestamp, the new candles win on duplicated timestamps."""
+    combined = np.concatenate([new, existing])
+    _, first_index = np.unique(combined['timestamp'], return_index=True)
+    return combined[first_index]
+
+
+def missing_ranges(timestamps: np.ndarray, start_time: int, end_time: int, granularity_ms: int) -> List[Range]:
+    """Time ranges of [start_time, end_time] that are not covered by the (sorted) timestamps."""
+    if end_time < start_time:
+        return []
+    if timestamps.size == 0 or end_time < timestamps[0] or start_time > timestamps[-1]:
+        return [(start_time, end_time)]
+
+    ranges = []
+    first, last = int(timestamps[0]), int(timestamps[-1])
+    if start_time < first:
+        ranges.append((start_time, first - granularity_ms))
+
+    # Gaps inside the requested window
+    low, high = np.searchsorted(timestamps, [max(start_time, first), min(end_time, last)])
+    window = timestamps[low:high + 1]
+    for gap in np.flatnonzero(np.diff(window) > granularity_ms):
+        ranges.append((int(window[gap]) + granularity_ms, int(window[gap + 1]) - granularity_ms))
+
+    if end_time > last:
+        ranges.append((last + granularity_ms, end_time))
+
+    return [(range_start, range_end) for range_start, range_end in ranges if range_end >= range_start]
+
+
+def subtract_ranges(ranges: List[Range], known: List[Range]) -> List[Range]:
+    """The parts of `ranges` outside the (sorted, disjoint) `known` ranges."""
+    result = []
+    for range_start, range_end in ranges:
+        for known_start, known_end in known:
+            if known_end < range_start or known_start > range_end:
+                continue
+            if known_start > range_start:
+                result.append((range_start, known_start - 1))
+            range_start = known_end + 1
+            if range_start > range_end:
+                break
+        if range_start <= range_end:
+            result.append((range_start, range_end))
+    return result
+
+
+def add_range(known: List[Range], new: Range) -> List[Range]:
+    """Insert a range into sorted disjoint ranges, merging the ones it touches."""
+    merged = []
+    new_start, new_end = new
+    for known_start, known_end in sorted(known):
+        if known_end + 1 < new_start or known_start > new_end + 1:
+            merged.append((known_start, known_end))
+        else:
+            new_start, new_end = min(new_start, known_start), max(new_end, known_end)
+    merged.append((new_start, new_end))
+    return sorted(merged)
+
+
+class CandleStore:
+    """
+    Persistent on-disk candle store keyed by (symbol, granularity).
+
+    Every key is one raw file of CANDLE_DTYPE records sorted by timestamp, memory mapped for
+    reads, plus a small JSON file of metadata:
+
+    - `closed_until`: the newest stored candle known to be closed. Candles after it (the one
+      still open when fetched) are refetched once closed, the ones up to it never again.
+    - `fetched_at`: when the open candle was last fetched, it is reused for CANDLES_CACHE_TTL.
+    - `empty`: ranges the exchange returned nothing for (before the listing, past its history
+      limit, outages). They are closed history, so they are not requested again.
+
+    New candles after the stored ones are written in place at the end of the file (the common
+    case: a tail refresh), only head or gap fills rewrite the whole file.
+    """
+
+    def __init__(self, base_dir: str = CANDLE_STORE_DIR, open_candle_ttl: float = CANDLES_CACHE_TTL):
+        self.base_dir = base_dir
+        self.open_candle_ttl = open_candle_ttl
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._meta: Dict[Tuple[str, str], dict] = {}
+        self.stats = {
+            "reads": 0,
+            "network_fetches": 0,
+            "candles_fetched": 0,
+            "candles_served": 0,
+            "appends": 0,
+            "rewrites": 0,
+            "skipped_empty_ranges": 0
+        }
+
+    def _path(self, symbol: str, granularity: str) -> str:
+        return os.path.join(self.base_dir, f"{symbol}_{granularity}.candles")
+
+    def _meta_path(self, symbol: str, granularity: str) -> str:
+        return os.path.join(self.base_dir, f"{symbol}_{granularity}.json")
+
+    def _legacy_path(self, symbol: str, granularity: str) -> str:
+        """.npy file of the first store format, converted on first use."""
+        return os.path.join(self.base_dir, f"{symbol}_{granularity}.npy")
+
+    def load(self, symbol: str, granularity: str) -> np.ndarray:
+        """Stored candles of a key (memory mapped, read only)."""
+        path = self._path(symbol, granularity)
+        if not os.path.exists(path):
+            legacy_path = self._legacy_path(symbol, granularity)
+            if not os.path.exists(legacy_path):
+                return np.empty(0, dtype=CANDLE_DTYPE)
+            self.save(symbol, granularity, np.load(legacy_path))
+            os.remove(legacy_path)
+
+        if os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+
+    def save(self, symbol: str, granularity: str, candles: np.ndarray) -> None:
+        """Atomically replace the stored candles of a key."""
+        path = self._path(symbol, granularity)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as tmp_file:
+            tmp_file.write(np.ascontiguousarray(candles, dtype=CANDLE_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+
+    def _append(self, symbol: str, granularity: str, index: int, candles: np.ndarray) -> None:
+        """Write `candles` over the stored ones from `index` on, the file only grows."""
+        path = self._path(symbol, granularity)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as candle_file:
+            candle_file.seek(index * CANDLE_DTYPE.itemsize)
+            candle_file.write(np.ascontiguousarray(candles, dtype=CANDLE_DTYPE).tobytes())
+
+    def metadata(self, symbol: str, granularity: str) -> dict:
+        key = (symbol, granularity)
+        if key not in self._meta:
+            meta_path = self._meta_path(symbol, granularity)
+            if os.path.exists(meta_path):
+                with open(meta_path) as meta_file:
+                    meta = json.load(meta_file)
+                meta["empty"] = [tuple(empty_range) for empty_range in meta["empty"]]
+            else:
+                # Without metadata (first format) only the last stored candle is taken as possibly open
+                stored = self.load(symbol, granularity)
+                meta = {"closed_until": int(stored['timestamp'][-2]) if len(stored) > 1 else None, "fetched_at": 0, "empty": []}
+            self._meta[key] = meta
+        return self._meta[key]
+
+    def _save_metadata(self, symbol: str, granularity: str, meta: dict) -> None:
+        meta_path = self._meta_path(symbol, granularity)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, meta_path)
+
+    def _needed_ranges(self, stored: np.ndarray, meta: dict, start_time: int, end_time: int, granularity_ms: int, now_ms: int) -> List[Range]:
+        """What to download for [start_time, end_time]: missing closed candles and, when asked for, a stale open one."""
+        open_time = now_ms // granularity_ms * granularity_ms
+        timestamps = stored['timestamp']
+        # Only the final candles count as stored, the others are fetched again once closed
+        if meta["closed_until"] is not None:
+            timestamps = timestamps[:np.searchsorted(timestamps, meta["closed_until"], side='right')]
+        else:
+            timestamps = timestamps[:0]
+
+        closed = missing_ranges(timestamps, start_time, min(end_time, open_time - granularity_ms), granularity_ms)
+        ranges = subtract_ranges(closed, meta["empty"])
+        self.stats["skipped_empty_ranges"] += len(closed) - len(ranges)
+
+        open_stored = stored.size > 0 and stored['timestamp'][-1] == open_time
+        if end_time >= open_time and (not open_stored or now_ms / 1000 - meta["fetched_at"] > self.open_candle_ttl):
+            if ranges and ranges[-1][1] >= open_time - granularity_ms:
+                ranges[-1] = (ranges[-1][0], end_time)
+            else:
+                ranges.append((open_time, end_time))
+        return ranges
+
+    async def get_range(self, symbol: str, granularity: str, granularity_ms: int, start_time: int, end_time: int, fetcher: CandleFetcher) -> np.ndarray:
+        """Candles of [start_time, end_time], downloading through `fetcher` only what is missing locally."""
+        key = (symbol, granularity)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            stored = self.load(symbol, granularity)
+            meta = self.metadata(symbol, granularity)
+            now_ms = int(time.time() * 1000)
+            open_time = now_ms // granularity_ms * granularity_ms
+            ranges = self._needed_ranges(stored, meta, start_time, end_time, granularity_ms, now_ms)
+
+            fetched = []
+            for range_start, range_end in ranges:
+                self.stats["network_fetches"] += 1
+                # Errors propagate, nothing of a failed download is stored
+                candles = await fetcher(symbol, granularity, range_start, range_end)
+                if len(candles):
+                    fetched.append(candles)
+                    self.stats["candles_fetched"] += len(candles)
+
+            if ranges:
+                if fetched:
+                    stored = self._store(symbol, granularity, np.asarray(stored), np.concatenate(fetched))
+
+                # Closed history the exchange had nothing for is never requested again
+                timestamps = stored['timestamp']
+                for range_start, range_end in ranges:
+                    for empty_range in missing_ranges(timestamps, range_start, min(range_end, open_time - granularity_ms), granularity_ms):
+                        meta["empty"] = add_range(meta["empty"], empty_range)
+
+                closed = timestamps[timestamps < open_time]
+                if closed.size:
+                    meta["closed_until"] = int(closed[-1])
+                if ranges[-1][1] >= open_time:
+                    meta["fetched_at"] = now_ms / 1000
+                self._save_metadata(symbol, granularity, meta)
+
+            low = np.searchsorted(stored['timestamp'], start_time, side='left')
+            high = np.searchsorted(stored['timestamp'], end_time, side='right')
+            # Copy, the mapped file may be replaced by the next sync
+            result = np.array(stored[low:high])
+
+        self.stats["reads"] += 1
+        self.stats["candles_served"] += len(result)
+        return result
+
+    def _store(self, symbol: str, granularity: str, stored: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """Merge new candles into the stored ones, appending when they all come after the stored closed candles."""
+        new = merge_candles(np.empty(0, dtype=CANDLE_DTYPE), new)
+        index = int(np.searchsorted(stored['timestamp'], new['timestamp'][0], side='left'))
+        # Appending is exact when the new candles replace every stored one they overlap
+        if np.isin(stored['timestamp'][index:], new['timestamp']).all():
+            self._append(symbol, granularity, index, new)
+            self.stats["appends"] += 1
+        else:
+            self.save(symbol, granularity, merge_candles(stored, new))
+            self.stats["rewrites"] += 1
+        return self.load(symbol, granularity)
+
+
+async def _benchmark(reads: int = 200, history_days: int = 30) -> dict:
+    """Repeated reads of the last day of a 30 day 1m history, with a fake exchange."""
+    import tempfile
+
+    granularity_ms = 60 * 1000
+    now_ms = int(time.time() * 1000)
+    listed_at = now_ms // granularity_ms * granularity_ms - history_days * 24 * 3600 * 1000
+    calls = []
+
+    async def fetcher(symbol, granularity, start_time, end_time):
+        calls.append((start_time, end_time))
+        timestamps = np.arange(max(start_time, listed_at) // granularity_ms * granularity_ms, min(end_time, int(time.time() * 1000)) + 1, granularity_ms)
+        timestamps = timestamps[timestamps >= start_time]
+        candles = np.zeros(len(timestamps), dtype=CANDLE_DTYPE)
+        candles['timestamp'] = timestamps
+        candles['close'] = 1.0
+        return candles
+
+    store = CandleStore(tempfile.mkdtemp())
+    # Backfill, asking for time before the listing too
+    await store.get_range("SYMUSDT", '1m', granularity_ms, listed_at - 24 * 3600 * 1000, now_ms, fetcher)
+    backfill_calls = len(calls)
+
+    started = time.perf_counter()
+    for _ in range(reads):
+        end_ms = int(time.time() * 1000)
+        await store.get_range("SYMUSDT", '1m', granularity_ms, end_ms - 24 * 3600 * 1000, end_ms, fetcher)
+        # Before the listing: known empty after the backfill
+        await store.get_range("SYMUSDT", '1m', granularity_ms, listed_at - 3600 * 1000, listed_at - granularity_ms, fetcher)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "backfill_fetches": backfill_calls,
+        "fetches_during_reads": len(calls) - backfill_calls,
+        "reads": reads * 2,
+        "read_ms": round(elapsed / (reads * 2) * 1000, 4),
+        **store.stats
+    }
+
+
+if __name__ == "__main__":
+    print(asyncio.run(_benchmark()))
@@ -2,9 +2,282 @@ import asyncio
 import pandas as pd
 import numpy as np
 from datetime import datetime, timezone, timedelta
-from typing import Tuple
+from typing import Dict, Literal, Optional, Tuple
 
 from src.app.founding_rate_service.bitget_layer import BitgetClient
+from src.app.founding_rate_service.candle_store import CANDLE_DTYPE
+from src.app.founding_rate_service.analysis_executor import AnalysisExecutor
+from src.app.founding_rate_service.strategy_params import DEFAULT_PARAMS, StrategyParams
+
+
+"""
+    Pure analysis functions. They take candle columns (dict of numpy arrays with 'timestamp' in ms,
+    'open', 'high', 'low', 'close'), timestamps sorted ascending, and return plain values/dicts, so they
+    can run in the AnalysisExecutor.
+"""
+
+# Candle columns held by FundingRateChart and the matching DataFrame columns
+CANDLE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'notional')
+FRAME_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Notional')
+
+
+def window(candles: dict, start_time: int, end_time: int) -> dict:
+    """Views of the candle columns within [start_time, end_time]."""
+    timestamps = candles['timestamp']
+    low = np.searchsorted(timestamps, start_time, side='left')
+    high = np.searchsorted(timestamps, end_time, side='right')
+    return {name: column[low:high] for name, column in candles.items()}
+
+
+def candles_to_columns(candles: np.ndarray) -> dict:
+    """CANDLE_DTYPE candles as contiguous columns sorted by timestamp, rows with NaN prices dropped."""
+    columns = {name: np.ascontiguousarray(candles[name]) for name in CANDLE_COLUMNS}
+
+    prices = np.stack([columns[name] for name in ('open', 'high', 'low', 'close')])
+    valid = ~np.isnan(prices).any(axis=0)
+    if not valid.all():
+        columns = {name: column[valid] for name, column in columns.items()}
+
+    timestamps = columns['timestamp']
+    if timestamps.size > 1 and not (timestamps[1:] > timestamps[:-1]).all():
+        _, order = np.unique(timestamps, return_index=True)
+        columns = {name: column[order] for name, column in columns.items()}
+
+    return columns
+
+
+def columns_to_frame(columns: dict) -> pd.DataFrame:
+    """DataFrame of candle columns, indexed by a UTC 'Timestamp' DatetimeIndex."""
+    index = pd.DatetimeIndex(pd.to_datetime(columns['timestamp'], unit='ms', utc=True), name='Timestamp')
+    return pd.DataFrame({frame_name: columns[name] for frame_name, name in zip(FRAME_COLUMNS, CANDLE_COLUMNS[1:])}, index=index)
+
+
+class FundingEventIndex:
+    """
+    [start, end) candle offsets of the window of every funding event, from 1 minute before to 10
+    minutes after it, found with one searchsorted over the sorted timestamps. The stats of an event
+    window are computed the first time they are asked for and cached, so the later queries are O(1).
+    `candles` can be candle columns or a CANDLE_DTYPE array.
+    """
+
+    BEFORE_MS = 60 * 1000
+    AFTER_MS = 10 * 60 * 1000
+
+    def __init__(self, candles, funding_times_ms):
+        self.candles = candles
+        self.funding_times = np.asarray(funding_times_ms, dtype=np.int64)
+
+        timestamps = candles['timestamp']
+        self.starts = np.searchsorted(timestamps, self.funding_times - self.BEFORE_MS, side='left')
+        self.ends = np.searchsorted(timestamps, self.funding_times + self.AFTER_MS, side='right')
+        self.positions = {funding_time: i for i, funding_time in enumerate(self.funding_times.tolist())}
+        self._stats = {}
+
+    def offsets(self, funding_time_ms: int) -> Optional[Tuple[int, int]]:
+        i = self.positions.get(funding_time_ms)
+        if i is None:
+            return None
+        return int(self.starts[i]), int(self.ends[i])
+
+    def stats(self, funding_time_ms: int) -> Optional[dict]:
+        """open, low, high, close, return (%) and volatility (see last_volatility) of an event window, None when it has no candles."""
+        if funding_time_ms in self._stats:
+            return self._stats[funding_time_ms]
+
+        offsets = self.offsets(funding_time_ms)
+        if offsets is None:
+            # Not an indexed event, computed but not cached
+            return event_stats(window(self.candles, funding_time_ms - self.BEFORE_MS, funding_time_ms + self.AFTER_MS))
+
+        start, end = offsets
+        stats = event_stats({name: self.candles[name][start:end] for name in ('open', 'high', 'low', 'close')})
+        self._stats[funding_time_ms] = stats
+        return stats
+
+    def volatility(self, funding_time_ms: int) -> Optional[float]:
+        stats = self.stats(funding_time_ms)
+        return stats["volatility"] if stats is not None else None
+
+
+def event_stats(period: dict) -> Optional[dict]:
+    if period['open'].size == 0:
+        return None
+
+    price_start = float(period['open'][0])
+    price_end = float(period['low'].min())
+
+    if price_start > price_end:
+        volatility = ((price_end - price_start) / price_start) * 100
+    else:
+        volatility = (price_start / price_end) * 100
+
+    close = float(period['close'][-1])
+    return {
+        "open": price_start,
+        "low": price_end,
+        "high": float(period['high'].max()),
+        "close": close,
+        "return": (close - price_start) / price_start * 100,
+        "volatility": float(volatility)
+    }
+
+
+def last_volatility(candles: dict, funding_time_ms: int, events: Optional[FundingEventIndex] = None) -> Optional[float]:
+    """Volatility from 1 minute before to 10 minutes after the given funding time."""
+    events = events if events is not None else FundingEventIndex(candles, [funding_time_ms])
+    return events.volatility(funding_time_ms)
+
+
+def incrementation_signal(candles: dict, params: StrategyParams = DEFAULT_PARAMS) -> dict:
+    """
+    First stage of analyze_incrementation over the 1 minute candles of the last 8 hours.
+    Returns {"result": None, "needs_2d": True} when the 2 days 15 minute chart has to be checked.
+    """
+    # Function constants
+    min_persentage = params.min_percentage
+    min_persentage_short_term = params.min_percentage_short_term
+
+    if candles['timestamp'].size == 0:
+        return {}
+
+    start_price = candles['open'][0]
+    end_price = candles['close'][-1]
+    highest_value = candles['high'].max()
+
+    if start_price > end_price:
+        volatility = ((end_price - start_price) / start_price) * 100
+    else:
+        volatility = ((start_price - end_price) / end_price) * 100
+
+    # Calculate volatility from the highest value of the period of time
+    volatility_from_highest = ((end_price - highest_value) / highest_value) * 100
+
+    # Calculate volatility from the highest price of 2 hours ago (120 minutes)
+    two_hours_highest_value = candles['high'][-120:].max()
+    two_hours_volatility = ((end_price - two_hours_highest_value) / two_hours_highest_value) * 100
+
+    if volatility > min_persentage: # The price is generally going up
+
+        if two_hours_volatility >= min_persentage_short_term:
+            if volatility_from_highest >= min_persentage_short_term + 5:
+                # Open long but a little bit risky
+                return {"result": True, "side": "long", "risky": True, "chart": "not avariable", "type": "normal"}
+        else:
+            # Open long
+            return {"result": True, "side": "long", "risky": False, "chart": "not avariable", "type": "normal"}
+
+    # Calculate short positions
+    if volatility_from_highest <= -params.drop_from_highest:
+        # Enter short
+        return {"result": True, "side": "short", "risky": False, "chart": "1.1", "type": "after"}
+
+    one_hour_highest_value = candles['high'][-60:].max()
+    if highest_value == one_hour_highest_value:
+
+        # Calculate volatility from max value to last value
+        hour_volatility = ((end_price - one_hour_highest_value) / one_hour_highest_value) * 100
+        if hour_volatility < 1.3:
+            return {"result": True, "side": "long", "risky": False, "chart": "1.2", "type": "normal"}
+
+        if hour_volatility > 7.0:
+            return {"result": True, "side": "short", "risky": True, "chart": "1.4", "type": "after"}
+
+    return {"result": None, "side": None, "needs_2d": True}
+
+
+def two_days_signal(candles: dict, params: StrategyParams = DEFAULT_PARAMS) -> dict:
+    """Second stage of analyze_incrementation over the 15 minute candles of the last 2 days (42h)."""
+    if candles['timestamp'].size == 0:
+        return {"result": False, "side": None}
+
+    start_price_2d = candles['open'][0]
+    higest_price_2d_lst_hr = candles['high'][-60:].max()
+
+    if start_price_2d > higest_price_2d_lst_hr:
+        volatility = ((higest_price_2d_lst_hr - start_price_2d) / start_price_2d) * 100
+    else:
+        volatility = (start_price_2d / higest_price_2d_lst_hr) * 100
+
+    if volatility > params.two_days_volatility:
+        # Analyze setback
+        last_price = candles['close'][-1]
+        two_hour_higest_price = candles['high'][-4 * 2:].max()
+
+        setback = ((last_price - two_hour_higest_price) / two_hour_higest_price) * 100
+
+        if setback < -5: # Chacke min setback if you see it to low
+            return {"result": True, "side": "short", "risky": True, "chart": "1.6", "type": "after-variation"}
+        else:
+            return {"result": True, "side": "long", "risky": True, "chart": "1.5", "type": "after"}
+
+    elif volatility < -params.two_days_volatility:
+        return {"result": True, "side": "long", "risky": True, "chart": "1.7", "type": "normal"}
+
+    # No clear signal
+    return {"result": False, "side": None}
+
+
+def past_funding_rates_signal(candles: dict, funding_times_ms: list, events: Optional[FundingEventIndex] = None) -> dict:
+    """Structure 2.1, compare the volatility after the last and pre-last funding rates."""
+    if len(funding_times_ms) < 2:
+        return {"result": False, "side": None}
+
+    events = events if events is not None else FundingEventIndex(candles, funding_times_ms[:2])
+    last = events.volatility(funding_times_ms[0])
+    pre_last = events.volatility(funding_times_ms[1])
+    if last is None or pre_last is None:
+        return {"result": False, "side": None}
+
+    if last < -1.5:
+        if last >= pre_last or pre_last < -1.5:
+            return {"result": True, "side": "long", "risky": False, "chart": "2.1", "type": "after"} # Low risk variation
+
+        else:
+            return {"result": True, "side": "long", "risky": True, "chart": "2.1", "type": "after"} # Hight rick variation
+
+    return {"result": False, "side": None}
+
+
+def analyze_symbol(candles: dict, funding_times_ms: list, params: StrategyParams = DEFAULT_PARAMS, events: Optional[FundingEventIndex] = None) -> dict:
+    """
+    Analysis of a symbol with a funding rate under 3.0: if the last funding rate was followed by a
+    volatility over 1.5 open short 'after', otherwise check the incrementation of the last 8 hours.
+    """
+    percentage = last_volatility(candles, funding_times_ms[0], events) if funding_times_ms else None
+    if percentage is not None and percentage >= 1.5:
+        return {"result": True, "side": "short", "risky": False, "chart": "volatility", "type": "after"}
+
+    return incrementation_signal(candles, params)
+
+
+# Event index of the last candles of every symbol analysed in this process, see cached_event_index
+_event_indexes: Dict[str, Tuple[tuple, FundingEventIndex]] = {}
+
+
+def cached_event_index(symbol: str, candles: dict, funding_times_ms: list) -> FundingEventIndex:
+    """
+    FundingEventIndex of the candles, cached in the process running the analysis (every worker of
+    a process pool has its own) and rebuilt when the last candle or the funding times change. An
+    index built by the caller would be pickled with its cached stats and the copy thrown away.
+    """
+    timestamps = candles['timestamp']
+    key = (int(timestamps[-1]) if timestamps.size else None, timestamps.size, tuple(funding_times_ms))
+    cached = _event_indexes.get(symbol)
+    if cached is None or cached[0] != key:
+        cached = (key, FundingEventIndex(candles, funding_times_ms))
+        _event_indexes[symbol] = cached
+    return cached[1]
+
+
+def analyze_symbol_cached(symbol: str, candles: dict, funding_times_ms: list, params: StrategyParams = DEFAULT_PARAMS) -> dict:
+    """analyze_symbol with the event index of the symbol cached in the worker."""
+    return analyze_symbol(candles, funding_times_ms, params, cached_event_index(symbol, candles, funding_times_ms))
+
+
+def past_funding_rates_signal_cached(symbol: str, candles: dict, funding_times_ms: list) -> dict:
+    """past_funding_rates_signal with the event index of the symbol cached in the worker."""
+    return past_funding_rates_signal(candles, funding_times_ms, cached_event_index(symbol, candles, funding_times_ms))
+
 
 class FundingRateChart:
     """
@@ -14,40 +287,49 @@ class FundingRateChart:
     - symbol (str): The trading symbol to analyze.
     - granularity (str): The granularity of the candlestick data (default '1min').
     - limit (int): The number of data points to fetch (default 1000).
-    - df (DataFrame): The fetched candlestick data.
+    - candles (dict): The fetched candlestick data as contiguous numpy columns (CANDLE_COLUMNS), sorted int64 timestamps in ms.
+    - df (DataFrame): The same candles as a DataFrame, only built when requested.
     - latest_funding_time (str): The latest funding rate expiration time.
+    - candle_data (BitgetClient): Shared client, a new one is created when not given.
     """
 
-    def __init__(self, symbol: str, granularity: str = '1min', limit: int = 1000):
+    def __init__(self, symbol: str, granularity: str = '1min', limit: int = 1000, bitget_client: Optional[BitgetClient] = None):
         self.symbol = symbol
         self.granularity = granularity
         self.limit = limit
-        self.candle_data = BitgetClient()
-        self.df = None
+        self.candle_data = bitget_client or BitgetClient()
+        self.candles = None
+        self._df = None
         self.latest_funding_time = None
         self.latests_founing_rates = []
+        self._funding_times_ms = None
+        self._events = None
 
     async def fetch_data(self):
         """
         Fetch candlestick and funding rate data asynchronously.
         """
+        # The last `limit` candles, aligned to the candle open times (same candles as "now") so that
+        # identical concurrent fetches share the same request key
+        granularity_ms = self.candle_data.convert_granularity_to_ms(self.granularity)
+        end_time = int(datetime.now(timezone.utc).timestamp() * 1000) // granularity_ms * granularity_ms
+        start_time = end_time - self.limit * granularity_ms
+
         # Fetch candlestick data and funding rate data concurrently
-        candlestick_task = self.candle_data.get_candlestick_chart(self.symbol, granularity=self.granularity, limit=self.limit)
+        candlestick_task = self.candle_data.get_candles(self.symbol, self.granularity, start_time, end_time)
         funding_rate_task = self.candle_data.get_historical_funding_rate(self.symbol)
         
         # Gather results from both tasks
         result, funding_rates = await asyncio.gather(candlestick_task, funding_rate_task)
 
-        # Process candlestick data
+        # Process candlestick data, the DataFrame and the event index are only built if requested
+        self._df = None
+        self._events = None
         if result.size > 0:
-            df = pd.DataFrame(result, columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'].astype(float), unit='s', utc=True)
-            df.set_index('Timestamp', inplace=True)
-            df.dropna(inplace=True)  # Ensure no NaN values in the DataFrame
-            self.df = df  # Store for further analysis
+            self.candles = candles_to_columns(result)  # Store for further analysis
         else:
             print("No candlestick data fetched. Please check the symbol and granularity.")
-            df = None
+            self.candles = None
 
         # Ensure funding rates are in a compatible format
         if funding_rates:
@@ -57,7 +339,7 @@ class FundingRateChart:
             print("No funding rate data fetched.")
             funding_rates = None
 
-        return df, funding_rates
+        return self.candles, funding_rates
 
 
     async def fetch_funding_rate_expiration_time(self):
@@ -67,10 +349,14 @@ class FundingRateChart:
         _, funding_rates = await self.fetch_data()
 
         if funding_rates:
+            self.latests_founing_rates = []
+            self._funding_times_ms = []
+            self._events = None
             for funding_rate in funding_rates:
                 funding_time_str = funding_rate['fundingTimeEurope']  
                 funding_time_utc = datetime.fromisoformat(funding_time_str).astimezone(timezone.utc)
                 self.latests_founing_rates.append(funding_time_utc.strftime('%Y-%m-%d %H:%M:%S%z'))
+                self._funding_times_ms.append(int(funding_time_utc.timestamp()) * 1000)
 
 
             self.latest_funding_time = max(funding_rates, key=lambda x: datetime.fromisoformat(x['fundingTimeEurope']).timestamp())['fundingTimeEurope']
@@ -82,10 +368,38 @@ class FundingRateChart:
             return None
 
 
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        if self._df is None and self.candles is not None:
+            self._df = columns_to_frame(self.candles)
+        return self._df
+
+    def has_candles(self) -> bool:
+        return self.candles is not None and self.candles['timestamp'].size > 0
+
+    def candle_columns(self) -> dict:
+        """Candles as plain numpy columns (timestamp in ms), the format taken by the analysis functions. No copy."""
+        if self.candles is None:
+            return {name: np.empty(0, dtype=CANDLE_DTYPE[name]) for name in CANDLE_COLUMNS}
+        return self.candles
+
+    def funding_times_ms(self) -> list:
+        """Past funding times (latests_founing_rates) as epoch milliseconds, parsed once per fetch."""
+        if self._funding_times_ms is None or len(self._funding_times_ms) != len(self.latests_founing_rates):
+            self._funding_times_ms = [int(datetime.strptime(t, '%Y-%m-%d %H:%M:%S%z').timestamp() * 1000) for t in self.latests_founing_rates]
+        return self._funding_times_ms
+
+    @property
+    def event_index(self) -> FundingEventIndex:
+        """Window index of the past funding events over the current candles, for the analyses run in this process."""
+        if self._events is None:
+            self._events = FundingEventIndex(self.candle_columns(), self.funding_times_ms())
+        return self._events
+
     def analyze_last_volatility(self, period: int = 1) -> Tuple[float, pd.DataFrame]:
 
         """
-        Analyze the last volatility change starting 1 minute before and ending 5 minutes after
+        Analyze the last volatility change starting 1 minute before and ending 10 minutes after
         the funding rate expiration time and return an integer value. Get this from the last founding rate. Pending to be tested
         """
         if period < 1:
@@ -96,169 +410,75 @@ class FundingRateChart:
         if not self.latests_founing_rates:
             print("Suddently founding rate is not avariable.")
             return None, None
-        
-        # Convert funding time to datetime
-        funding_time = pd.to_datetime(self.latests_founing_rates[period - 1], utc=True)
 
         # Ensure data is fetched
-        if self.df is None or self.df.empty:
+        if not self.has_candles():
             print("Candlestick data is not available.")
             return None, None
 
-        # Define the start and end time within the period
-        start_time = funding_time - pd.Timedelta(minutes=1)
-        end_time = funding_time + pd.Timedelta(minutes=10)
+        funding_time_ms = self.funding_times_ms()[period - 1]
+        volatility = self.event_index.volatility(funding_time_ms)
 
-        # Filter the data within the defined period
-        period_data = self.df[(self.df.index >= start_time) & (self.df.index <= end_time)]
-        
-        # Debugging statement to ensure correct filtering
-        print(f"Filtered Data for Volatility Calculation of period {period}: \n{period_data}")
-
-        if not period_data.empty:
-            # Calculate the volatility as the percentage change in the 'Close' prices
-            price_start = period_data['Open'].iloc[0]
-            price_end = period_data['Low'].min()
-            # volatility = ((price_end - price_start) / price_start) * 100
-
-            if price_start > price_end:
-
-                volatility = ((price_end - price_start) / price_start) * 100
-            else:
-                volatility = (price_start / price_end) * 100
-
-      
-            volatility_int = float(volatility)
-
-            print(f"Volatility Change between {start_time} and {end_time}: {volatility_int}%")
-
-            # Determine if the volatility went up or down
-            if volatility > 0:
-                print("Volatility increased after the funding rate expiration.")
-            else:
-                print("Volatility remained unchanged or decreased after the funding rate expiration.")
-
-            return volatility_int, period_data
-        else:
+        if volatility is None:
             print("No data available to calculate the last volatility.")
+            return None, None
+
+        # Define the start and end time within the period
+        start_time = funding_time_ms - FundingEventIndex.BEFORE_MS
+        end_time = funding_time_ms + FundingEventIndex.AFTER_MS
+        start, end = self.event_index.offsets(funding_time_ms)
+        period_data = columns_to_frame({name: column[start:end] for name, column in self.candles.items()})
 
+        print(f"Volatility Change between {pd.to_datetime(start_time, unit='ms', utc=True)} and {pd.to_datetime(end_time, unit='ms', utc=True)} ({len(period_data)} candles): {volatility}%")
+        return volatility, period_data
 
     async def analyze_incrementation(self) -> dict:
         """
         Analyse the incrementation over the last 8 hours and make sure that 1 hour ago the ATH hasn't been superated by 5%,
         if the ATH in this range of time has been superated for over 15% mark this as enter short
         """
-        # Function constants
-        min_persentage = 10.0
-        min_persentage_short_term = 5.0
-
-        # Check if DataFrame is available
-        if self.df is None or self.df.empty:
+        # Check if the candles are available
+        if not self.has_candles():
             return {}
-        
-        # Get whole incrementation over the last 8 hours (8 * 60 minutes)
-        start_price = self.df['Open'].iloc[0]
-        end_price = self.df['Close'].iloc[-1]
-        highest_value = self.df['High'].max()
 
-
-        if start_price > end_price:
-            volatility = ((end_price - start_price) / start_price) * 100
-        else:
-            volatility = ((start_price - end_price) / end_price) * 100    
-
-        print("Volatility result -> ", volatility)
-
-        # Calculate volatility from the highest value of the period of time
-        volatility_from_highest = ((end_price - highest_value) / highest_value) * 100
-        print("Volatility from highest -> ", volatility_from_highest)
-        
-        # Calculate volatility from the highest price of 2 hours ago (120 minutes)
-        df_2h_ago = self.df.tail(120)
-        df1_highest_value = df_2h_ago['High'].max()
-        two_hours_volatility = ((end_price - df1_highest_value) / df1_highest_value) * 100
-        print("two volatility -> ", two_hours_volatility)
-
-        
-        if volatility > min_persentage: # The price is generally going up
-
-            if two_hours_volatility >= min_persentage_short_term:
-                if volatility_from_highest < min_persentage_short_term + 5:
-                    print("Continue, likely will be in other exceptions")
-                else:
-                    # Open long but a little bit risky
-                    return {"result": True, "side": "long", "risky": True, "chart": "not avariable", "type": "normal"}
-            else:
-                # Open long
-                return {"result": True, "side": "long", "risky": False, "chart": "not avariable", "type": "normal"}
-        
-        # Calculate short positions
-        if volatility_from_highest <= -15:
-            # Enter short
-            return {"result": True, "side": "short", "risky": False, "chart": "1.1", "type": "after"} 
-
-        df_1h_ago = self.df.tail(60); df_1h_ago_highest_value = df_1h_ago['High'].max()
-        if highest_value == df_1h_ago_highest_value: 
-            
-            # Calculate volatility from max value to last value     
-            hour_volatility = ((end_price - df_1h_ago_highest_value) / df_1h_ago_highest_value) * 100
-            if hour_volatility < 1.3:
-                return {"result": True, "side": "long", "risky": False, "chart": "1.2", "type": "normal"} 
-            
-            if hour_volatility > 7.0:
-                return {"result": True, "side": "short", "risky": True, "chart": "1.4", "type": "after"}
+        signal = incrementation_signal(self.candle_columns())
+        if not signal.get("needs_2d"):
+            return signal
 
         # View incrementation of last 2 days (42h)
         self.granularity = "15min"; self.limit = 4 * 42
         await self.fetch_data()
 
-        start_price_2d = self.df['Open'].iloc[0]
-        higest_price_2d_lst_hr = self.df['High'].tail(60).max()
-
-        if start_price_2d > higest_price_2d_lst_hr:
-            volatility = ((higest_price_2d_lst_hr - start_price_2d) / start_price_2d) * 100
-        else:
-            volatility = (start_price_2d / higest_price_2d_lst_hr) * 100
-
-        print("loco volatility -> ", volatility)
-        if volatility > 15:
-            # Analyze setback
-            last_price = self.df['Close'].iloc[-1]
-            two_hour_higest_price = self.df['High'].tail(4 * 2).max()
-
-            setback = ((last_price - two_hour_higest_price) / two_hour_higest_price) * 100
-            print("setback -> ",setback)
-
-            if setback < -5: # Chacke min setback if you see it to low
-                return {"result": True, "side": "short", "risky": True, "chart": "1.6", "type": "after-variation"}
-            else:
-                return {"result": True, "side": "long", "risky": True, "chart": "1.5", "type": "after"}
-
-        elif volatility < -15:
-            return {"result": True, "side": "long", "risky": True, "chart": "1.7", "type": "normal"}
-
-
-        # No clear signal
-        return {"result": False, "side": None}
-
+        return two_days_signal(self.candle_columns())
 
     def determine_by_past_funding_rates(self):
         """
         structure 2.1 | If the last founing rate the prices was going down, the prediction will be True as open short however with risky True. Meanwhile the
         2 past prices were going down, the risky is False and should Enter into the operation 
         """
+        return past_funding_rates_signal(self.candle_columns(), self.funding_times_ms(), self.event_index)
 
-        last, _ = self.analyze_last_volatility(period=1)
-        pre_last, _ = self.analyze_last_volatility(period=2)
+    async def run_analysis(self, executor: AnalysisExecutor, analysis: Literal['incrementation', 'past_funding_rates']) -> dict:
+        """
+        Fetch the data on the event loop and run the CPU work of the analysis in the executor.
+        Returns a plain decision dict with at least 'result' and 'side'.
+        """
+        await self.fetch_funding_rate_expiration_time()
+        if not self.has_candles():
+            return {"result": False, "side": None}
 
-        if last < -1.5:
-            if last >= pre_last or pre_last < -1.5:
-                return {"result": True, "side": "long", "risky": False, "chart": "2.1", "type": "after"} # Low risk variation
+        if analysis == 'past_funding_rates':
+            return await executor.submit(past_funding_rates_signal_cached, self.symbol, self.candle_columns(), self.funding_times_ms())
 
-            else:
-                return {"result": True, "side": "long", "risky": True, "chart": "2.1", "type": "after"} # Hight rick variation
+        decision = await executor.submit(analyze_symbol_cached, self.symbol, self.candle_columns(), self.funding_times_ms(), DEFAULT_PARAMS)
+        if not decision.get("needs_2d"):
+            return decision
 
-        return {"result": False, "side": None}
+        # View incrementation of last 2 days (42h)
+        self.granularity = "15min"; self.limit = 4 * 42
+        await self.fetch_data()
+
+        return await executor.submit(two_days_signal, self.candle_columns())
 
     async def analyse_period_founing_rate(self, symbol, period_dateiso: str, period_unix_timetamp: float, short_period = 10) -> dict:
         # Debuging delete this
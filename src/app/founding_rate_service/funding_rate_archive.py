@@ -0,0 +1,181 @@
+# funding_rate_archive.py
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import FUNDING_ARCHIVE_DIR, FUNDING_ARCHIVE_SYNC_CONCURRENCY
+
+FundingColumns = Tuple[np.ndarray, np.ndarray]
+FundingFetcher = Callable[[str], Awaitable[FundingColumns]]
+
+HOUR_MS = 3600 * 1000
+
+# One row per funding event, both columns in one file so they are always replaced together
+ARCHIVE_DTYPE = np.dtype([
+    ('funding_time', '<i8'),
+    ('funding_rate', '<f4')
+])
+
+
+def empty_columns() -> FundingColumns:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+
+def merge_columns(existing: FundingColumns, new: FundingColumns) -> FundingColumns:
+    """Merge two (funding_time, funding_rate) column pairs, sorted by time, the new rows win on duplicated times."""
+    times = np.concatenate([new[0], existing[0]])
+    rates = np.concatenate([new[1], existing[1]])
+    times, first_index = np.unique(times, return_index=True)
+    return times, rates[first_index]
+
+
+class FundingRateArchive:
+    """
+    Local funding rate history of every symbol, stored as columns: funding times (int64 epoch ms)
+    and funding rates (float32, in percent like the rest of the service), in one .npy file of
+    ARCHIVE_DTYPE rows per symbol, opened memory mapped. New events are appended with
+    `sync`/`sync_all` after each funding time, and `query` serves symbol/time range reads without
+    touching the network. The file is replaced atomically, so another process reading it (the API
+    with an external engine) never sees the times of one version with the rates of another.
+
+    There is no backfill: a sync only downloads the latest page of events (see
+    BitgetClient.download_funding_history), so the history of a symbol starts about 100 funding
+    events before its first sync and only covers a gap between syncs up to that length.
+    """
+
+    def __init__(self, base_dir: str = FUNDING_ARCHIVE_DIR):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        self._columns: Dict[str, FundingColumns] = {}
+        # mtime of the file the cached columns were loaded from
+        self._versions: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Epoch ms of the last successful sync of every symbol (this process only)
+        self.synced_at: Dict[str, int] = {}
+        self.stats = {
+            "queries": 0,
+            "syncs": 0,
+            "sync_errors": 0,
+            "rows_appended": 0
+        }
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.base_dir, f"{symbol}.npy")
+
+    def _legacy_paths(self, symbol: str) -> Tuple[str, str]:
+        """Separate time/rate files of the first archive format, read until the symbol is saved again."""
+        return (
+            os.path.join(self.base_dir, f"{symbol}_time.npy"),
+            os.path.join(self.base_dir, f"{symbol}_rate.npy")
+        )
+
+    def symbols(self) -> List[str]:
+        names = os.listdir(self.base_dir)
+        symbols = {name[:-len("_time.npy")] for name in names if name.endswith("_time.npy")}
+        symbols.update(name[:-len(".npy")] for name in names if name.endswith(".npy") and not name.endswith(("_time.npy", "_rate.npy")))
+        return sorted(symbols)
+
+    def load(self, symbol: str) -> FundingColumns:
+        path = self._path(symbol)
+        try:
+            version = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return self._columns.get(symbol) or self._load_legacy(symbol)
+
+        # Reopened when another process (the external engine) replaced the file
+        if symbol not in self._columns or self._versions.get(symbol) != version:
+            rows = np.load(path, mmap_mode='r')
+            self._columns[symbol] = (rows['funding_time'], rows['funding_rate'])
+            self._versions[symbol] = version
+        return self._columns[symbol]
+
+    def _load_legacy(self, symbol: str) -> FundingColumns:
+        time_path, rate_path = self._legacy_paths(symbol)
+        if not os.path.exists(time_path) or not os.path.exists(rate_path):
+            return empty_columns()
+        times, rates = np.load(time_path, mmap_mode='r'), np.load(rate_path, mmap_mode='r')
+        if len(times) != len(rates):
+            print(f"Funding rate archive of {symbol} has mismatched time/rate files, ignoring them")
+            return empty_columns()
+        return times, rates
+
+    def save(self, symbol: str, columns: FundingColumns) -> None:
+        """Atomically replace the history of a symbol (both columns at once)."""
+        rows = np.empty(len(columns[0]), dtype=ARCHIVE_DTYPE)
+        rows['funding_time'] = columns[0]
+        rows['funding_rate'] = columns[1]
+
+        path = self._path(symbol)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as tmp_file:
+            np.save(tmp_file, rows)
+        os.replace(tmp_path, path)
+
+        for legacy_path in self._legacy_paths(symbol):
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+        self._columns[symbol] = (rows['funding_time'], rows['funding_rate'])
+        self._versions[symbol] = os.stat(path).st_mtime_ns
+
+    def append(self, symbol: str, columns: FundingColumns) -> int:
+        """
+        Merge new rows into the stored columns of a symbol, returns how many rows were added. The
+        file is only rewritten when a row was added or a stored rate was corrected.
+        """
+        stored = self.load(symbol)
+        merged = merge_columns((np.asarray(stored[0]), np.asarray(stored[1])), columns)
+        added = len(merged[0]) - len(stored[0])
+        if added or not np.array_equal(merged[1], stored[1]):
+            self.save(symbol, merged)
+        self.stats["rows_appended"] += max(added, 0)
+        return added
+
+    def query(self, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None) -> FundingColumns:
+        """Funding times/rates of the symbol within [start_time, end_time] (views of the stored columns)."""
+        self.stats["queries"] += 1
+        times, rates = self.load(symbol)
+        low = np.searchsorted(times, start_time, side='left') if start_time is not None else 0
+        high = np.searchsorted(times, end_time, side='right') if end_time is not None else len(times)
+        return times[low:high], rates[low:high]
+
+    def is_current(self, symbol: str, now_ms: Optional[int] = None) -> bool:
+        """Funding is only settled on full hours, a sync after the last full hour has every settled event."""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return self.synced_at.get(symbol, 0) >= now_ms // HOUR_MS * HOUR_MS
+
+    async def sync(self, symbol: str, fetcher: FundingFetcher) -> int:
+        """Download the latest funding events of the symbol and append the new ones."""
+        lock = self._locks.setdefault(symbol, asyncio.Lock())
+        async with lock:
+            try:
+                columns = await fetcher(symbol)
+            except Exception as e:
+                self.stats["sync_errors"] += 1
+                print(f"Error syncing the funding rates of {symbol}: {e}")
+                return 0
+
+            added = self.append(symbol, columns)
+            self.synced_at[symbol] = int(time.time() * 1000)
+            self.stats["syncs"] += 1
+            return added
+
+    async def sync_all(self, symbols: Iterable[str], fetcher: FundingFetcher, concurrency: int = FUNDING_ARCHIVE_SYNC_CONCURRENCY) -> int:
+        """Sync the symbols that aren't current yet, run after each funding time."""
+        symbols = [symbol for symbol in symbols if not self.is_current(symbol)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync_one(symbol: str) -> int:
+            async with semaphore:
+                return await self.sync(symbol, fetcher)
+
+        added = await asyncio.gather(*(sync_one(symbol) for symbol in symbols))
+        return sum(added)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "symbols_synced": len(self.synced_at)}
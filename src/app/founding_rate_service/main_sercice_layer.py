@@ -1,21 +1,33 @@
 import asyncio
+from collections import deque
 from datetime import datetime, time, timedelta
-from typing import Literal, Optional
+from typing import Callable, Coroutine, Dict, Literal, Optional
 import pytz
 
-from src.app.founding_rate_service.bitget_layer import BitgetClient
+from src.app.founding_rate_service.bitget_layer import BitgetClient, PreparedOrder
 from src.app.founding_rate_service.schedule_layer import ScheduleLayer
+from src.app.founding_rate_service.order_timer import OrderTimer
+from src.app.founding_rate_service.analysis_executor import AnalysisExecutor
+from src.app.founding_rate_service.ticker_stream import TickerStream
+from src.app.founding_rate_service.screener import FundingRateScreener
+from src.app.founding_rate_service.order_windows import analysis_for, decision_orders, order_window, pre_analysis_orders
+from src.app.founding_rate_service.order_job_store import OrderJob, OrderJobStore, order_job
 # from src.app.redis_service import RedisService
 from src.app.founding_rate_service.chart_analysis import FundingRateChart
+from src.app.utils import latency_summary
 from src.config import (
-    MIN_FOUNDING_RATE,
-    MAX_FOUNDING_RATE,
-    AMOUNT_ORDER
+    AMOUNT_ORDER,
+    PRE_ARM_SECONDS,
+    ORDER_CLOSE_RETRIES,
+    ORDER_CLOSE_RETRY_DELAY,
+    ANALYSIS_CONCURRENCY,
+    ANALYSIS_DEADLINE_SECONDS,
+    TICKER_STREAM_ENABLED
 )
 
 
 class FoundinRateService:
-    def __init__(self) -> None:
+    def __init__(self, bitget_client: Optional[BitgetClient] = None, job_store: Optional[OrderJobStore] = None) -> None:
         self.first_execution_times = [time(hour, minute) for hour in range(24) for minute in range(0, 60, 15)]
         self.timezone = "Europe/Amsterdam"
         self.next_execution_time: Optional[datetime] = None
@@ -27,9 +39,23 @@ class FoundinRateService:
         self.cryptos = []
 
         # Initialize clients
-        self.bitget_client = BitgetClient()
+        self.bitget_client = bitget_client or BitgetClient()
         # self.redis_service = RedisService()
         self.async_scheduler = ScheduleLayer(self.timezone)
+        self.order_timer = OrderTimer()
+        # Durable order timers, see recover_order_jobs
+        self.job_store = job_store
+        # Armed order timers by job id, an order is never armed twice in this process
+        self.order_tasks: Dict[str, asyncio.Task] = {}
+        # The running innit_procces, cancelled with the order timers when the engine stops
+        self.wave_task: Optional[asyncio.Task] = None
+        # Set by the app when leader election is on (only reported in the metrics)
+        self.leader_election = None
+        self.analysis_executor = AnalysisExecutor()
+        self.decision_latencies = deque(maxlen=500)
+        # Live funding rates over the public WebSocket, started in the app lifespan
+        self.ticker_stream = TickerStream(self.bitget_client) if TICKER_STREAM_ENABLED else None
+        self.screener = FundingRateScreener()
 
     def get_next_execution_time(self, ans: bool = False) -> datetime:
         timezone = pytz.timezone(self.timezone)
@@ -55,63 +81,44 @@ class FoundinRateService:
         return next_execution_datetime
 
     async def innit_procces(self):
+        self.wave_task = asyncio.current_task()
         try:
             print("Initiating the process! This function should be executed 5 minutes before the funding rate")
-            future_cryptos = await self.bitget_client.get_future_cryptos()
-            sorted_future_cryptos = self.bitget_client.fetch_future_cryptos(future_cryptos)
-
-            negative_funding_rate = [
-                {"symbol": d["symbol"], "mode": "long", "fundingRate": float(d["fundingRate"])}
-                for d in sorted_future_cryptos
-                if float(d["fundingRate"]) <= float(MIN_FOUNDING_RATE)
-            ]
+            if self.ticker_stream is not None and self.ticker_stream.is_fresh():
+                future_cryptos = self.ticker_stream.snapshot()
+            else:
+                future_cryptos = await self.bitget_client.get_future_cryptos()
+            screened = self.screener.screen(future_cryptos)
+
+            negative_funding_rate = screened["long"]
             for crypto in negative_funding_rate:
                 self.cryptos.append({"symbol": crypto["symbol"], "fundingRate": crypto["fundingRate"]})
 
-            positive_funding_rate = [
-                {"symbol": d["symbol"], "mode": "short", "fundingRate": float(d["fundingRate"])}
-                for d in sorted_future_cryptos
-                if float(d["fundingRate"]) >= float(MAX_FOUNDING_RATE)
-            ]
+            positive_funding_rate = screened["short"]
             for crypto in positive_funding_rate:
                 self.cryptos.append({"symbol": crypto["symbol"], "fundingRate": crypto["fundingRate"]})
 
+            # Keep the market caps of the candidates warm for the next waves
+            self.bitget_client.market_cap_cache.track(crypto["symbol"] for crypto in self.cryptos)
+
+            # Archive the funding events of every symbol once they are settled
+            symbols = [d.get("symbol") or d.get("instId") for d in future_cryptos.get("data", [])]
+            funding_delay = (self.get_next_execution_time() - datetime.now(pytz.timezone(self.timezone))).total_seconds() + 60
+            asyncio.create_task(self._schedule_after_delay(funding_delay, lambda: self.sync_funding_archive(symbols)))
+
             end_process = bool(negative_funding_rate or positive_funding_rate)
             if end_process:
                 print("There were cryptos to trade!!! Reprogramming in 5 min!")
                 for crypto in negative_funding_rate:
-                    if crypto['fundingRate'] < 1.3:
-                        asyncio.create_task(self.schedule_open_long(crypto, 'normal'))
-
-                    if crypto['fundingRate'] >= 3.0:
-                        limit = 60  # Define an appropriate limit value
-                        chart = FundingRateChart(crypto['symbol'], granularity='1min', limit=limit)
-                        last_funding_rates = chart.determine_by_past_funding_rates()
-                        if last_funding_rates['result'] == 'long':
-                            asyncio.create_task(self.schedule_open_long(crypto, last_funding_rates['type']))
-                        elif last_funding_rates['result'] == 'short':
-                            asyncio.create_task(self.schedule_open_short(crypto, last_funding_rates['type']))
-                        else:
-                            asyncio.create_task(self.schedule_open_short(crypto, 'after'))
-
-                    if crypto['fundingRate'] < 3.0:
-                        limit = (60 * 8) * 2  # 2 periods at this moment
-                        chart = FundingRateChart(crypto['symbol'], granularity='1min', limit=limit)
-                        await chart.fetch_data()
-                        await chart.fetch_funding_rate_expiration_time()
-
-                        # Open trades that involve analysis to the chart
-                        percentage, _ = chart.analyze_last_volatility()
-                        if percentage >= 1.5:  # If the last volatility was higher than 1.5, open short as 'after'
-                            asyncio.create_task(self.schedule_open_short(crypto, 'after'))
-                        else:
-                            incrementation_analysis = await chart.analyze_incrementation()
-
-                            if incrementation_analysis['result']:
-                                if incrementation_analysis['side'] == 'short':
-                                    asyncio.create_task(self.schedule_open_short(crypto, incrementation_analysis['type']))
-                                elif incrementation_analysis['side'] == 'long':
-                                    asyncio.create_task(self.schedule_open_long(crypto, incrementation_analysis['type']))
+                    for side, type in pre_analysis_orders(crypto):
+                        asyncio.create_task(self.schedule_order(crypto, side, type))
+
+                # Analyse every candidate concurrently, the ones not finished by the deadline are skipped
+                decisions = await self.analyse_candidates(negative_funding_rate, self.get_next_execution_time())
+
+                for crypto in negative_funding_rate:
+                    for side, type in decision_orders(crypto, decisions.get(crypto['symbol'])):
+                        asyncio.create_task(self.schedule_order(crypto, side, type))
 
             else:
                 print("There weren't cryptos to trade! Reprogramming for the next wave")
@@ -122,7 +129,69 @@ class FoundinRateService:
 
         except Exception as e:
             print(f"Error in innit_procces: {e}")
+        finally:
+            self.wave_task = None
+
+
+    async def analyse_candidates(self, candidates: list, funding_time: datetime) -> dict:
+        """
+        Analyse all candidate symbols concurrently (at most ANALYSIS_CONCURRENCY at a time).
+        Analyses still running ANALYSIS_DEADLINE_SECONDS before the funding time are cancelled
+        and their symbols left out of the result. Returns {symbol: decision}.
+        """
+        if not candidates:
+            return {}
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+        started = loop.time()
+        # When the analysis of every symbol got a slot, the time before it is queueing
+        acquired_at = {}
+
+        def record(symbol: str, status: Literal['done', 'timeout', 'error']):
+            now = loop.time()
+            acquired = acquired_at.get(symbol, now)
+            self._record_decision(symbol, status, (acquired - started) * 1000, (now - acquired) * 1000)
+
+        async def analyse(crypto: dict) -> dict:
+            async with semaphore:
+                acquired_at[crypto['symbol']] = loop.time()
+                # 2 periods, enough to compare the last and pre-last funding rates
+                chart = FundingRateChart(crypto['symbol'], granularity='1min', limit=(60 * 8) * 2, bitget_client=self.bitget_client)
+                decision = await chart.run_analysis(self.analysis_executor, analysis_for(crypto))
+
+            record(crypto['symbol'], 'done')
+            return decision
+
+        tasks = {asyncio.create_task(analyse(crypto)): crypto['symbol'] for crypto in candidates}
+        timeout = (funding_time - timedelta(seconds=ANALYSIS_DEADLINE_SECONDS) - datetime.now(pytz.timezone(self.timezone))).total_seconds()
+        done, pending = await asyncio.wait(tasks, timeout=max(timeout, 0))
+
+        for task in pending:
+            task.cancel()
+            record(tasks[task], 'timeout')
+            print(f"Analysis of {tasks[task]} didn't finish before the deadline, skipping it")
+
+        decisions = {}
+        for task in done:
+            if task.exception() is not None:
+                record(tasks[task], 'error')
+                print(f"Error analysing {tasks[task]}: {task.exception()}")
+                continue
+            decisions[tasks[task]] = task.result()
+
+        return decisions
+
+    async def sync_funding_archive(self, symbols: list):
+        archive = self.bitget_client.funding_archive
+        if archive is None:
+            return
+        added = await archive.sync_all(symbols, self.bitget_client.download_funding_history)
+        print(f"Funding rate archive synced, {added} new funding events")
 
+    def _record_decision(self, symbol: str, status: Literal['done', 'timeout', 'error'], queue_ms: float, compute_ms: float):
+        """queue_ms: waiting for an analysis slot since the fan-out started, compute_ms: fetch and analysis once it had one."""
+        self.decision_latencies.append({"symbol": symbol, "status": status, "queue_ms": round(queue_ms, 3), "compute_ms": round(compute_ms, 3)})
 
     def schedule_next_execution(self):
         next_execution_time = self.get_next_execution_time(ans=True) - timedelta(minutes=5)
@@ -136,114 +205,264 @@ class FoundinRateService:
 
         self.next_execution_time = next_execution_time
 
-    async def _schedule_after_delay(self, delay: float, coro):
+    async def _schedule_after_delay(self, delay: float, coro, label: Optional[str] = None):
         try:
-            await asyncio.sleep(delay)
+            await self.order_timer.sleep_until(self.order_timer.deadline_after(delay), label)
             await coro()
         except Exception as e:
             print(f"Error in scheduled task: {e}")
 
-    async def open_order(self, symbol: str, mode: str):
+    def _fencing_token(self) -> Optional[int]:
+        return self.leader_election.fencing_token if self.leader_election is not None else None
+
+    def _may_trade(self, token: Optional[int]) -> bool:
+        """
+        Whether orders armed under `token` may still be armed/sent: the service is running and,
+        with leader election, this replica still leads with the same fencing token. The order
+        executor doesn't check the token, so a deposed leader has to stop here.
+        """
+        if self.status != 'running':
+            return False
+        if self.leader_election is None:
+            return True
+        return self.leader_election.is_leader and self.leader_election.fencing_token == token
+
+    async def _schedule_armed_order(self, run_time: datetime, prepare: Callable[[], PreparedOrder], execute: Callable[[PreparedOrder], Coroutine], job: Optional[OrderJob] = None, stored: bool = False, token: Optional[int] = None):
+        """
+        Pre-arm an order PRE_ARM_SECONDS before run_time (payload + connection) and send it at run_time.
+        With a job store the job is saved first (unless already `stored`) and completed once sent,
+        a failed send leaves it in the store (closes are retried first, see _send_close_job).
+        Nothing is armed or sent once the engine stopped or lost the leadership it had under `token`.
+        """
+        try:
+            if self.job_store is not None and job is not None and not stored and not await self.job_store.add(job):
+                print(f"Order job {job['id']} is already scheduled")
+                return
+
+            deadline = self.order_timer.deadline_from_datetime(run_time)
+
+            await self.order_timer.sleep_until(deadline - PRE_ARM_SECONDS)
+            if not self._may_trade(token):
+                return
+            prepared = prepare()
+            await self.bitget_client.warm_up(prepared)
+
+            await self.order_timer.sleep_until(deadline, label=f"{prepared.action}:{prepared.symbol}")
+            if job is not None and job['action'] == 'close':
+                await self._send_close_job(job, prepared, token)
+                return
+
+            if not self._may_trade(token):
+                print(f"Not the active engine anymore, not sending {prepared.action}:{prepared.symbol}")
+                return
+
+            if await execute(prepared):
+                await self._complete_job(job)
+            elif job is not None and self.job_store is not None:
+                self.job_store.stats["failed"] += 1
+        except Exception as e:
+            print(f"Error in scheduled task: {e}")
+
+    def _track_order_job(self, job: OrderJob, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.order_tasks[job['id']] = task
+        task.add_done_callback(lambda _: self.order_tasks.pop(job['id'], None) if self.order_tasks.get(job['id']) is task else None)
+        return task
+
+    def cancel_order_jobs(self) -> int:
+        """
+        Cancel the running wave and every armed order timer (leadership lost, engine stopped).
+        Their jobs stay in the store for whoever runs the engine next.
+        """
+        if self.wave_task is not None and not self.wave_task.done():
+            print("Cancelling the running innit_procces")
+            self.wave_task.cancel()
+
+        tasks = list(self.order_tasks.values())
+        self.order_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            print(f"Cancelled {len(tasks)} armed order timers")
+        return len(tasks)
+
+    def _schedule_order_job(self, job: OrderJob, stored: bool = False) -> Optional[asyncio.Task]:
+        """
+        Start the timer of an order job, or return the one already armed for the same job id.
+        Returns None when this engine isn't allowed to trade (stopped, not the leader).
+        """
+        armed = self.order_tasks.get(job['id'])
+        if armed is not None and not armed.done():
+            print(f"Order job {job['id']} is already armed")
+            return armed
+
+        token = self._fencing_token()
+        if not self._may_trade(token):
+            print(f"Not the active engine, not arming the order job {job['id']}")
+            return None
+
+        symbol, side = job['symbol'], job['side']
+        if job['action'] == 'open':
+            prepare = lambda: self.bitget_client.prepare_open_order(symbol, AMOUNT_ORDER, side)
+            execute = lambda prepared: self.open_order(symbol, side, prepared)
+        else:
+            prepare = lambda: self.bitget_client.prepare_close_order(symbol)
+            execute = lambda prepared: self.close_order(symbol, prepared)
+
+        run_time = datetime.fromtimestamp(job['fire_at'] / 1000, pytz.timezone(self.timezone))
+        return self._track_order_job(job, self._schedule_armed_order(run_time, prepare, execute, job, stored, token))
+
+    async def _complete_job(self, job: Optional[OrderJob]):
+        if self.job_store is not None and job is not None:
+            await self.job_store.complete(job['id'])
+
+    async def _send_close_job(self, job: OrderJob, prepared: Optional[PreparedOrder] = None, token: Optional[int] = None) -> bool:
+        """
+        Send the close of a job, retried ORDER_CLOSE_RETRIES times with a doubling delay. The job
+        is only completed once the close was sent, otherwise it stays for the next recovery.
+        """
+        for attempt in range(ORDER_CLOSE_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(ORDER_CLOSE_RETRY_DELAY * 2 ** (attempt - 1))
+                print(f"Retrying the close of {job['symbol']} ({attempt}/{ORDER_CLOSE_RETRIES})")
+            if not self._may_trade(token):
+                print(f"Not the active engine anymore, leaving the close of {job['symbol']} to the next one")
+                return False
+            # A retry builds a new request, the prepared one is only valid once
+            if await self.close_order(job['symbol'], prepared if not attempt else None):
+                await self._complete_job(job)
+                return True
+
+        print(f"Close of {job['symbol']} failed, keeping the order job {job['id']}")
+        if self.job_store is not None:
+            self.job_store.stats["failed"] += 1
+        return False
+
+    async def recover_order_jobs(self) -> dict:
+        """
+        Resume the order timers left in the job store by a previous process (or a previous term
+        as leader). Overdue closes are sent at once, overdue opens are dropped (their funding
+        window is over) and the others are rescheduled. Jobs already armed here are skipped.
+        """
+        if self.job_store is None:
+            return {}
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        now_ms = int(datetime.now(pytz.utc).timestamp() * 1000)
+        token = self._fencing_token()
+
+        overdue_closes = []
+        for job in await self.job_store.jobs():
+            if job['id'] in self.order_tasks:
+                continue
+            if job['fire_at'] > now_ms:
+                if self._schedule_order_job(job, stored=True) is not None:
+                    self.job_store.stats["rescheduled"] += 1
+            elif job['action'] == 'close':
+                overdue_closes.append(job)
+            else:
+                print(f"Dropping the overdue order job {job['id']}")
+                await self.job_store.complete(job['id'])
+                self.job_store.stats["dropped_opens"] += 1
+
+        async def recover_close(job: OrderJob):
+            print(f"Recovering the overdue order job {job['id']}")
+            if await self._send_close_job(job, token=token):
+                self.job_store.stats["recovered_closes"] += 1
+
+        await asyncio.gather(*(self._track_order_job(job, recover_close(job)) for job in overdue_closes), return_exceptions=True)
+        await self.job_store.size()
+
+        self.job_store.stats["recovery_ms"] = round((loop.time() - started) * 1000, 3)
+        return self.job_store.metrics()
+
+    @staticmethod
+    def _order_job(symbol: str, action: Literal['open', 'close'], side: Literal['long', 'short'], type: str, run_time: datetime) -> OrderJob:
+        return order_job(symbol, action, side, type, int(run_time.timestamp() * 1000))
+
+    async def open_order(self, symbol: str, mode: str, prepared: Optional[PreparedOrder] = None) -> bool:
+        """Returns whether the order was sent."""
         try:
             print(f"Opening order: Symbol={symbol}, Mode={mode}")
-            await self.bitget_client.open_order(
-                symbol=symbol,
-                amount=AMOUNT_ORDER,
-                mode=mode
-            )
+            if prepared is not None:
+                await self.bitget_client.send_prepared_order(prepared)
+            else:
+                await self.bitget_client.open_order(
+                    symbol=symbol,
+                    amount=AMOUNT_ORDER,
+                    mode=mode
+                )
+            return True
         except Exception as e:
             print(f"Error opening order for {symbol} in {mode} mode: {e}")
+            return False
 
-    async def close_order(self, symbol: str):
+    async def close_order(self, symbol: str, prepared: Optional[PreparedOrder] = None) -> bool:
+        """Returns whether the order was sent."""
         try:
             print(f"Closing order: Symbol={symbol}")
-            await self.bitget_client.close_order(symbol)
+            if prepared is not None:
+                await self.bitget_client.send_prepared_order(prepared)
+            else:
+                await self.bitget_client.close_order(symbol)
 
             save_operation_time = datetime.now(pytz.timezone(self.timezone)) + timedelta(seconds=30)
             delay = (save_operation_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
             delay = max(delay, 0)  # Ensure non-negative delay
 
             asyncio.create_task(self._schedule_after_delay(delay, lambda: self.save_operation(symbol)))
+            return True
         except Exception as e:
             print(f"Error closing order for {symbol}: {e}")
+            return False
 
-    async def schedule_open_long(self, crypto: dict, type: Literal['normal', 'after', 'after-variation'] = 'normal', close_delay: Optional[int] = 5) -> None:
-        symbol = crypto['symbol']
-        print(f"Scheduling a long for {symbol}, type: {type}")
-
-        stmx = self.get_next_execution_time()
-        if type == 'normal':
-            """Open a long 45 secs before and close 15 secs after the funding rate"""
-            open_long_time = stmx - timedelta(seconds=45)
-            delay_open = (open_long_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
-
-            close_time = stmx + timedelta(seconds=15)
-            delay_close = (close_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
-
-        elif type == 'after':
-            """Open a long 15 secs after the funding rate and close after a delay"""
-            open_long_time = stmx + timedelta(seconds=15)
-            delay_open = (open_long_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
+    async def schedule_order(self, crypto: dict, side: Literal['long', 'short'], type: Literal['normal', 'after', 'after-variation'] = 'normal', close_delay: Optional[int] = None) -> None:
+        if side == 'long':
+            await self.schedule_open_long(crypto, type, close_delay)
+        else:
+            await self.schedule_open_short(crypto, type)
 
-            close_time = open_long_time + timedelta(minutes=close_delay)
-            delay_close = (close_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
+    def _order_times(self, side: Literal['long', 'short'], type: str, close_delay: Optional[int] = None) -> Optional[tuple]:
+        """Open and close times around the next funding time, see ORDER_WINDOWS."""
+        try:
+            open_offset, close_offset = order_window(side, type, close_delay)
+        except KeyError:
+            print(f"Unknown type {type} for scheduling open {side}.")
+            return None
 
-        elif type == 'after-variation':
-            """Open long after funding rate and close after 5 hours"""
-            open_long_time = stmx + timedelta(minutes=2)
-            delay_open = (open_long_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
+        stmx = self.get_next_execution_time()
+        return stmx + timedelta(seconds=open_offset), stmx + timedelta(seconds=close_offset)
 
-            close_time = open_long_time + timedelta(hours=5)
-            delay_close = (close_time - datetime.now(pytz.timezone(self.timezone))).total_seconds()
+    async def schedule_open_long(self, crypto: dict, type: Literal['normal', 'after', 'after-variation'] = 'normal', close_delay: Optional[int] = 5) -> None:
+        symbol = crypto['symbol']
+        print(f"Scheduling a long for {symbol}, type: {type}")
 
-        else:
-            print(f"Unknown type {type} for scheduling open long.")
+        order_times = self._order_times('long', type, close_delay)
+        if order_times is None:
             return
-
-        delay_open = max(delay_open, 0)
-        delay_close = max(delay_close, 0)
+        open_long_time, close_time = order_times
 
         print(f"Scheduled to open long for {symbol} at {open_long_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        asyncio.create_task(self._schedule_after_delay(delay_open, lambda: self.open_order(symbol, 'long')))
+        self._schedule_order_job(self._order_job(symbol, 'open', 'long', type, open_long_time))
 
         print(f"Scheduled to close long for {symbol} at {close_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        asyncio.create_task(self._schedule_after_delay(delay_close, lambda: self.close_order(symbol)))
+        self._schedule_order_job(self._order_job(symbol, 'close', 'long', type, close_time))
 
     async def schedule_open_short(self, crypto: dict, type: Literal['normal', 'after', 'after-variation'] = 'normal') -> None:
         symbol = crypto['symbol']
         print(f"Scheduling a short for {symbol}, type: {type}")
 
-        stmx = self.get_next_execution_time()
-        if type == 'normal':
-            """Open a short 45 secs before and close 15 secs after the funding rate"""
-            operation_open = stmx - timedelta(seconds=45)
-            operation_close = stmx + timedelta(seconds=15)
-
-        elif type == 'after':
-            """Open a short 15 secs after the funding rate and close after 60 secs"""
-            operation_open = stmx + timedelta(seconds=15)
-            operation_close = operation_open + timedelta(seconds=60)
-
-        elif type == 'after-variation':
-            """Open short after funding rate and close after 10 minutes"""
-            operation_open = stmx + timedelta(seconds=15)
-            operation_close = operation_open + timedelta(minutes=10)
-
-        else:
-            print(f"Unknown type {type} for scheduling open short.")
+        order_times = self._order_times('short', type)
+        if order_times is None:
             return
-
-        delay_open = (operation_open - datetime.now(pytz.timezone(self.timezone))).total_seconds()
-        delay_close = (operation_close - datetime.now(pytz.timezone(self.timezone))).total_seconds()
-
-        delay_open = max(delay_open, 0)
-        delay_close = max(delay_close, 0)
+        operation_open, operation_close = order_times
 
         print(f"Scheduled to open short for {symbol} at {operation_open.strftime('%Y-%m-%d %H:%M:%S')}")
-        asyncio.create_task(self._schedule_after_delay(delay_open, lambda: self.open_order(symbol, 'short')))
+        self._schedule_order_job(self._order_job(symbol, 'open', 'short', type, operation_open))
 
         print(f"Scheduled to close short for {symbol} at {operation_close.strftime('%Y-%m-%d %H:%M:%S')}")
-        asyncio.create_task(self._schedule_after_delay(delay_close, lambda: self.close_order(symbol)))
+        self._schedule_order_job(self._order_job(symbol, 'close', 'short', type, operation_close))
 
     async def start_service(self):
         if self.status == 'running':
@@ -263,6 +482,31 @@ class FoundinRateService:
         print("Stopping FoundinRateService...")
         # Implement any necessary cleanup here
 
+    def metrics(self) -> dict:
+        """Runtime metrics of the service and its clients."""
+        return {
+            "status": self.status,
+            "next_execution_time": self.next_execution_time.isoformat() if self.next_execution_time else None,
+            "bitget_pool": self.bitget_client.pool_stats(),
+            "rate_limiter": self.bitget_client.rate_limiter.stats(),
+            "single_flight": self.bitget_client.single_flight.metrics(),
+            "market_caps": self.bitget_client.market_cap_cache.metrics(),
+            "funding_archive": self.bitget_client.funding_archive.metrics() if self.bitget_client.funding_archive else None,
+            "ticker_stream": self.ticker_stream.stats() if self.ticker_stream else None,
+            "candle_store": self.bitget_client.candle_store.stats if self.bitget_client.candle_store else None,
+            "order_latency": self.bitget_client.order_latency_stats(),
+            "order_timer": self.order_timer.skew_stats(),
+            "order_jobs": self.job_store.metrics() if self.job_store else None,
+            "leader": self.leader_election.metrics() if self.leader_election else None,
+            "decision_latency": {
+                "summary": latency_summary(d["compute_ms"] for d in self.decision_latencies if d["status"] == 'done'),
+                "queue": latency_summary(d["queue_ms"] for d in self.decision_latencies if d["status"] == 'done'),
+                "timeouts": sum(1 for d in self.decision_latencies if d["status"] == 'timeout'),
+                "errors": sum(1 for d in self.decision_latencies if d["status"] == 'error'),
+                "last": list(self.decision_latencies)[-20:]
+            }
+        }
+
     ### TESTING - DELETE THIS IF NOT NEEDED ####
     def test_schedule(self):
         order_time = datetime.now(pytz.timezone(self.timezone)) + timedelta(seconds=30)
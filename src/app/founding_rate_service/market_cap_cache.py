@@ -0,0 +1,181 @@
+# market_cap_cache.py
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from src.app.founding_rate_service.single_flight import SingleFlight
+from src.config import MARKET_CAP_SNAPSHOT_PATH, MARKET_CAP_TTL, MARKET_CAP_NOT_FOUND_TTL, MARKET_CAP_REFRESH_INTERVAL
+
+MarketCapFetcher = Callable[[List[str]], Awaitable[Dict[str, float]]]
+
+
+def base_symbol(symbol: str) -> str:
+    """'BTCUSDT' -> 'BTC', the symbol CoinMarketCap knows."""
+    symbol = symbol.upper()
+    return symbol[:-4] if symbol.endswith('USDT') else symbol
+
+
+class MarketCapCache:
+    """
+    In-memory market caps of the symbols of interest with stale-while-revalidate reads.
+
+    All tracked symbols are fetched in one batched quotes call, refreshed in the background every
+    `refresh_interval` seconds and saved to a JSON snapshot that is loaded on start, so a cold
+    start doesn't hit the API. A read older than `ttl` returns the stale value at once and
+    triggers a background refresh; only unknown symbols wait for the network. Symbols the fetcher
+    reports as not found (None) are answered with None for `not_found_ttl` seconds and only
+    tracked once they resolve.
+    """
+
+    def __init__(self, fetcher: MarketCapFetcher, snapshot_path: str = MARKET_CAP_SNAPSHOT_PATH, ttl: float = MARKET_CAP_TTL,
+                 refresh_interval: float = MARKET_CAP_REFRESH_INTERVAL, not_found_ttl: float = MARKET_CAP_NOT_FOUND_TTL):
+        self.fetcher = fetcher
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.not_found_ttl = not_found_ttl
+
+        # base symbol -> {"market_cap": float, "fetched_at": epoch seconds}
+        self.entries: Dict[str, dict] = {}
+        self.tracked = {'BTC'}
+        # base symbol -> epoch seconds it was reported as not found
+        self.not_found: Dict[str, float] = {}
+        self._single_flight = SingleFlight()
+        # Unknown symbols read in the same loop tick are fetched together
+        self._pending = set()
+        self._pending_batch: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "not_found_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "last_refresh": None
+        }
+
+        self.load_snapshot()
+
+    def track(self, symbols: Iterable[str]):
+        """Add symbols to the ones refreshed in the background, except the ones recently not found."""
+        self.tracked.update(symbol for symbol in map(base_symbol, symbols) if not self._is_not_found(symbol))
+
+    def _is_not_found(self, symbol: str) -> bool:
+        return time.time() - self.not_found.get(symbol, float('-inf')) <= self.not_found_ttl
+
+    async def get(self, symbol: str) -> Optional[float]:
+        symbol = base_symbol(symbol)
+        entry = self.entries.get(symbol)
+
+        if entry is not None:
+            if time.time() - entry["fetched_at"] <= self.ttl:
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+                self._refresh_in_background()
+            return entry["market_cap"]
+
+        if self._is_not_found(symbol):
+            self.stats["not_found_hits"] += 1
+            return None
+
+        self.stats["misses"] += 1
+        self._pending.add(symbol)
+        if self._pending_batch is None:
+            self._pending_batch = asyncio.ensure_future(self._fetch_pending())
+        await asyncio.shield(self._pending_batch)
+        entry = self.entries.get(symbol)
+        return entry["market_cap"] if entry else None
+
+    async def refresh(self, symbols: Optional[List[str]] = None) -> int:
+        """Fetch the market caps of the symbols (all tracked ones by default) in one batch, returns how many were updated."""
+        symbols = sorted(self.tracked if symbols is None else symbols)
+        try:
+            market_caps = await self.fetcher(symbols)
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            print(f"Error refreshing market caps: {e}")
+            return 0
+
+        if not market_caps:
+            self.stats["refresh_errors"] += 1
+            return 0
+
+        now = time.time()
+        for symbol, market_cap in market_caps.items():
+            if market_cap is not None:
+                self.entries[symbol] = {"market_cap": market_cap, "fetched_at": now}
+                self.tracked.add(symbol)
+                self.not_found.pop(symbol, None)
+            elif symbol not in self.entries:
+                # Never resolved: not refreshed again, reads get None until not_found_ttl passes
+                self.not_found[symbol] = now
+                self.tracked.discard(symbol)
+
+        self.stats["refreshes"] += 1
+        self.stats["last_refresh"] = now
+        self.save_snapshot()
+        return sum(market_cap is not None for market_cap in market_caps.values())
+
+    async def _fetch_pending(self):
+        await asyncio.sleep(0)
+        symbols, self._pending, self._pending_batch = sorted(self._pending), set(), None
+        await self.refresh(symbols)
+
+    def _refresh_in_background(self):
+        asyncio.ensure_future(self._single_flight.do(('all',), self.refresh))
+
+    def load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as snapshot_file:
+                self.entries.update(json.load(snapshot_file))
+            self.tracked.update(self.entries)
+        except (OSError, ValueError) as e:
+            print(f"Could not load the market caps snapshot: {e}")
+
+    def save_snapshot(self):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w') as snapshot_file:
+            json.dump(self.entries, snapshot_file)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            # The first refresh is skipped when the snapshot is recent enough
+            last_refresh = self.stats["last_refresh"] or max((entry["fetched_at"] for entry in self.entries.values()), default=0)
+            await asyncio.sleep(max(last_refresh + self.refresh_interval - time.time(), 0))
+
+            if not await self._single_flight.do(('all',), self.refresh):
+                # Retry a failed refresh later instead of spinning on the stale entries
+                await asyncio.sleep(min(60, self.refresh_interval))
+
+    def metrics(self) -> dict:
+        now = time.time()
+        return {
+            **self.stats,
+            "symbols": len(self.entries),
+            "tracked": len(self.tracked),
+            "not_found": len(self.not_found),
+            "oldest_age_s": round(now - min(e["fetched_at"] for e in self.entries.values()), 1) if self.entries else None
+        }
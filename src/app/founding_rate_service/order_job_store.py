@@ -0,0 +1,96 @@
+# order_job_store.py
+
+import json
+import time
+from typing import List, Literal, Optional, TypedDict
+
+import redis.asyncio as aioredis
+
+# Job data by id, and the ids scored by fire time (epoch ms)
+ORDER_JOBS_KEY = "order_jobs"
+ORDER_JOBS_DUE_KEY = "order_jobs:due"
+
+
+class OrderJob(TypedDict):
+    id: str
+    symbol: str
+    action: Literal['open', 'close']
+    side: Literal['long', 'short']
+    type: str
+    fire_at: int  # Epoch ms
+    created_at: int
+
+
+def order_job(symbol: str, action: Literal['open', 'close'], side: Literal['long', 'short'], type: str, fire_at: int) -> OrderJob:
+    """
+    Job of an order timer. The id only depends on what the order is and when it fires, so
+    scheduling the same order twice (a retried innit_procces, a second replica) is a no-op.
+    """
+    return {
+        "id": f"{symbol}:{action}:{side}:{fire_at}",
+        "symbol": symbol,
+        "action": action,
+        "side": side,
+        "type": type,
+        "fire_at": fire_at,
+        "created_at": int(time.time() * 1000)
+    }
+
+
+class OrderJobStore:
+    """
+    Durable order timers in Redis. A job is added when its timer is scheduled and completed once
+    the order was sent, so the jobs left after a restart are the timers that never fired.
+    """
+
+    def __init__(self, client: aioredis.Redis):
+        self._r = client
+        self.stats = {
+            "added": 0,
+            "duplicates": 0,
+            "completed": 0,
+            # Sends that failed, the job stays in the store
+            "failed": 0,
+            "recovered_closes": 0,
+            "dropped_opens": 0,
+            "rescheduled": 0,
+            "recovery_ms": None,
+            # As of the last write of this process
+            "queue_size": None
+        }
+
+    async def close(self) -> None:
+        await self._r.aclose()
+
+    async def add(self, job: OrderJob) -> bool:
+        """Store a job, returns False when a job with the same id already exists."""
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(ORDER_JOBS_KEY, job["id"], json.dumps(job))
+            pipe.zadd(ORDER_JOBS_DUE_KEY, {job["id"]: job["fire_at"]}, nx=True)
+            pipe.zcard(ORDER_JOBS_DUE_KEY)
+            added, _, self.stats["queue_size"] = await pipe.execute()
+
+        self.stats["added" if added else "duplicates"] += 1
+        return bool(added)
+
+    async def complete(self, job_id: str) -> None:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hdel(ORDER_JOBS_KEY, job_id)
+            pipe.zrem(ORDER_JOBS_DUE_KEY, job_id)
+            pipe.zcard(ORDER_JOBS_DUE_KEY)
+            _, _, self.stats["queue_size"] = await pipe.execute()
+        self.stats["completed"] += 1
+
+    async def jobs(self, until_ms: Optional[int] = None) -> List[OrderJob]:
+        """Stored jobs firing up to `until_ms` (all by default), by fire time."""
+        job_ids = await self._r.zrangebyscore(ORDER_JOBS_DUE_KEY, "-inf", until_ms if until_ms is not None else "+inf")
+        if not job_ids:
+            return []
+        return [json.loads(data) for data in await self._r.hmget(ORDER_JOBS_KEY, job_ids) if data is not None]
+
+    async def size(self) -> int:
+        self.stats["queue_size"] = await self._r.zcard(ORDER_JOBS_DUE_KEY)
+        return self.stats["queue_size"]
+
+    def metrics(self) -> dict:
+        return dict(self.stats)
@@ -0,0 +1,161 @@
+# order_timer.py
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Coroutine, Optional
+
+import pytz
+
+from src.app.utils import latency_summary
+from src.config import ORDER_TIMER_SPIN_MS, ORDER_TIMER_THREAD
+
+
+class OrderTimerStopped(Exception):
+    """The order timer was stopped before the deadline of a wait."""
+
+
+class OrderTimer:
+    """
+    High precision timer for order deadlines.
+
+    Deadlines live on the monotonic clock (the same one asyncio uses), so wall clock
+    adjustments can't move an order. The timer coarse-sleeps until `spin_window` seconds
+    before the deadline. On the event loop the rest is waited with `asyncio.sleep(0)` yields,
+    so other tasks keep running; with `dedicated_thread=True` a background thread busy-waits
+    it and wakes the event loop at the deadline, so a stalled loop only delays the hand-off
+    instead of the whole sleep. Stopping the timer fails the pending waits with OrderTimerStopped.
+
+    Every labelled wait records its scheduling skew (actual - intended fire time).
+    """
+
+    def __init__(self, spin_window: float = ORDER_TIMER_SPIN_MS / 1000, dedicated_thread: bool = ORDER_TIMER_THREAD):
+        self.spin_window = spin_window
+        self.dedicated_thread = dedicated_thread
+        self.skews = deque(maxlen=1000)
+
+        # Dedicated thread state
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def deadline_from_datetime(self, run_time: datetime) -> float:
+        """Translate a wall clock datetime into a monotonic deadline."""
+        now = datetime.now(run_time.tzinfo or pytz.utc)
+        return time.monotonic() + (run_time - now).total_seconds()
+
+    def deadline_after(self, delay: float) -> float:
+        """Monotonic deadline `delay` seconds from now."""
+        return time.monotonic() + max(delay, 0)
+
+    async def sleep_until(self, deadline: float, label: Optional[str] = None) -> float:
+        """Wait until the monotonic deadline and return the skew in milliseconds."""
+        if self.dedicated_thread:
+            await self._thread_wait(deadline)
+        else:
+            await self._loop_wait(deadline)
+
+        actual = time.monotonic()
+        skew_ms = (actual - deadline) * 1000
+        if label is not None:
+            self.skews.append({
+                "label": label,
+                "intended": deadline,
+                "actual": actual,
+                "skew_ms": round(skew_ms, 3)
+            })
+        return skew_ms
+
+    async def run_at(self, run_time: datetime, coro: Callable[[], Coroutine], label: Optional[str] = None):
+        """Run the coroutine function at run_time."""
+        await self.sleep_until(self.deadline_from_datetime(run_time), label)
+        return await coro()
+
+    async def _loop_wait(self, deadline: float):
+        # Coarse sleep, asyncio may wake up a bit early or late
+        remaining = deadline - time.monotonic()
+        while remaining > self.spin_window:
+            await asyncio.sleep(remaining - self.spin_window)
+            remaining = deadline - time.monotonic()
+
+        # Yield to the other tasks until the deadline, a busy-wait here would block the loop
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0)
+
+    async def _thread_wait(self, deadline: float):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), loop, future))
+            self._ensure_thread()
+            self._condition.notify()
+
+        await future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run_thread, name="order-timer", daemon=True)
+            self._thread.start()
+
+    def _run_thread(self):
+        while True:
+            with self._condition:
+                while self._running and not self._heap:
+                    self._condition.wait()
+                if not self._running:
+                    return
+
+                deadline, _, loop, future = self._heap[0]
+                remaining = deadline - time.monotonic() - self.spin_window
+                if remaining > 0:
+                    # Woken up early by a new (maybe sooner) deadline or the timeout itself
+                    self._condition.wait(timeout=remaining)
+                    continue
+
+                heapq.heappop(self._heap)
+
+            while time.monotonic() < deadline:
+                pass
+
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._resolve, future)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    @staticmethod
+    def _fail(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(OrderTimerStopped("Order timer stopped before the deadline"))
+
+    def stop(self):
+        """Stop the dedicated thread, the pending waits raise OrderTimerStopped."""
+        with self._condition:
+            self._running = False
+            pending, self._heap = self._heap, []
+            self._condition.notify_all()
+
+        for _, _, loop, future in pending:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._fail, future)
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def skew_stats(self) -> dict:
+        """Scheduling skew summary and the last recorded fires."""
+        return {
+            "mode": "thread" if self.dedicated_thread else "loop",
+            "skew": latency_summary(s["skew_ms"] for s in self.skews),
+            "last": [{"label": s["label"], "skew_ms": s["skew_ms"]} for s in list(self.skews)[-10:]]
+        }
@@ -0,0 +1,63 @@
+# order_windows.py
+
+from typing import List, Literal, Optional, Tuple
+
+from src.app.founding_rate_service.strategy_params import DEFAULT_PARAMS, StrategyParams
+
+"""
+    Trading rules shared by the live service and the backtester: which orders a candidate gets
+    and when they are opened/closed relative to its funding time.
+"""
+
+Side = Literal['long', 'short']
+OrderType = Literal['normal', 'after', 'after-variation']
+
+# (side, type) -> (open, close) offsets in seconds from the funding time
+ORDER_WINDOWS = {
+    # Open 45 secs before and close 15 secs after the funding rate
+    ('long', 'normal'): (-45, 15),
+    # Open 15 secs after the funding rate and close after a delay (5 minutes by default)
+    ('long', 'after'): (15, 15 + 5 * 60),
+    # Open 2 minutes after the funding rate and close after 5 hours
+    ('long', 'after-variation'): (2 * 60, 2 * 60 + 5 * 3600),
+    ('short', 'normal'): (-45, 15),
+    # Open 15 secs after the funding rate and close after 60 secs
+    ('short', 'after'): (15, 15 + 60),
+    # Open 15 secs after the funding rate and close after 10 minutes
+    ('short', 'after-variation'): (15, 15 + 10 * 60),
+}
+
+
+def order_window(side: Side, type: OrderType, close_delay: Optional[int] = None) -> Tuple[int, int]:
+    """Open and close offsets in seconds, `close_delay` (minutes) overrides the delay of a 'long after'."""
+    open_offset, close_offset = ORDER_WINDOWS[(side, type)]
+    if close_delay is not None and (side, type) == ('long', 'after'):
+        close_offset = open_offset + close_delay * 60
+    return open_offset, close_offset
+
+
+def pre_analysis_orders(crypto: dict, params: StrategyParams = DEFAULT_PARAMS) -> List[Tuple[Side, OrderType]]:
+    """Orders of a long candidate scheduled straight away, before its analysis."""
+    if crypto['fundingRate'] < params.normal_long_cutoff:
+        return [('long', 'normal')]
+    return []
+
+
+def decision_orders(crypto: dict, decision: Optional[dict], params: StrategyParams = DEFAULT_PARAMS) -> List[Tuple[Side, OrderType]]:
+    """Orders of a long candidate once its analysis decision is known."""
+    if decision is None:
+        return []
+
+    if crypto['fundingRate'] >= params.past_funding_rates_cutoff:
+        if decision['side'] in ('long', 'short'):
+            return [(decision['side'], decision['type'])]
+        return [('short', 'after')]
+
+    if decision.get('result') and decision['side'] in ('long', 'short'):
+        return [(decision['side'], decision['type'])]
+
+    return []
+
+
+def analysis_for(crypto: dict, params: StrategyParams = DEFAULT_PARAMS) -> Literal['incrementation', 'past_funding_rates']:
+    return 'past_funding_rates' if crypto['fundingRate'] >= params.past_funding_rates_cutoff else 'incrementation'
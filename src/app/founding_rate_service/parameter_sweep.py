@@ -0,0 +1,260 @@
+# parameter_sweep.py
+
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.founding_rate_service.backtester import TRADE_DTYPE, backtest_symbol, summarize
+from src.app.founding_rate_service.candle_store import CANDLE_DTYPE, CandleStore
+from src.app.founding_rate_service.funding_rate_archive import FundingRateArchive
+from src.app.founding_rate_service.strategy_params import DEFAULT_PARAMS, StrategyParams
+from src.config import CANDLE_STORE_DIR, FUNDING_ARCHIVE_DIR
+
+"""
+    Grid/random search of the StrategyParams over the archived data. The candles and funding events
+    of every symbol are copied once into shared memory, the worker processes attach to it and
+    backtest a parameter set each over the whole dataset.
+"""
+
+# Values of the default grid (3 * 3 * 3 * 3 = 81 parameter sets)
+DEFAULT_GRID = {
+    'min_funding_rate': [-1.0, -0.5, -0.3],
+    'min_percentage': [5.0, 10.0, 15.0],
+    'drop_from_highest': [10.0, 15.0, 20.0],
+    'two_days_volatility': [10.0, 15.0, 20.0]
+}
+
+# (low, high) ranges of the default random search. The backtest only replays long candidates
+# (negative funding rates), so max_funding_rate and the positive normal_long_cutoff and
+# past_funding_rates_cutoff never change its result and aren't searched
+DEFAULT_SPACE = {
+    'min_funding_rate': (-1.5, -0.1),
+    'min_percentage': (3.0, 20.0),
+    'min_percentage_short_term': (1.0, 10.0),
+    'drop_from_highest': (5.0, 25.0),
+    'two_days_volatility': (5.0, 25.0)
+}
+
+RESULT_COLUMNS = ['rank', 'trades', 'win_rate', 'mean_pnl_pct', 'total_pnl_pct', 'max_drawdown_pct', 'total_pnl_usdt']
+# Metrics where lower is better, ranked in ascending order by default
+COST_COLUMNS = {'max_drawdown_pct'}
+
+
+def grid(values: Dict[str, Sequence[float]] = DEFAULT_GRID, base: StrategyParams = DEFAULT_PARAMS) -> List[StrategyParams]:
+    """Every combination of the given values, the other parameters are taken from `base`."""
+    names = list(values)
+    return [replace(base, **dict(zip(names, combination))) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def random_search(space: Dict[str, Tuple[float, float]] = DEFAULT_SPACE, samples: int = 100, seed: int = 0, base: StrategyParams = DEFAULT_PARAMS) -> List[StrategyParams]:
+    """`samples` parameter sets drawn uniformly from the (low, high) ranges of `space`."""
+    rng = random.Random(seed)
+    return [replace(base, **{name: round(rng.uniform(low, high), 3) for name, (low, high) in space.items()}) for _ in range(samples)]
+
+
+class SharedDataset:
+    """
+    Candles (CANDLE_DTYPE) and funding events (int64 times, float32 rates) of several symbols,
+    concatenated in 3 shared memory blocks. `offsets` delimit each symbol, `spec()` is what the
+    workers need to `attach` (block names and offsets, no array data is pickled).
+    """
+
+    def __init__(self, symbols: List[str], blocks: Dict[str, SharedMemory], lengths: Dict[str, int], candle_offsets: List[int], funding_offsets: List[int], owner: bool):
+        self.symbols = symbols
+        self.blocks = blocks
+        self.lengths = lengths
+        self.candle_offsets = candle_offsets
+        self.funding_offsets = funding_offsets
+        self.owner = owner
+
+        self.candles = np.ndarray(lengths['candles'], dtype=CANDLE_DTYPE, buffer=blocks['candles'].buf)
+        self.funding_times = np.ndarray(lengths['funding'], dtype=np.int64, buffer=blocks['funding_times'].buf)
+        self.funding_rates = np.ndarray(lengths['funding'], dtype=np.float32, buffer=blocks['funding_rates'].buf)
+
+    @classmethod
+    def create(cls, symbols: List[str], candle_store_dir: str = CANDLE_STORE_DIR, archive_dir: str = FUNDING_ARCHIVE_DIR) -> "SharedDataset":
+        store, archive = CandleStore(candle_store_dir), FundingRateArchive(archive_dir)
+        candles = [store.load(symbol, '1m') for symbol in symbols]
+        funding = [archive.load(symbol) for symbol in symbols]
+
+        candle_offsets = np.concatenate([[0], np.cumsum([len(c) for c in candles])]).astype(int).tolist()
+        funding_offsets = np.concatenate([[0], np.cumsum([len(f[0]) for f in funding])]).astype(int).tolist()
+        lengths = {'candles': candle_offsets[-1], 'funding': funding_offsets[-1]}
+
+        sizes = {
+            'candles': lengths['candles'] * CANDLE_DTYPE.itemsize,
+            'funding_times': lengths['funding'] * 8,
+            'funding_rates': lengths['funding'] * 4
+        }
+        # A shared memory block can't be empty
+        blocks = {name: SharedMemory(create=True, size=max(size, 1)) for name, size in sizes.items()}
+        dataset = cls(symbols, blocks, lengths, candle_offsets, funding_offsets, owner=True)
+
+        for i in range(len(symbols)):
+            dataset.candles[candle_offsets[i]:candle_offsets[i + 1]] = candles[i]
+            dataset.funding_times[funding_offsets[i]:funding_offsets[i + 1]] = funding[i][0]
+            dataset.funding_rates[funding_offsets[i]:funding_offsets[i + 1]] = funding[i][1]
+
+        return dataset
+
+    def spec(self) -> dict:
+        return {
+            "symbols": self.symbols,
+            "blocks": {name: block.name for name, block in self.blocks.items()},
+            "lengths": self.lengths,
+            "candle_offsets": self.candle_offsets,
+            "funding_offsets": self.funding_offsets
+        }
+
+    @classmethod
+    def attach(cls, spec: dict) -> "SharedDataset":
+        # The spawned workers share the resource tracker of the creator, which unlinks the blocks
+        blocks = {name: SharedMemory(name=block_name) for name, block_name in spec["blocks"].items()}
+        return cls(spec["symbols"], blocks, spec["lengths"], spec["candle_offsets"], spec["funding_offsets"], owner=False)
+
+    def symbol(self, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the candles, funding times and funding rates of a symbol."""
+        candles = self.candles[self.candle_offsets[index]:self.candle_offsets[index + 1]]
+        low, high = self.funding_offsets[index], self.funding_offsets[index + 1]
+        return candles, self.funding_times[low:high], self.funding_rates[low:high]
+
+    def close(self):
+        # The arrays have to be released before the buffers
+        self.candles = self.funding_times = self.funding_rates = None
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+
+
+# Dataset of the worker process, attached once by the pool initializer
+_dataset: Optional[SharedDataset] = None
+
+
+def _attach_worker(spec: dict):
+    global _dataset
+    _dataset = SharedDataset.attach(spec)
+
+
+def max_drawdown(trades: np.ndarray) -> float:
+    """Largest drop of the cumulative PnL (% of notional), trades taken in closing order."""
+    if trades.size == 0:
+        return 0.0
+    equity = np.cumsum(trades['pnl'][np.argsort(trades['close_time'], kind='stable')])
+    return float((np.maximum.accumulate(np.maximum(equity, 0)) - equity).max())
+
+
+def evaluate(params: StrategyParams, settings: dict) -> dict:
+    """Backtest one parameter set over every symbol of the attached dataset."""
+    started = time.perf_counter()
+    results = [backtest_symbol(symbol, *_dataset.symbol(i), params=params, **settings) for i, symbol in enumerate(_dataset.symbols)]
+
+    trades = np.concatenate([result[0] for result in results]) if results else np.zeros(0, dtype=TRADE_DTYPE)
+    summary = summarize(trades, [latency for result in results for latency in result[1]], settings.get("latency_ms", 0))
+
+    return {
+        **params.to_dict(),
+        "trades": summary["trades"],
+        "win_rate": summary["win_rate"],
+        "mean_pnl_pct": summary["mean_pnl_pct"],
+        "total_pnl_pct": summary["total_pnl_pct"],
+        "max_drawdown_pct": round(max_drawdown(trades), 4),
+        "total_pnl_usdt": summary["total_pnl_usdt"],
+        "elapsed_s": round(time.perf_counter() - started, 3)
+    }
+
+
+def run_sweep(param_sets: List[StrategyParams], symbols: Optional[List[str]] = None, candle_store_dir: str = CANDLE_STORE_DIR,
+              archive_dir: str = FUNDING_ARCHIVE_DIR, workers: int = os.cpu_count() or 1, rank_by: str = 'total_pnl_pct',
+              latency_ms: float = 50.0, fee_rate: float = 0.06, descending: Optional[bool] = None) -> List[dict]:
+    """
+    Evaluate the parameter sets in `workers` processes, returns the results ranked by `rank_by`:
+    highest first, or lowest first for COST_COLUMNS unless `descending` is given.
+    """
+    global _dataset
+    symbols = list(symbols) if symbols is not None else FundingRateArchive(archive_dir).symbols()
+    settings = {"latency_ms": latency_ms, "fee_rate": fee_rate}
+
+    dataset = SharedDataset.create(symbols, candle_store_dir, archive_dir)
+    try:
+        if workers > 1:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_attach_worker, initargs=(dataset.spec(),)) as executor:
+                rows = list(executor.map(evaluate, param_sets, [settings] * len(param_sets)))
+        else:
+            _dataset = dataset
+            rows = [evaluate(params, settings) for params in param_sets]
+            _dataset = None
+    finally:
+        dataset.close()
+
+    if descending is None:
+        descending = rank_by not in COST_COLUMNS
+    # Missing values rank last either way
+    missing = float('-inf') if descending else float('inf')
+    rows.sort(key=lambda row: row[rank_by] if row[rank_by] is not None else missing, reverse=descending)
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
+
+
+def format_table(rows: List[dict], top: int = 20) -> str:
+    """Ranked results as a fixed width text table, the swept parameters first."""
+    if not rows:
+        return "No results"
+
+    swept = [name for name in StrategyParams.names() if len({row[name] for row in rows}) > 1]
+    columns = RESULT_COLUMNS[:1] + swept + RESULT_COLUMNS[1:]
+    cells = [[str(row[column]) for column in columns] for row in rows[:top]]
+    widths = [max(len(column), *(len(cell[i]) for cell in cells)) for i, column in enumerate(columns)]
+
+    lines = ["  ".join(column.rjust(width) for column, width in zip(columns, widths))]
+    lines += ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
+
+
+def write_csv(rows: List[dict], path: str):
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=['rank', *StrategyParams.names(), *RESULT_COLUMNS[1:], 'elapsed_s'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    from src.app.founding_rate_service.backtester import synthetic_dataset
+
+    parser = argparse.ArgumentParser(description="Sweep the funding rate strategy thresholds over the archived data")
+    parser.add_argument("--synthetic", nargs=2, type=int, metavar=("SYMBOLS", "DAYS"), help="Run over a generated dataset")
+    parser.add_argument("--random", type=int, metavar="SAMPLES", help="Random search instead of the default grid")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rank-by", default='total_pnl_pct', choices=RESULT_COLUMNS[1:])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="Write every result to this file")
+    args = parser.parse_args()
+
+    param_sets = random_search(samples=args.random) if args.random else grid()
+    started = time.perf_counter()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            candle_dir, archive_dir = synthetic_dataset(tmp_dir, *args.synthetic)
+            rows = run_sweep(param_sets, candle_store_dir=candle_dir, archive_dir=archive_dir, workers=args.workers, rank_by=args.rank_by)
+    else:
+        rows = run_sweep(param_sets, workers=args.workers, rank_by=args.rank_by)
+
+    print(format_table(rows, args.top))
+    print(f"{len(param_sets)} parameter sets in {time.perf_counter() - started:.1f} s with {args.workers} workers")
+    if args.csv:
+        write_csv(rows, args.csv)
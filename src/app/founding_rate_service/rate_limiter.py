@@ -0,0 +1,100 @@
+# rate_limiter.py
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from src.app.utils import latency_summary
+from src.config import BITGET_RATE_LIMITS
+
+# Priority lanes, a lower value is always served first within an endpoint family
+PRIORITY_CRITICAL = 0  # Orders and the tickers snapshot of the funding window
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2      # Candle and funding rate history downloads
+
+LANES = {PRIORITY_CRITICAL: 'critical', PRIORITY_NORMAL: 'normal', PRIORITY_BULK: 'bulk'}
+
+
+class TokenBucket:
+    """Token bucket of one endpoint family, waiters are released by priority then arrival order."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def queued(self, priority: int) -> int:
+        return sum(1 for waiter in self._waiters if waiter[0] == priority and not waiter[2].done())
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        await future
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # Cancelled while waiting
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+        if self._waiters and self._timer is None:
+            delay = (1 - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+
+class BitgetRateLimiter:
+    """
+    Token-bucket limiter keyed by endpoint family ('market', 'order', 'coinmarketcap', ...) with
+    priority lanes, so order and ticker calls overtake queued bulk history downloads.
+    Queue depth and wait times per lane are kept for the metrics.
+    """
+
+    def __init__(self, limits: Dict[str, float] = BITGET_RATE_LIMITS):
+        self.buckets = {family: TokenBucket(rate) for family, rate in limits.items()}
+        self.waits = {family: {lane: deque(maxlen=500) for lane in LANES} for family in limits}
+        self.acquired = {family: 0 for family in limits}
+
+    async def acquire(self, family: str, priority: int = PRIORITY_NORMAL) -> float:
+        """Wait for a token of the family, returns the time waited in milliseconds."""
+        started = time.monotonic()
+        await self.buckets[family].acquire(priority)
+
+        waited_ms = (time.monotonic() - started) * 1000
+        self.waits[family][priority].append(waited_ms)
+        self.acquired[family] += 1
+        return waited_ms
+
+    def stats(self) -> dict:
+        return {
+            family: {
+                "rate_per_second": bucket.rate,
+                "acquired": self.acquired[family],
+                "queue_depth": {name: bucket.queued(lane) for lane, name in LANES.items()},
+                "wait": {name: latency_summary(self.waits[family][lane]) for lane, name in LANES.items()}
+            }
+            for family, bucket in self.buckets.items()
+        }
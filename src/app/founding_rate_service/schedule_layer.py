@@ -3,7 +3,7 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import pytz
 from datetime import time as dt_time, datetime, timedelta
-from typing import Callable, Coroutine
+from typing import Callable, Coroutine, Optional
 
 class ScheduleLayer:
     def __init__(self, timezone: str):
@@ -12,18 +12,21 @@ class ScheduleLayer:
         self.scheduler = AsyncIOScheduler(timezone=pytz.timezone(self.timezone))
         # Removed: self.scheduler.start()
 
-    def schedule_process_time(self, run_time: datetime, function_to_call: Callable[..., Coroutine], *args):
+    def schedule_process_time(self, run_time: datetime, function_to_call: Callable[..., Coroutine], *args, job_id: Optional[str] = None):
         timezone = pytz.timezone(self.timezone)
         if run_time.tzinfo is None:
             run_time = timezone.localize(run_time)
         else:
             run_time = run_time.astimezone(timezone)
 
+        # Same function and run time -> same job, scheduling it again replaces it instead of running it twice
         self.scheduler.add_job(
             self._run_async_function, 
             'date', 
             run_date=run_time, 
             args=[function_to_call, *args], 
+            id=job_id or f"{function_to_call.__name__}:{run_time.isoformat()}",
+            replace_existing=True,
             coalesce=True, 
             misfire_grace_time=30
         )
@@ -0,0 +1,172 @@
+# screener.py
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import (
+    MIN_FOUNDING_RATE,
+    MAX_FOUNDING_RATE,
+    SCREENER_MIN_VOLUME,
+    SCREENER_MIN_OPEN_INTEREST,
+    SCREENER_TOP_N
+)
+
+
+def _float(value) -> float:
+    return float(value) if value not in (None, '') else math.nan
+
+
+def _score_features(funding_rate: float, volume: float, open_interest: float) -> Dict[str, float]:
+    return {"funding_rate": abs(funding_rate), "volume": math.log1p(volume), "open_interest": math.log1p(open_interest)}
+
+
+@dataclass
+class ScreenerRules:
+    """
+    Thresholds are funding rates in percent: longs at or below `min_funding_rate`, shorts at or
+    above `max_funding_rate`. Symbols with a missing volume/open interest only pass when the
+    corresponding minimum is 0. `top_n` keeps the best N of every side by composite score.
+    """
+    min_funding_rate: float = MIN_FOUNDING_RATE
+    max_funding_rate: float = MAX_FOUNDING_RATE
+    min_volume: float = SCREENER_MIN_VOLUME
+    min_open_interest: float = SCREENER_MIN_OPEN_INTEREST
+    top_n: Optional[int] = SCREENER_TOP_N
+    # Composite score weights of |funding rate|, log volume and log open interest
+    weights: Dict[str, float] = field(default_factory=lambda: {"funding_rate": 1.0, "volume": 0.25, "open_interest": 0.25})
+
+
+class FundingRateScreener:
+    """
+    Picks the long and short candidates of a tickers payload (REST `/api/v2/mix/market/tickers`
+    or a TickerStream snapshot) in one pass over it, every field parsed once. Volume is the 24h
+    quote volume and open interest is valued in quote currency.
+    """
+
+    def __init__(self, rules: Optional[ScreenerRules] = None):
+        self.rules = rules or ScreenerRules()
+
+    def _candidates(self, data: list) -> Dict[str, List[dict]]:
+        rules = self.rules
+        sides = {"long": [], "short": []}
+        for d in data:
+            funding_rate = float(d["fundingRate"]) * 100
+            if funding_rate <= rules.min_funding_rate:
+                side = "long"
+            elif funding_rate >= rules.max_funding_rate:
+                side = "short"
+            else:
+                continue
+
+            volume = _float(d.get("quoteVolume"))
+            open_interest = _float(d.get("holdingAmount")) * _float(d.get("lastPr"))
+            # NaN compares False, a missing value only passes a minimum of 0
+            if rules.min_volume > 0 and not volume >= rules.min_volume:
+                continue
+            if rules.min_open_interest > 0 and not open_interest >= rules.min_open_interest:
+                continue
+
+            sides[side].append({
+                "symbol": d.get("symbol") or d.get("instId"),
+                "mode": side,
+                "fundingRate": funding_rate,
+                "volume": volume,
+                "open_interest": open_interest
+            })
+        return sides
+
+    def score(self, data: list, candidates: List[dict]) -> List[float]:
+        """Weighted sum of |funding rate|, log volume and log open interest, each normalized by its peak over the payload."""
+        peaks = {}
+        for d in data:
+            for name, value in _score_features(_float(d.get("fundingRate")) * 100, _float(d.get("quoteVolume")), _float(d.get("holdingAmount")) * _float(d.get("lastPr"))).items():
+                peaks[name] = max(peaks.get(name, 0.0), value) if not math.isnan(value) else peaks.get(name, 0.0)
+
+        scores = []
+        for candidate in candidates:
+            features = _score_features(candidate["fundingRate"], candidate["volume"], candidate["open_interest"])
+            scores.append(sum(
+                weight * features[name] / peaks[name]
+                for name, weight in self.rules.weights.items()
+                if weight and peaks.get(name, 0) > 0 and not math.isnan(features[name])
+            ))
+        return scores
+
+    def screen(self, payload: dict) -> Dict[str, List[dict]]:
+        """Long and short candidates as {"symbol", "mode", "fundingRate"} dicts, each side ordered by funding rate ascending."""
+        data = payload.get("data") or []
+        sides = self._candidates(data)
+
+        if self.rules.top_n is not None:
+            for side, candidates in sides.items():
+                scores = self.score(data, candidates)
+                best = sorted(range(len(candidates)), key=lambda i: -scores[i])[:self.rules.top_n]
+                sides[side] = [candidates[i] for i in sorted(best)]
+
+        return {
+            side: [{"symbol": c["symbol"], "mode": side, "fundingRate": c["fundingRate"]} for c in sorted(candidates, key=lambda c: c["fundingRate"])]
+            for side, candidates in sides.items()
+        }
+
+
+def synthetic_tickers(size: int = 2000, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    return {"data": [
+        {
+            "symbol": f"SYM{i}USDT",
+            "lastPr": f"{price:.4f}",
+            "fundingRate": f"{rate:.6f}",
+            "quoteVolume": f"{volume:.2f}",
+            "holdingAmount": f"{holding:.2f}"
+        }
+        for i, (price, rate, volume, holding) in enumerate(zip(
+            rng.lognormal(0, 2, size),
+            rng.normal(0, 0.004, size),
+            rng.lognormal(14, 2, size),
+            rng.lognormal(10, 2, size)
+        ))
+    ]}
+
+
+def _legacy_screen(payload: dict) -> dict:
+    """The previous path: sort the dicts in Python, then two more passes with float() conversions."""
+    sorted_data = [{"symbol": d["symbol"], "fundingRate": float(d["fundingRate"]) * 100} for d in sorted(payload["data"], key=lambda x: float(x["fundingRate"]))]
+    return {
+        "long": [{"symbol": d["symbol"], "mode": "long", "fundingRate": float(d["fundingRate"])} for d in sorted_data if float(d["fundingRate"]) <= float(MIN_FOUNDING_RATE)],
+        "short": [{"symbol": d["symbol"], "mode": "short", "fundingRate": float(d["fundingRate"])} for d in sorted_data if float(d["fundingRate"]) >= float(MAX_FOUNDING_RATE)]
+    }
+
+
+def benchmark_screener(sizes=(500, 2000), repeat: int = 50) -> list:
+    """The previous sort-and-filter path against one screen() pass, Bitget lists about 500 USDT perpetuals."""
+    results = []
+    for size in sizes:
+        payload = synthetic_tickers(size)
+        screener = FundingRateScreener(ScreenerRules(min_volume=0, min_open_interest=0, top_n=None))
+
+        timings = {}
+        for name, function in (("legacy", lambda: _legacy_screen(payload)), ("screen", lambda: screener.screen(payload))):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best * 1000
+
+        legacy, screened = _legacy_screen(payload), screener.screen(payload)
+        results.append({
+            "symbols": size,
+            "legacy_ms": round(timings["legacy"], 3),
+            "screen_ms": round(timings["screen"], 3),
+            "same_symbols": all([d["symbol"] for d in legacy[side]] == [d["symbol"] for d in screened[side]] for side in ("long", "short"))
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark_screener():
+        print(result)
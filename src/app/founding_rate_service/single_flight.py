@@ -0,0 +1,66 @@
+# single_flight.py
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one in-flight task, and its
+    result is reused for `ttl` seconds, so duplicated work collapses to one network call per key.
+
+    Results are shared between callers and must be treated as read only. Failures aren't cached,
+    and a caller being cancelled doesn't cancel the shared task of the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {
+            "calls": 0,
+            "executions": 0,
+            "shared": 0,
+            "cache_hits": 0,
+            "errors": 0
+        }
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]], ttl: float = 0) -> Any:
+        self.stats["calls"] += 1
+
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["shared"] += 1
+        else:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(function())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done, ttl))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task, ttl: float):
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.stats["errors"] += 1
+            return
+
+        if ttl > 0:
+            now = time.monotonic()
+            # Drop the expired entries before adding a new one
+            for expired in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                del self._cache[expired]
+            self._cache[key] = (now + ttl, task.result())
+
+    def forget(self, key: Hashable):
+        self._cache.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "in_flight": len(self._inflight), "cached": len(self._cache)}
@@ -0,0 +1,37 @@
+# strategy_params.py
+
+from dataclasses import asdict, dataclass, fields
+
+from src.config import MIN_FOUNDING_RATE, MAX_FOUNDING_RATE
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """
+    Thresholds of the funding rate strategy. The defaults are the live ones; the backtester and the
+    parameter sweep pass other values through the decision functions.
+    """
+    # Screener, funding rate of the long/short candidates
+    min_funding_rate: float = MIN_FOUNDING_RATE
+    max_funding_rate: float = MAX_FOUNDING_RATE
+    # Longs under this funding rate are opened 'normal' without waiting for the analysis
+    normal_long_cutoff: float = 1.3
+    # From this funding rate on, the past funding rates analysis decides the side
+    past_funding_rates_cutoff: float = 3.0
+    # analyze_incrementation: growth of the last 8 hours and the short term (2 hours) limit
+    min_percentage: float = 10.0
+    min_percentage_short_term: float = 5.0
+    # analyze_incrementation: drop from the 8 hours highest price to enter short
+    drop_from_highest: float = 15.0
+    # analyze_incrementation: volatility of the last 2 days (±)
+    two_days_volatility: float = 15.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def names(cls) -> list:
+        return [field.name for field in fields(cls)]
+
+
+DEFAULT_PARAMS = StrategyParams()
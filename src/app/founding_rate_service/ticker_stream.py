@@ -0,0 +1,306 @@
+# ticker_stream.py
+
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from src.config import BITGET_WS_URL, TICKER_STREAM_MAX_AGE, TICKER_STREAM_REFRESH_INTERVAL, TICKER_STREAM_STALE_AFTER
+
+# Bitget closes idle public connections after 2 minutes without a ping
+PING_INTERVAL = 25
+SUBSCRIBE_BATCH = 50
+RECONNECT_DELAYS = [1, 2, 5, 10, 30]
+
+
+class TickerStream:
+    """
+    Persistent subscriber of the Bitget public 'ticker' channel for every USDT-FUTURES symbol.
+
+    Keeps an in-memory table symbol -> fundingRate / lastPr / nextFundingTime that is always
+    current, so the funding window reads it with `snapshot()` instead of waiting on the REST
+    tickers endpoint. The symbol list is bootstrapped from one REST snapshot unless given, and
+    refreshed every `refresh_interval` on the open connection: new listings are subscribed and
+    delisted symbols unsubscribed. Symbols without an update for `stale_after` are dropped.
+    """
+
+    def __init__(self, bitget_client, url: str = BITGET_WS_URL, max_age: float = TICKER_STREAM_MAX_AGE, symbols: Optional[List[str]] = None,
+                 refresh_interval: float = TICKER_STREAM_REFRESH_INTERVAL, stale_after: float = TICKER_STREAM_STALE_AFTER):
+        self.bitget_client = bitget_client
+        self.url = url
+        self.max_age = max_age
+        self.symbols = symbols
+        # A given symbol list is kept as is, only the bootstrapped one follows the listings
+        self._fixed_symbols = symbols is not None
+        self.refresh_interval = refresh_interval
+        self.stale_after = stale_after
+
+        self.table: Dict[str, dict] = {}
+        self.connected = False
+        self.last_message_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats_counters = {
+            "messages": 0,
+            "updates": 0,
+            "reconnects": 0,
+            "errors": 0,
+            "refreshes": 0,
+            "listed": 0,
+            "delisted": 0,
+            "pruned": 0
+        }
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _bootstrap(self) -> List[str]:
+        """Seed the table from one REST snapshot, returns the listed symbols."""
+        payload = await self.bitget_client.get_future_cryptos()
+        listed = [self._update(ticker) for ticker in (payload or {}).get("data", [])]
+        return [symbol for symbol in listed if symbol is not None]
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                if self.symbols is None:
+                    self.symbols = await self._bootstrap()
+
+                session = await self.bitget_client.get_session()
+                async with session.ws_connect(self.url, heartbeat=None, autoping=True) as ws:
+                    self.connected = True
+                    attempt = 0
+                    print(f"Ticker stream connected, subscribing to {len(self.symbols)} symbols")
+                    await self._subscribe(ws, self.symbols)
+
+                    ping_task = asyncio.create_task(self._ping(ws))
+                    refresh_task = asyncio.create_task(self._refresh(ws))
+                    try:
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self._handle(message.data)
+                            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                    finally:
+                        ping_task.cancel()
+                        refresh_task.cancel()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats_counters["errors"] += 1
+                print(f"Ticker stream error: {e}")
+
+            self.connected = False
+            self.stats_counters["reconnects"] += 1
+            await asyncio.sleep(RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)])
+            attempt += 1
+
+    async def _subscribe(self, ws: aiohttp.ClientWebSocketResponse, symbols: List[str], op: str = "subscribe"):
+        for i in range(0, len(symbols), SUBSCRIBE_BATCH):
+            args = [
+                {"instType": "USDT-FUTURES", "channel": "ticker", "instId": symbol}
+                for symbol in symbols[i:i + SUBSCRIBE_BATCH]
+            ]
+            await ws.send_str(json.dumps({"op": op, "args": args}))
+            # Public connections accept up to 10 messages per second
+            await asyncio.sleep(0.1)
+
+    async def _refresh(self, ws: aiohttp.ClientWebSocketResponse):
+        """Every refresh_interval: follow the listings (bootstrapped symbol list only) and drop stale symbols."""
+        while not ws.closed:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if not self._fixed_symbols:
+                    await self._resubscribe(ws)
+                self._prune()
+                self.stats_counters["refreshes"] += 1
+            except Exception as e:
+                self.stats_counters["errors"] += 1
+                print(f"Ticker stream refresh error: {e}")
+
+    async def _resubscribe(self, ws: aiohttp.ClientWebSocketResponse):
+        listed = await self._bootstrap()
+        # An empty snapshot is a failed request, not every symbol delisted
+        if not listed:
+            return
+
+        current = set(self.symbols or [])
+        added = [symbol for symbol in listed if symbol not in current]
+        removed = list(current - set(listed))
+        self.symbols = listed
+
+        if added:
+            print(f"Ticker stream subscribing to {len(added)} new symbols")
+            await self._subscribe(ws, added)
+        if removed:
+            print(f"Ticker stream unsubscribing from {len(removed)} delisted symbols")
+            await self._subscribe(ws, removed, op="unsubscribe")
+            for symbol in removed:
+                self.table.pop(symbol, None)
+
+        self.stats_counters["listed"] += len(added)
+        self.stats_counters["delisted"] += len(removed)
+
+    def _prune(self) -> int:
+        """Drop the symbols without an update for stale_after seconds."""
+        oldest = time.monotonic() - self.stale_after
+        stale = [symbol for symbol, ticker in self.table.items() if ticker["updated_at"] < oldest]
+        for symbol in stale:
+            del self.table[symbol]
+        self.stats_counters["pruned"] += len(stale)
+        return len(stale)
+
+    async def _ping(self, ws: aiohttp.ClientWebSocketResponse):
+        while not ws.closed:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send_str("ping")
+
+    def _handle(self, raw: str):
+        self.last_message_at = time.monotonic()
+        self.stats_counters["messages"] += 1
+        if raw == "pong":
+            return
+
+        message = json.loads(raw)
+        if message.get("event") == "error":
+            print(f"Ticker stream subscription error: {message}")
+            return
+        if message.get("arg", {}).get("channel") != "ticker":
+            return
+
+        for ticker in message.get("data", []):
+            self._update(ticker)
+
+    def _update(self, ticker: dict) -> Optional[str]:
+        symbol = ticker.get("instId") or ticker.get("symbol")
+        if not symbol or ticker.get("fundingRate") in (None, ""):
+            return None
+
+        self.table[symbol] = {
+            "symbol": symbol,
+            "fundingRate": ticker["fundingRate"],
+            "lastPr": ticker.get("lastPr"),
+            "nextFundingTime": ticker.get("nextFundingTime"),
+            "quoteVolume": ticker.get("quoteVolume"),
+            "holdingAmount": ticker.get("holdingAmount"),
+            "updated_at": time.monotonic()
+        }
+        self.stats_counters["updates"] += 1
+        return symbol
+
+    def is_fresh(self) -> bool:
+        """Whether the table can replace a REST snapshot right now."""
+        return (
+            self.connected
+            and bool(self.table)
+            and self.last_message_at is not None
+            and time.monotonic() - self.last_message_at <= self.max_age
+        )
+
+    def snapshot(self) -> dict:
+        """The current table shaped like the REST tickers payload, so `fetch_future_cryptos` parses it unchanged."""
+        oldest = time.monotonic() - self.stale_after
+        return {"data": [
+            {key: value for key, value in ticker.items() if key != "updated_at"}
+            for ticker in self.table.values()
+            if ticker["updated_at"] >= oldest
+        ]}
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counters,
+            "connected": self.connected,
+            "symbols": len(self.table),
+            "fresh": self.is_fresh(),
+            "last_message_age_s": round(time.monotonic() - self.last_message_at, 3) if self.last_message_at else None
+        }
+
+
+async def replay_server(frames: List[str], host: str = "127.0.0.1", port: int = 8765, interval: float = 0.01):
+    """
+    Local fake of the Bitget public WebSocket: answers 'ping' with 'pong' and, after the first
+    subscribe, replays the recorded frames. Returns the aiohttp runner, call `runner.cleanup()` to stop.
+    """
+    from aiohttp import web
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        replayed = False
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            if message.data == "ping":
+                await ws.send_str("pong")
+                continue
+
+            request_body = json.loads(message.data)
+            await ws.send_str(json.dumps({"event": "subscribe", "arg": request_body["args"][0]}))
+            if not replayed:
+                replayed = True
+                for frame in frames:
+                    await ws.send_str(frame)
+                    await asyncio.sleep(interval)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/v2/ws/public", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    import sys
+
+    from src.app.founding_rate_service.bitget_layer import BitgetClient
+
+    async def main():
+        # Frames recorded one per line (JSONL), or a couple of synthetic ones
+        if len(sys.argv) > 1:
+            with open(sys.argv[1]) as frames_file:
+                frames = [line.strip() for line in frames_file if line.strip()]
+        else:
+            frames = [
+                json.dumps({
+                    "action": "snapshot",
+                    "arg": {"instType": "USDT-FUTURES", "channel": "ticker", "instId": symbol},
+                    "data": [{"instId": symbol, "lastPr": price, "fundingRate": rate, "nextFundingTime": "1700000000000"}],
+                    "ts": 1699999999000
+                })
+                for symbol, price, rate in (("BTCUSDT", "37000.1", "0.0001"), ("ETHUSDT", "2000.5", "-0.0150"))
+            ]
+
+        runner = await replay_server(frames)
+        client = BitgetClient()
+        stream = TickerStream(client, url="http://127.0.0.1:8765/v2/ws/public", symbols=["BTCUSDT", "ETHUSDT"])
+        stream.start()
+        await asyncio.sleep(1)
+
+        start = time.perf_counter()
+        sorted_cryptos = client.fetch_future_cryptos(stream.snapshot())
+        print(f"Snapshot read in {(time.perf_counter() - start) * 1e6:.1f} us: {sorted_cryptos}")
+        print(stream.stats())
+
+        await stream.stop()
+        await client.close()
+        await runner.cleanup()
+
+    asyncio.run(main())
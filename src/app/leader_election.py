@@ -0,0 +1,215 @@
+# leader_election.py
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError, WatchError
+
+from src.config import LEADER_LEASE_MS
+
+
+class LeaderElection:
+    """
+    Lease based leader election on Redis, so only one replica runs the funding rate engine.
+
+    The lease is a key holding the instance id, taken with SET NX PX and renewed every third of
+    the lease. Renew and release are compare-and-set transactions (WATCH/MULTI) that only touch a
+    lease this instance still holds. Every election increments a fencing token, which goes along
+    with the orders so that the receiver can reject a deposed leader that hasn't noticed yet.
+
+    If the leader dies, another instance takes over at most `lease_ms + retry interval` after
+    its last renewal. `failover_ms` measures that gap when this instance is elected.
+    """
+
+    def __init__(self, client: aioredis.Redis, name: str = "funding-rate-engine", lease_ms: int = LEADER_LEASE_MS,
+                 on_elected: Optional[Callable[[int], Awaitable[None]]] = None, on_lost: Optional[Callable[[], Awaitable[None]]] = None,
+                 instance_id: Optional[str] = None):
+        self._r = client
+        self.lease_key = f"leader:{name}"
+        self.token_key = f"leader:{name}:token"
+        # Epoch ms of the last renewal of whoever holds the lease
+        self.heartbeat_key = f"leader:{name}:heartbeat"
+        self.lease_ms = lease_ms
+        self.interval = lease_ms / 3 / 1000
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.instance_id = instance_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.is_leader = False
+        self.fencing_token: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        # on_elected runs next to the renewal loop, a slow start can't let the lease expire
+        self._elected_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "elections": 0,
+            "losses": 0,
+            "errors": 0,
+            "failover_ms": None,
+            "leader_since": None
+        }
+
+    async def try_acquire(self) -> bool:
+        """Take the lease if it is free, with a new fencing token."""
+        if not await self._r.set(self.lease_key, self.instance_id, nx=True, px=self.lease_ms):
+            return False
+
+        now_ms = int(time.time() * 1000)
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.incr(self.token_key)
+            pipe.get(self.heartbeat_key)
+            pipe.set(self.heartbeat_key, now_ms)
+            token, last_heartbeat, _ = await pipe.execute()
+
+        self.is_leader = True
+        self.fencing_token = int(token)
+        self.stats["elections"] += 1
+        self.stats["leader_since"] = now_ms
+        self.stats["failover_ms"] = now_ms - int(last_heartbeat) if last_heartbeat else None
+        return True
+
+    async def _compare_and_set(self, update: Callable[[aioredis.client.Pipeline], None]) -> bool:
+        """Run `update` in a transaction only if this instance still holds the lease."""
+        async with self._r.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.lease_key)
+                if await pipe.get(self.lease_key) != self.instance_id:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                update(pipe)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def renew(self) -> bool:
+        def update(pipe):
+            pipe.pexpire(self.lease_key, self.lease_ms)
+            pipe.set(self.heartbeat_key, int(time.time() * 1000))
+
+        return await self._compare_and_set(update)
+
+    async def release(self) -> bool:
+        """Give the lease up, the other instances can take over at their next attempt."""
+        def update(pipe):
+            pipe.delete(self.lease_key)
+            pipe.set(self.heartbeat_key, int(time.time() * 1000))
+
+        released = await self._compare_and_set(update)
+        await self._lose()
+        return released
+
+    async def _elected(self, token: int):
+        try:
+            await self.on_elected(token)
+        except Exception as e:
+            print(f"Error starting as leader of {self.lease_key}: {e}")
+
+    async def _lose(self):
+        if not self.is_leader:
+            return
+        if self._elected_task is not None and not self._elected_task.done():
+            self._elected_task.cancel()
+        self._elected_task = None
+        self.is_leader = False
+        self.fencing_token = None
+        self.stats["losses"] += 1
+        self.stats["leader_since"] = None
+        if self.on_lost is not None:
+            await self.on_lost()
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_leader:
+                    if not await self.renew():
+                        print(f"Leadership of {self.lease_key} lost")
+                        await self._lose()
+                elif await self.try_acquire():
+                    print(f"Elected leader of {self.lease_key} with fencing token {self.fencing_token}")
+                    if self.on_elected is not None:
+                        self._elected_task = asyncio.create_task(self._elected(self.fencing_token))
+            except RedisError as e:
+                # Without Redis the lease can't be renewed, stop acting as leader until it is back
+                self.stats["errors"] += 1
+                print(f"Leader election error: {e}")
+                await self._lose()
+
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self, release: bool = True):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if release and self.is_leader:
+            await self.release()
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "instance_id": self.instance_id,
+            "is_leader": self.is_leader,
+            "fencing_token": self.fencing_token,
+            "lease_ms": self.lease_ms,
+            # Worst case failover after a crash: the lease expiring plus one retry interval
+            "failover_bound_ms": round(self.lease_ms + self.interval * 1000)
+        }
+
+
+async def _measure_failover(lease_ms: int = 1000) -> dict:
+    """
+    Two candidates sharing a fakeredis server. The leader first crashes (stops renewing) and
+    then the new leader releases its lease on shutdown; returns the failover times of both.
+    """
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    elected = asyncio.Queue()
+
+    async def on_elected(token: int):
+        await elected.put(token)
+
+    first = LeaderElection(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), lease_ms=lease_ms, on_elected=on_elected, instance_id="first")
+    second = LeaderElection(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), lease_ms=lease_ms, on_elected=on_elected, instance_id="second")
+
+    first.start()
+    await elected.get()
+    second.start()
+    await asyncio.sleep(lease_ms / 1000)
+
+    # Crash, the lease is left to expire
+    await first.stop(release=False)
+    await elected.get()
+    crash = second.stats["failover_ms"]
+
+    # Graceful shutdown, the lease is released
+    first.start()
+    await second.stop(release=True)
+    await elected.get()
+    graceful = first.stats["failover_ms"]
+    await first.stop()
+
+    return {"lease_ms": lease_ms, "failover_bound_ms": first.metrics()["failover_bound_ms"], "crash_failover_ms": crash, "graceful_failover_ms": graceful}
+
+
+if __name__ == "__main__":
+    try:
+        import fakeredis  # noqa: F401
+    except ImportError:
+        raise SystemExit("The failover demo runs on fakeredis, install it with: pip install -r requirements-dev.txt")
+
+    print(asyncio.run(_measure_failover()))
@@ -1,13 +1,13 @@
+import asyncio
+import threading
 import time
-import socket
-import redis
-import schedule
-import httpx
 import json
-import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Union, Literal, TypedDict, List
 import pytz
+import redis.asyncio as aioredis
+
+from src.config import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_MAX_CONNECTIONS
 
 class FoundingRate(TypedDict):
     symbol: str
@@ -29,129 +29,577 @@ class BotHistoricalPNL(TypedDict):
     opening_fee: str
     closing_fee: str
     net_profits: str
-    
-    
 
-class RedisService:
-    def __init__(self):
-        hostname = socket.gethostname()
-            
-        if hostname == 'ip-172-31-3-153':  
-            redis_host = 'redis_tasks'
-            port = '6378'
-        else:
-            redis_host = 'localhost'
-            port = '6379'
 
-        self._r = redis.Redis(host='localhost', port='6378', decode_responses=True)
-        self.ensure_correct_key_type()
+# Keys stored as hashes, their type is checked once when the service starts
+HASH_KEYS = ("tasks", "crypto_leads", "crypto_leads:meta", "historical_pnl")
 
-    def ensure_correct_key_type(self):
-        """Ensure the 'tasks' key is a hash or delete it if not."""
-        if self._r.exists("tasks") and self._r.type("tasks") != "hash":
-            print(f"Deleting the incorrect 'tasks' key of type {self._r.type('tasks')}.")
-            self._r.delete("tasks")
+# Version, publish time and funding time of the crypto_leads snapshot
+CRYPTO_LEADS_META_KEY = "crypto_leads:meta"
 
-    def save_task(self, task_id: str, task_data: Dict[str, Any]) -> None:
+# Sorted sets of the historical_pnl fields scored by operation epoch seconds: all of them, and
+# one per symbol (symbols listed in a set)
+PNL_INDEX_KEY = "historical_pnl:index"
+PNL_SYMBOLS_KEY = "historical_pnl:symbols"
+PNL_RETENTION_DAYS = 30
+
+
+def pnl_symbol_index_key(symbol: str) -> str:
+    return f"{PNL_INDEX_KEY}:{symbol}"
+
+
+def operation_timestamp(operation_datetime: Union[datetime, str]) -> float:
+    if isinstance(operation_datetime, str):
+        operation_datetime = datetime.fromisoformat(operation_datetime)
+    return operation_datetime.timestamp()
+
+
+def create_client(host: str = REDIS_HOST, port: int = REDIS_PORT, db: int = REDIS_DB, max_connections: int = REDIS_MAX_CONNECTIONS) -> aioredis.Redis:
+    """Client on its own pool, callers wait for a free connection instead of failing when all are in use."""
+    pool = aioredis.BlockingConnectionPool(host=host, port=port, db=db, max_connections=max_connections, timeout=10, decode_responses=True)
+    return aioredis.Redis(connection_pool=pool)
+
+
+class AsyncRedisService:
+    """
+    Non blocking Redis access for the FastAPI handlers and the FoundinRateService. Create one per
+    process (its pool is shared by every caller), call `start` once to validate the key types and
+    `close` on shutdown.
+    """
+
+    def __init__(self, client: Optional[aioredis.Redis] = None):
+        self._r = client if client is not None else create_client()
+
+    async def start(self) -> "AsyncRedisService":
+        await self.ensure_key_types()
+        await self.ensure_pnl_index()
+        return self
+
+    async def close(self) -> None:
+        await self._r.aclose()
+
+    async def ensure_key_types(self) -> None:
+        """
+        Refuse to start when one of the HASH_KEYS holds another type, one round trip for all the
+        checks. The keys are left as they are (they may hold the PnL history), fix them by hand.
+        """
+        async with self._r.pipeline(transaction=False) as pipe:
+            for key in HASH_KEYS:
+                pipe.type(key)
+            key_types = await pipe.execute()
+
+        wrong_keys = {key: key_type for key, key_type in zip(HASH_KEYS, key_types) if key_type not in ("hash", "none")}
+        if wrong_keys:
+            print(f"Redis keys with an incorrect type, expected hashes: {wrong_keys}.")
+            raise RuntimeError(f"Redis keys with an incorrect type (expected hashes): {wrong_keys}, migrate or delete them before starting")
+
+    async def save_task(self, task_id: str, task_data: Dict[str, Any]) -> None:
         """Save a task to Redis as a hash entry."""
-        self.ensure_correct_key_type()
-        self._r.hset("tasks", task_id, json.dumps(task_data))
+        await self._r.hset("tasks", task_id, json.dumps(task_data))
         print(f"Task '{task_id}' saved successfully.")
 
-    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a task from Redis by its ID."""
-        task_data = self._r.hget("tasks", task_id)
+        task_data = await self._r.hget("tasks", task_id)
         if task_data:
             return json.loads(task_data)
         else:
             print(f"Task '{task_id}' not found.")
             return None
 
-    def delete_task(self, task_id: str) -> None:
+    async def delete_task(self, task_id: str) -> None:
         """Delete a task from Redis."""
-        result = self._r.hdel("tasks", task_id)
+        result = await self._r.hdel("tasks", task_id)
         if result:
             print(f"Task '{task_id}' deleted successfully.")
         else:
             print(f"Task '{task_id}' not found or could not be deleted.")
 
-    def get_all_tasks(self) -> Dict[str, Any]:
+    async def get_all_tasks(self) -> Dict[str, Any]:
         """Retrieve all tasks from Redis."""
-        self.ensure_correct_key_type()
-        tasks = self._r.hgetall("tasks")
+        tasks = await self._r.hgetall("tasks")
         return {task_id: json.loads(task_data) for task_id, task_data in tasks.items()}
 
-    def delete_all(self) -> None:
+    async def delete_all(self) -> None:
         """Delete all tasks in Redis."""
-        self._r.delete("tasks")
+        await self._r.delete("tasks")
         print("All tasks have been deleted from Redis.")
 
     """
         READ & WRITE & UPDATE $ DELETE for founding rate sercice
     """
-    def add_new_crypto_lead(self, symbol: str, fundingRate: Union[float, int]) -> None:
+    async def add_new_crypto_lead(self, symbol: str, fundingRate: Union[float, int]) -> None:
         """Add a new crypto lead to Redis."""
-        self.ensure_correct_key_type()
         crypto_lead_key = f"crypto_leads:{symbol}"
         crypto_lead_data = {"symbol": symbol, "fundingRate": fundingRate}
-        self._r.hset("crpto_leads", crypto_lead_key, json.dumps(crypto_lead_data))
-    
-    def read_all_crypto_lead(self) -> Dict[str, Any]:
-        """Read all crypto leads from Redis."""
-        self.ensure_correct_key_type()
-        crypto_leads = self._r.hgetall("crypto_leads")
-        return [json.loads(data[1]) for data in crypto_leads.items()]
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hset("crypto_leads", crypto_lead_key, json.dumps(crypto_lead_data))
+            pipe.hincrby(CRYPTO_LEADS_META_KEY, "version", 1)
+            await pipe.execute()
 
+    async def publish_crypto_leads(self, leads: List[FoundingRate], funding_time: Optional[int] = None) -> int:
+        """
+        Replace the whole lead set with the leads of a funding window (funding time in epoch ms) in
+        one MULTI/EXEC, readers see either the previous set or this one. Returns the new version.
+        """
+        mapping = {f"crypto_leads:{lead['symbol']}": json.dumps({"symbol": lead['symbol'], "fundingRate": lead['fundingRate']}) for lead in leads}
 
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.delete("crypto_leads")
+            if mapping:
+                pipe.hset("crypto_leads", mapping=mapping)
+            pipe.hincrby(CRYPTO_LEADS_META_KEY, "version", 1)
+            pipe.hset(CRYPTO_LEADS_META_KEY, mapping={"published_at": int(time.time() * 1000), "funding_time": funding_time or ""})
+            results = await pipe.execute()
 
-    def delete_all_crypto_leads(self) -> None:
-        """Delete all crypto leads in Redis."""
-        self._r.delete("crypto_leads")
+        return int(results[-2])
+
+    async def read_crypto_leads_snapshot(self) -> Dict[str, Any]:
+        """The lead set with its version, publish time and funding time, read in one round trip."""
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hgetall("crypto_leads")
+            pipe.hgetall(CRYPTO_LEADS_META_KEY)
+            crypto_leads, meta = await pipe.execute()
 
+        return {
+            "version": int(meta.get("version", 0)),
+            "published_at": int(meta["published_at"]) if meta.get("published_at") else None,
+            "funding_time": int(meta["funding_time"]) if meta.get("funding_time") else None,
+            "leads": [json.loads(data) for data in crypto_leads.values()]
+        }
+
+    async def read_all_crypto_lead(self) -> List[Dict[str, Any]]:
+        """Read all crypto leads from Redis."""
+        crypto_leads = await self._r.hgetall("crypto_leads")
+        return [json.loads(data) for data in crypto_leads.values()]
+
+    async def delete_all_crypto_leads(self) -> None:
+        """Delete all crypto leads in Redis."""
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.delete("crypto_leads")
+            pipe.hincrby(CRYPTO_LEADS_META_KEY, "version", 1)
+            await pipe.execute()
 
     """
     READ & WRITE & UPDATE % DELETE to save the historical PNL
     """
 
+    async def add_new_pnl(self, data: BotHistoricalPNL):
+        """Add a new PNL record to Redis, with its entries in the time indexes (one MULTI/EXEC)."""
+        pnl_key = f"historical_pnl:{data['id']}"
+        score = operation_timestamp(data['operation_datetime'])
+
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hset("historical_pnl", pnl_key, json.dumps(data, default=str))
+            pipe.zadd(PNL_INDEX_KEY, {pnl_key: score})
+            pipe.zadd(pnl_symbol_index_key(data['symbol']), {pnl_key: score})
+            pipe.sadd(PNL_SYMBOLS_KEY, data['symbol'])
+            await pipe.execute()
+
+    async def get_pnl_range(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """PNL records operated within [start_time, end_time] (all of a symbol's when given), oldest first."""
+        index_key = pnl_symbol_index_key(symbol) if symbol else PNL_INDEX_KEY
+        pnl_keys = await self._r.zrangebyscore(
+            index_key,
+            start_time.timestamp() if start_time else "-inf",
+            end_time.timestamp() if end_time else "+inf"
+        )
+        if not pnl_keys:
+            return []
+
+        records = await self._r.hmget("historical_pnl", pnl_keys)
+        return [json.loads(record) for record in records if record is not None]
+
+    async def delete_30_days_pnl(self, days: int = PNL_RETENTION_DAYS) -> int:
+        """Delete PNL records older than 30 days, returns how many were deleted."""
+        cutoff = (datetime.now(pytz.utc) - timedelta(days=days)).timestamp()
+
+        # `(` excludes the cutoff, as the previous `operation_datetime < cutoff_date`
+        async with self._r.pipeline(transaction=False) as pipe:
+            pipe.zrangebyscore(PNL_INDEX_KEY, "-inf", f"({cutoff}")
+            pipe.smembers(PNL_SYMBOLS_KEY)
+            expired, symbols = await pipe.execute()
+
+        if not expired:
+            return 0
+
+        symbols = sorted(symbols)
+        async with self._r.pipeline(transaction=False) as pipe:
+            for symbol in symbols:
+                pipe.zrangebyscore(pnl_symbol_index_key(symbol), "-inf", f"({cutoff}")
+            expired_by_symbol = await pipe.execute()
+
+        # Exactly the records read above, a record added in between keeps its index entries
+        expired_keys = set(expired)
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hdel("historical_pnl", *expired)
+            pipe.zrem(PNL_INDEX_KEY, *expired)
+            for symbol, symbol_expired in zip(symbols, expired_by_symbol):
+                symbol_expired = [pnl_key for pnl_key in symbol_expired if pnl_key in expired_keys]
+                if symbol_expired:
+                    pipe.zrem(pnl_symbol_index_key(symbol), *symbol_expired)
+            await pipe.execute()
+
+        return len(expired)
+
+    async def ensure_pnl_index(self) -> None:
+        """Index the PNL records saved before the time indexes existed (one HGETALL, only when the counts differ)."""
+        async with self._r.pipeline(transaction=False) as pipe:
+            pipe.hlen("historical_pnl")
+            pipe.zcard(PNL_INDEX_KEY)
+            records, indexed = await pipe.execute()
+
+        if records == indexed:
+            return
+
+        print(f"Indexing {records - indexed} PNL records.")
+        all_pnls = await self._r.hgetall("historical_pnl")
+        async with self._r.pipeline(transaction=False) as pipe:
+            for pnl_key, pnl_data in all_pnls.items():
+                pnl_record = json.loads(pnl_data)
+                score = operation_timestamp(pnl_record['operation_datetime'])
+                pipe.zadd(PNL_INDEX_KEY, {pnl_key: score})
+                pipe.zadd(pnl_symbol_index_key(pnl_record['symbol']), {pnl_key: score})
+                pipe.sadd(PNL_SYMBOLS_KEY, pnl_record['symbol'])
+            await pipe.execute()
+
+
+# Event loop thread of every RedisService of the process, and the service they share when
+# created without a client
+_service_loop: Optional[asyncio.AbstractEventLoop] = None
+_default_service: Optional[AsyncRedisService] = None
+_service_lock = threading.Lock()
+
+
+def _get_service_loop() -> asyncio.AbstractEventLoop:
+    global _service_loop
+    with _service_lock:
+        if _service_loop is None:
+            _service_loop = asyncio.new_event_loop()
+            threading.Thread(target=_service_loop.run_forever, name="redis-service", daemon=True).start()
+        return _service_loop
+
+
+class RedisService:
+    """
+    Synchronous API of the AsyncRedisService, for scripts and code that doesn't run on an event
+    loop. Every instance runs its calls on one event loop thread of the process, and the ones
+    created without a client share one AsyncRedisService (and its pool). Don't use it from a
+    coroutine (it would block the loop until Redis answers), await an AsyncRedisService there instead.
+    """
+
+    def __init__(self, client: Optional[aioredis.Redis] = None):
+        global _default_service
+        self._loop = _get_service_loop()
+        self._owns_service = client is not None
+        if self._owns_service:
+            self._service = self._run(self._create(client))
+            return
+
+        with _service_lock:
+            if _default_service is None:
+                _default_service = self._run(self._create(None))
+            self._service = _default_service
+
+    @staticmethod
+    async def _create(client: Optional[aioredis.Redis]) -> AsyncRedisService:
+        # The pool has to be created on the loop that uses it
+        return await AsyncRedisService(client).start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        """Close the client given to this instance, the shared service and loop live as long as the process."""
+        if self._owns_service:
+            self._run(self._service.close())
+
+    def ensure_correct_key_type(self):
+        self._run(self._service.ensure_key_types())
+
+    def save_task(self, task_id: str, task_data: Dict[str, Any]) -> None:
+        self._run(self._service.save_task(task_id, task_data))
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._run(self._service.get_task(task_id))
+
+    def delete_task(self, task_id: str) -> None:
+        self._run(self._service.delete_task(task_id))
+
+    def get_all_tasks(self) -> Dict[str, Any]:
+        return self._run(self._service.get_all_tasks())
+
+    def delete_all(self) -> None:
+        self._run(self._service.delete_all())
+
+    def add_new_crypto_lead(self, symbol: str, fundingRate: Union[float, int]) -> None:
+        self._run(self._service.add_new_crypto_lead(symbol, fundingRate))
+
+    def publish_crypto_leads(self, leads: List[FoundingRate], funding_time: Optional[int] = None) -> int:
+        return self._run(self._service.publish_crypto_leads(leads, funding_time))
+
+    def read_crypto_leads_snapshot(self) -> Dict[str, Any]:
+        return self._run(self._service.read_crypto_leads_snapshot())
+
+    def read_all_crypto_lead(self) -> List[Dict[str, Any]]:
+        return self._run(self._service.read_all_crypto_lead())
+
+    def delete_all_crypto_leads(self) -> None:
+        self._run(self._service.delete_all_crypto_leads())
+
     def add_new_pnl(self, data: BotHistoricalPNL):
-        """Add a new PNL record to Redis."""
-        self.ensure_correct_key_type()
+        self._run(self._service.add_new_pnl(data))
+
+    def get_pnl_range(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._run(self._service.get_pnl_range(start_time, end_time, symbol))
+
+    def delete_30_days_pnl(self, days: int = PNL_RETENTION_DAYS) -> int:
+        return self._run(self._service.delete_30_days_pnl(days))
+
+
+def _legacy_add_pnls(client, records: List[BotHistoricalPNL]):
+    """Previous synchronous RedisService: EXISTS + TYPE before every HSET."""
+    for data in records:
+        if client.exists("tasks") and client.type("tasks") != "hash":
+            client.delete("tasks")
+        client.hset("historical_pnl", f"historical_pnl:{data['id']}", json.dumps(data, default=str))
+
+
+def _legacy_add_crypto_leads(client, leads: List[FoundingRate]):
+    """Previous lead publishing: one add_new_crypto_lead (EXISTS + TYPE + HSET) per symbol."""
+    client.delete("crpto_leads")
+    for lead in leads:
+        if client.exists("tasks") and client.type("tasks") != "hash":
+            client.delete("tasks")
+        client.hset("crpto_leads", f"crypto_leads:{lead['symbol']}", json.dumps({"symbol": lead['symbol'], "fundingRate": lead['fundingRate']}))
+
+
+def _legacy_delete_30_days_pnl(client):
+    """Previous retention: HGETALL, decode every record and one HDEL per expired record."""
+    cutoff_date = datetime.now(pytz.utc) - timedelta(days=30)
+    for pnl_key, pnl_data in client.hgetall("historical_pnl").items():
+        if datetime.fromisoformat(json.loads(pnl_data)['operation_datetime']) < cutoff_date:
+            client.hdel("historical_pnl", pnl_key)
+
+
+def _legacy_pnl_range(client, start_time: datetime, symbol: str) -> list:
+    """A range query without an index: HGETALL and filter."""
+    records = (json.loads(pnl_data) for pnl_data in client.hgetall("historical_pnl").values())
+    return [r for r in records if r['symbol'] == symbol and datetime.fromisoformat(r['operation_datetime']) >= start_time]
+
+
+def _fake_redis_server() -> tuple:
+    """fakeredis TCP server on a free port, so every command is a real round trip. Needs the `fakeredis` package."""
+    import socket
+    from fakeredis import TcpFakeServer
+
+    class NoDelayServer(TcpFakeServer):
+        # Replies of a pipeline are written one by one, without TCP_NODELAY they wait for delayed ACKs
+        def get_request(self):
+            connection, address = super().get_request()
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return connection, address
+
+    server = NoDelayServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, *server.server_address
+
+
+def _sample_pnls(records: int, days: float = 0, symbols: int = 1) -> List[BotHistoricalPNL]:
+    """PnL records spread over the last `days` days."""
+    now = datetime.now(pytz.utc)
+    return [
+        {"id": str(i), "symbol": f"SYM{i % symbols}USDT", "operation_datetime": now - timedelta(days=days * i / records), "pnl": "1.0",
+         "avg_entry_price": "1", "side": "long", "closed_value": "1", "opening_fee": "0", "closing_fee": "0", "net_profits": "1"}
+        for i in range(records)
+    ]
+
+
+async def _loop_stall(work) -> tuple:
+    """Run `work` (a coroutine) next to a 1 ms heartbeat, returns (elapsed ms, longest heartbeat delay ms)."""
+    stalls = []
+
+    async def heartbeat():
+        while True:
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            stalls.append(max(time.perf_counter() - expected, 0))
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.005)
+    started = time.perf_counter()
+    await work
+    elapsed = time.perf_counter() - started
+    # One more beat, to record the delay of a heartbeat blocked until the end of `work`
+    await asyncio.sleep(0.002)
+    beat.cancel()
+    return round(elapsed * 1000, 1), round(max(stalls, default=0) * 1000, 1)
+
+
+def benchmark_redis_service(records: int = 500, concurrency: int = 50) -> dict:
+    """
+    Write `records` PnL records from a coroutine with the previous blocking client and with the
+    AsyncRedisService (`concurrency` writers on the pool), against a fakeredis TCP server so every
+    command is a real round trip. Reports the elapsed time and the longest event loop stall, then
+    times the sync wrapper against the same MULTI/EXEC sent with the blocking client (the legacy
+    writes send fewer commands: no indexes).
+    """
+    import redis
+
+    server, host, port = _fake_redis_server()
+    pnls = _sample_pnls(records)
+
+    async def run_legacy():
+        sync_client = redis.Redis(host=host, port=port, decode_responses=True)
+
+        async def work():
+            _legacy_add_pnls(sync_client, pnls)
+
+        result = await _loop_stall(work())
+        sync_client.flushall()
+        sync_client.close()
+        return result
+
+    async def run_async():
+        service = await AsyncRedisService(create_client(host, port, max_connections=concurrency)).start()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def add(data):
+            async with semaphore:
+                await service.add_new_pnl(data)
+
+        result = await _loop_stall(asyncio.gather(*(add(data) for data in pnls)))
+        await service._r.flushall()
+        await service.close()
+        return result
+
+    results = {"records": records, "concurrency": concurrency}
+    results["legacy_ms"], results["legacy_loop_stall_ms"] = asyncio.run(run_legacy())
+    results["async_ms"], results["async_loop_stall_ms"] = asyncio.run(run_async())
+
+    sync_client = redis.Redis(host=host, port=port, decode_responses=True)
+    started = time.perf_counter()
+    for data in pnls:
         pnl_key = f"historical_pnl:{data['id']}"
-        self._r.hset("historical_pnl", pnl_key, json.dumps(data, default=str))
+        score = operation_timestamp(data['operation_datetime'])
+        with sync_client.pipeline(transaction=True) as pipe:
+            pipe.hset("historical_pnl", pnl_key, json.dumps(data, default=str))
+            pipe.zadd(PNL_INDEX_KEY, {pnl_key: score})
+            pipe.zadd(pnl_symbol_index_key(data['symbol']), {pnl_key: score})
+            pipe.sadd(PNL_SYMBOLS_KEY, data['symbol'])
+            pipe.execute()
+    results["sync_pipeline_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    sync_client.flushall()
+    sync_client.close()
+
+    # Instances after the first one reuse the loop thread
+    wrappers = [RedisService(create_client(host, port)) for _ in range(2)]
+    for wrapper in wrappers:
+        started = time.perf_counter()
+        for data in pnls:
+            wrapper.add_new_pnl(data)
+        results.setdefault("sync_wrapper_ms", []).append(round((time.perf_counter() - started) * 1000, 1))
+        wrapper.close()
 
-    
-    def delete_30_days_pnl(self):
-        """Delete PNL records older than 30 days."""
-        cutoff_date = datetime.now(pytz.utc) - timedelta(days=30)
-        all_pnls = self._r.hgetall("historical_pnl")
+    server.shutdown()
+    server.server_close()
+    return results
 
-        for pnl_key, pnl_data in all_pnls.items():
-            pnl_record = json.loads(pnl_data)
-            operation_datetime = datetime.fromisoformat(pnl_record['operation_datetime'])
-            if operation_datetime < cutoff_date:
-                self._r.hdel("historical_pnl", pnl_key)
+
+def benchmark_pnl_retention(records: int = 10_000, days: int = 33, symbols: int = 50) -> dict:
+    """
+    PnL records spread over `days` days (so ~10% are older than 30 days): the 30 days retention and
+    the last 24h of one symbol, with the previous full hash scans and with the time indexes.
+    """
+    import redis
+
+    server, host, port = _fake_redis_server()
+    sync_client = redis.Redis(host=host, port=port, decode_responses=True)
+    pnls = _sample_pnls(records, days, symbols)
+    since = datetime.now(pytz.utc) - timedelta(days=1)
+    results = {"records": records}
+
+    async def fill():
+        service = await AsyncRedisService(create_client(host, port)).start()
+        semaphore = asyncio.Semaphore(50)
+
+        async def add(data):
+            async with semaphore:
+                await service.add_new_pnl(data)
+
+        await asyncio.gather(*(add(data) for data in pnls))
+        await service.close()
+
+    async def run_indexed():
+        service = await AsyncRedisService(create_client(host, port)).start()
+        started = time.perf_counter()
+        found = await service.get_pnl_range(since, symbol="SYM0USDT")
+        results["indexed_range_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        started = time.perf_counter()
+        results["deleted"] = await service.delete_30_days_pnl()
+        results["indexed_retention_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        await service.close()
+        return len(found)
+
+    asyncio.run(fill())
+    started = time.perf_counter()
+    legacy_found = len(_legacy_pnl_range(sync_client, since, "SYM0USDT"))
+    results["legacy_range_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    started = time.perf_counter()
+    _legacy_delete_30_days_pnl(sync_client)
+    results["legacy_retention_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    sync_client.flushall()
+    asyncio.run(fill())
+    indexed_found = asyncio.run(run_indexed())
+    results["same_range_result"] = legacy_found == indexed_found
+
+    sync_client.close()
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def benchmark_crypto_leads(leads: int = 500) -> dict:
+    """Publish and read `leads` crypto leads with the previous per-symbol calls and with the snapshot API."""
+    import redis
+
+    server, host, port = _fake_redis_server()
+    sync_client = redis.Redis(host=host, port=port, decode_responses=True)
+    lead_list = [{"symbol": f"SYM{i}USDT", "fundingRate": -0.5 - i / 1000} for i in range(leads)]
+    results = {"leads": leads}
+
+    started = time.perf_counter()
+    _legacy_add_crypto_leads(sync_client, lead_list)
+    results["legacy_publish_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    started = time.perf_counter()
+    sync_client.hgetall("crpto_leads")
+    results["legacy_read_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def run_snapshot():
+        service = await AsyncRedisService(create_client(host, port)).start()
+        started = time.perf_counter()
+        results["version"] = await service.publish_crypto_leads(lead_list, funding_time=int(time.time() * 1000))
+        results["snapshot_publish_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        started = time.perf_counter()
+        snapshot = await service.read_crypto_leads_snapshot()
+        results["snapshot_read_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results["snapshot_leads"] = len(snapshot["leads"])
+        await service.close()
+
+    asyncio.run(run_snapshot())
+    sync_client.close()
+    server.shutdown()
+    server.server_close()
+    return results
 
 
-        
 if __name__ == "__main__":
-    redis_service = RedisService()
-
-    # Define a task with a unique ID
-    task_id = "task_1"
-    task_data = {
-        "url": "http://example.com/api/notify",
-        "method": "post",
-        "data": {"message": "Hello World"},
-        "headers": {"Content-Type": "application/json"},
-        "execute_at": "12:00",
-        "timezone": "Europe/Amsterdam"
-    }
-
-    # Save the task to Redis
-    # redis_service.save_task(task_id, task_data)
-    # print(redis_service.read_all_crypto_lead())
-    # print(redis_service.delete_all_crypto_leads())
-
-
-    # FOUNDING RATE 
-    redis_service.swap_new_founding_rate("")
+    try:
+        import fakeredis  # noqa: F401
+    except ImportError:
+        raise SystemExit("The Redis benchmarks run on fakeredis, install it with: pip install -r requirements-dev.txt")
+
+    print(benchmark_redis_service())
+    print(benchmark_pnl_retention())
+    print(benchmark_crypto_leads())
@@ -1,5 +1,21 @@
+#  S2 Data here
+from typing import Iterable
 
+import numpy as np
 
-#  S2 Data here
 
-# Other functions here
\ No newline at end of file
+def latency_summary(samples: Iterable[float]) -> dict:
+    """Summarize a series of latency samples (milliseconds) as count/mean/p50/p95/max."""
+    values = np.fromiter(samples, dtype=np.float64)
+    if values.size == 0:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+# Other functions here
@@ -19,6 +19,92 @@ MAX_FOUNDING_RATE = 1.5 # os.getenv('MAX_FOUNDING_RATE', 1.5)
 LEVERAGE = os.getenv('LEVERAGE', 5)
 AMOUNT_ORDER = 10 # At this version, the amount of money per order is fixed 
 
+# Bitget HTTP connection pool
+BITGET_POOL_LIMIT = int(os.getenv('BITGET_POOL_LIMIT', 100))
+BITGET_POOL_LIMIT_PER_HOST = int(os.getenv('BITGET_POOL_LIMIT_PER_HOST', 20))
+BITGET_KEEPALIVE_TIMEOUT = float(os.getenv('BITGET_KEEPALIVE_TIMEOUT', 75))
+BITGET_DNS_CACHE_TTL = int(os.getenv('BITGET_DNS_CACHE_TTL', 300))
+
+# Orders are pre-armed (payload built, connection opened) this many seconds before sending
+PRE_ARM_SECONDS = float(os.getenv('PRE_ARM_SECONDS', 5))
+
+# Order timer: fine wait window before each deadline (yields on the loop, busy-wait on the thread) and whether to wait on a dedicated thread
+ORDER_TIMER_SPIN_MS = float(os.getenv('ORDER_TIMER_SPIN_MS', 2))
+ORDER_TIMER_THREAD = os.getenv('ORDER_TIMER_THREAD', 'false').lower() == 'true'
+
+# Chart analysis executor: 'process' or 'thread' pool
+ANALYSIS_EXECUTOR_MODE = os.getenv('ANALYSIS_EXECUTOR_MODE', 'process')
+ANALYSIS_EXECUTOR_WORKERS = int(os.getenv('ANALYSIS_EXECUTOR_WORKERS', os.cpu_count() or 2))
+
+# Symbol analyses fan-out: max concurrent analyses and hard deadline (seconds before the funding time)
+ANALYSIS_CONCURRENCY = int(os.getenv('ANALYSIS_CONCURRENCY', 8))
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv('ANALYSIS_DEADLINE_SECONDS', 60))
+
+# Local candle store (one memory mapped candle file and metadata file per symbol and granularity)
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', os.path.join(BASE_DIR, 'data', 'candles'))
+
+# Concurrent candle page downloads and retries of rate limited (429) pages
+CANDLE_PAGE_CONCURRENCY = int(os.getenv('CANDLE_PAGE_CONCURRENCY', 5))
+CANDLE_PAGE_RETRIES = int(os.getenv('CANDLE_PAGE_RETRIES', 3))
+
+# Request rate limits (requests per second) per endpoint family
+BITGET_RATE_LIMITS = {
+    'market': float(os.getenv('BITGET_MARKET_RATE_LIMIT', 20)),
+    'order': float(os.getenv('BITGET_ORDER_RATE_LIMIT', 10)),
+    'coinmarketcap': float(os.getenv('COINMARKETCAP_RATE_LIMIT', 0.5))
+}
+
+# Public WebSocket ticker stream and max age (seconds) of its table before falling back to REST
+BITGET_WS_URL = os.getenv('BITGET_WS_URL', 'wss://ws.bitget.com/v2/ws/public')
+TICKER_STREAM_ENABLED = os.getenv('TICKER_STREAM_ENABLED', 'true').lower() == 'true'
+TICKER_STREAM_MAX_AGE = float(os.getenv('TICKER_STREAM_MAX_AGE', 10))
+
+# Ticker stream: seconds between symbol list refreshes (listings/delistings) and age (seconds) after which a symbol is dropped
+TICKER_STREAM_REFRESH_INTERVAL = float(os.getenv('TICKER_STREAM_REFRESH_INTERVAL', 3600))
+TICKER_STREAM_STALE_AFTER = float(os.getenv('TICKER_STREAM_STALE_AFTER', 300))
+
+# Funding rate screener: min 24h quote volume, min open interest (USDT) and best N symbols per side (unset = all)
+SCREENER_MIN_VOLUME = float(os.getenv('SCREENER_MIN_VOLUME', 0))
+SCREENER_MIN_OPEN_INTEREST = float(os.getenv('SCREENER_MIN_OPEN_INTEREST', 0))
+SCREENER_TOP_N = int(os.getenv('SCREENER_TOP_N')) if os.getenv('SCREENER_TOP_N') else None
+
+# Request coalescing: seconds a result is reused by identical requests
+CANDLES_CACHE_TTL = float(os.getenv('CANDLES_CACHE_TTL', 5))
+FUNDING_HISTORY_CACHE_TTL = float(os.getenv('FUNDING_HISTORY_CACHE_TTL', 30))
+
+# Market caps: seconds served as fresh, seconds a symbol unknown to CoinMarketCap isn't asked for again,
+# background refresh interval and the snapshot loaded on start
+MARKET_CAP_TTL = float(os.getenv('MARKET_CAP_TTL', 4 * 3600))
+MARKET_CAP_NOT_FOUND_TTL = float(os.getenv('MARKET_CAP_NOT_FOUND_TTL', 24 * 3600))
+MARKET_CAP_REFRESH_INTERVAL = float(os.getenv('MARKET_CAP_REFRESH_INTERVAL', 2 * 3600))
+MARKET_CAP_SNAPSHOT_PATH = os.getenv('MARKET_CAP_SNAPSHOT_PATH', os.path.join(BASE_DIR, 'data', 'market_caps.json'))
+
+# Funding rate archive (int64/float32 columns per symbol) and concurrent symbol syncs after each funding time
+FUNDING_ARCHIVE_DIR = os.getenv('FUNDING_ARCHIVE_DIR', os.path.join(BASE_DIR, 'data', 'funding_rates'))
+FUNDING_ARCHIVE_SYNC_CONCURRENCY = int(os.getenv('FUNDING_ARCHIVE_SYNC_CONCURRENCY', 5))
+
+# Redis server and max connections of the shared pool
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6378))
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 20))
+
+# Order timers saved in Redis and recovered on start (overdue closes are sent at once)
+ORDER_JOB_STORE_ENABLED = os.getenv('ORDER_JOB_STORE_ENABLED', 'false').lower() == 'true'
+
+# Retries of a failed close (first delay in seconds, doubled every retry), the job is kept until it is sent
+ORDER_CLOSE_RETRIES = int(os.getenv('ORDER_CLOSE_RETRIES', 3))
+ORDER_CLOSE_RETRY_DELAY = float(os.getenv('ORDER_CLOSE_RETRY_DELAY', 1))
+
+# Leader election: only the replica holding the Redis lease (ms) runs the funding rate engine
+LEADER_ELECTION_ENABLED = os.getenv('LEADER_ELECTION_ENABLED', 'false').lower() == 'true'
+LEADER_LEASE_MS = int(os.getenv('LEADER_LEASE_MS', 10000))
+
+# Funding rate engine: 'embedded' in the API process or 'external' (python -m src.engine), controlled over a Unix socket
+ENGINE_MODE = os.getenv('ENGINE_MODE', 'embedded')
+ENGINE_SOCKET_PATH = os.getenv('ENGINE_SOCKET_PATH', os.path.join(BASE_DIR, 'data', 'engine.sock'))
+ENGINE_CONTROL_TIMEOUT = float(os.getenv('ENGINE_CONTROL_TIMEOUT', 5))
+
 # Database
 DB_NAME = os.getenv('DB_NAME', 'db-name')
 DB_HOST = os.getenv('DB_HOST', '0.0.0.0')
@@ -41,24 +127,29 @@ TELEGRAM_ACCES_TOKEN = os.getenv('TELEGRAM_ACCES_TOKEN', 'your-access-token')
 # SECURITY
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
 
-def load_public_key(path):
+# RSA key pair of the stored credentials, never committed: mount it (e.g. as a secret) and point these paths to it
+RSA_PUBLIC_KEY_PATH = os.getenv('RSA_PUBLIC_KEY_PATH', os.path.join(BASE_DIR, 'security', 'public_key.pem'))
+RSA_PRIVATE_KEY_PATH = os.getenv('RSA_PRIVATE_KEY_PATH', os.path.join(BASE_DIR, 'security', 'private_key.pem'))
+
+def _read_key(path, env_name):
     absolute_path = os.path.join(BASE_DIR, path)
-    with open(absolute_path, 'rb') as public_key_file:
-        public_key = serialization.load_pem_public_key(public_key_file.read())
-    return public_key
+    if not os.path.isfile(absolute_path):
+        raise RuntimeError(f"RSA key not found at {absolute_path}, mount the key pair and set {env_name} to its path")
+    with open(absolute_path, 'rb') as key_file:
+        return key_file.read()
+
+def load_public_key(path):
+    return serialization.load_pem_public_key(_read_key(path, 'RSA_PUBLIC_KEY_PATH'))
 
 def load_private_key(path):
-    absolute_path = os.path.join(BASE_DIR, path)
-    with open(absolute_path, 'rb') as private_key_file:
-        private_key = serialization.load_pem_private_key(
-            private_key_file.read(),
-            password=None  
-        )
-    return private_key
+    return serialization.load_pem_private_key(
+        _read_key(path, 'RSA_PRIVATE_KEY_PATH'),
+        password=None
+    )
 
 
-PUBLIC_KEY = load_public_key('security/public_key.pem')
-PRIVATE_KEY = load_private_key('security/private_key.pem')
+PUBLIC_KEY = load_public_key(RSA_PUBLIC_KEY_PATH)
+PRIVATE_KEY = load_private_key(RSA_PRIVATE_KEY_PATH)
 
 
 # API-KEYS
@@ -0,0 +1,192 @@
+# engine.py
+# Funding rate engine: FoundinRateService and its scheduler, without the HTTP API.
+# Run it embedded in the API (ENGINE_MODE=embedded, the default) or on its own with
+#   python -m src.engine
+# and ENGINE_MODE=external in the API, which then controls it over ENGINE_SOCKET_PATH.
+
+# Standard Library Imports
+import asyncio
+import os
+import signal
+from datetime import timedelta
+from typing import Optional
+
+# Local Imports
+from src.app.founding_rate_service.main_sercice_layer import FoundinRateService
+from src.app.founding_rate_service.schedule_layer import ScheduleLayer
+from src.app.founding_rate_service.bitget_layer import BitgetClient
+from src.app.founding_rate_service.candle_store import CandleStore
+from src.app.founding_rate_service.funding_rate_archive import FundingRateArchive
+from src.app.founding_rate_service.order_job_store import OrderJobStore
+from src.app.redis_service import create_client
+from src.app.leader_election import LeaderElection
+from src.app.engine_control import EngineControl, EngineControlServer
+from src.config import ORDER_JOB_STORE_ENABLED, LEADER_ELECTION_ENABLED
+
+# Initialize Scheduler and Services
+async_scheduler = ScheduleLayer("Europe/Amsterdam")
+bitget_client = BitgetClient(candle_store=CandleStore(), funding_archive=FundingRateArchive())
+founding_rate_service = FoundinRateService(
+    bitget_client=bitget_client,
+    job_store=OrderJobStore(create_client()) if ORDER_JOB_STORE_ENABLED else None
+)
+
+
+async def start_funding_rate_engine(fencing_token: Optional[int] = None):
+    """Recover the order timers and schedule innit_procces. With leader election only the leader runs it."""
+    if founding_rate_service.status == 'running':
+        print("Founding Rate Service is already running.")
+        return
+
+    bitget_client.fencing_token = fencing_token
+    # Orders are only armed while running, see FoundinRateService._may_trade
+    founding_rate_service.status = 'running'
+
+    # Resume the order timers of the previous process (overdue closes are sent now)
+    if founding_rate_service.job_store is not None:
+        recovery = await founding_rate_service.recover_order_jobs()
+        print(f"Order jobs recovered: {recovery}")
+
+    # Initialize and start the Founding Rate Service
+    try:
+        # Calculate next execution time
+        next_execution_time = founding_rate_service.get_next_execution_time() - timedelta(minutes=5)
+        founding_rate_service.next_execution_time = next_execution_time
+        print(f"Scheduling 'innit_procces' at {next_execution_time.isoformat()} in timezone {founding_rate_service.timezone}")
+
+        # Schedule the `innit_procces` method
+        async_scheduler.schedule_process_time(next_execution_time, founding_rate_service.innit_procces)
+
+        print("Founding Rate Service has been started successfully.")
+
+    except Exception as e:
+        print(f"Error starting Founding Rate Service: {e}")
+        # Optionally, handle the exception (e.g., retry, alert, etc.)
+
+
+async def stop_funding_rate_engine():
+    """Leadership lost or engine stopped: stop planning waves and disarm the order timers (their jobs stay stored)."""
+    async_scheduler.scheduler.remove_all_jobs()
+    founding_rate_service.cancel_order_jobs()
+    founding_rate_service.stop_service()
+
+
+# Every replica serves HTTP, only the leader runs the funding rate engine
+leader_election = LeaderElection(create_client(), on_elected=start_funding_rate_engine, on_lost=stop_funding_rate_engine) if LEADER_ELECTION_ENABLED else None
+founding_rate_service.leader_election = leader_election
+
+
+# Control commands, served locally or over the engine socket. Start and stop run one at a time,
+# a stop disarms every order timer before a start recovers them (see recover_order_jobs)
+control_lock = asyncio.Lock()
+
+
+async def engine_status() -> dict:
+    return {
+        "status": founding_rate_service.status,
+        "armed_orders": len(founding_rate_service.order_tasks),
+        "next_execution_time": founding_rate_service.next_execution_time.isoformat() if founding_rate_service.next_execution_time else None,
+        "is_leader": leader_election.is_leader if leader_election else None,
+        "pid": os.getpid()
+    }
+
+
+async def engine_start() -> dict:
+    # With leader election this rejoins the election, the engine starts once this replica is elected
+    async with control_lock:
+        if leader_election is not None:
+            leader_election.start()
+        else:
+            await start_funding_rate_engine()
+    return await engine_status()
+
+
+async def engine_stop() -> dict:
+    # With leader election the lease is released as well, another replica may take over
+    async with control_lock:
+        if leader_election is not None:
+            await leader_election.stop()
+        await stop_funding_rate_engine()
+    return await engine_status()
+
+
+async def engine_metrics() -> dict:
+    return founding_rate_service.metrics()
+
+
+engine_control = EngineControl({
+    "status": engine_status,
+    "start": engine_start,
+    "stop": engine_stop,
+    "metrics": engine_metrics
+})
+
+
+async def open_engine():
+    """Open the clients and background tasks of the engine and start it."""
+    # Open the shared Bitget connection pool
+    await bitget_client.open()
+
+    # Create the chart analysis pool before the first funding window
+    founding_rate_service.analysis_executor.start()
+
+    # Market caps snapshot and background refresh
+    bitget_client.market_cap_cache.start()
+
+    # Keep the funding rates table current over the public WebSocket
+    if founding_rate_service.ticker_stream is not None:
+        founding_rate_service.ticker_stream.start()
+
+    # Start the scheduler
+    async_scheduler.scheduler.start()
+    print("Scheduler started.")
+
+    if leader_election is not None:
+        leader_election.start()
+    else:
+        await start_funding_rate_engine()
+
+
+async def close_engine():
+    # Hand the engine over to another replica right away
+    if leader_election is not None:
+        await leader_election.stop()
+
+    # Shutdown the scheduler
+    async_scheduler.scheduler.shutdown()
+    print("Scheduler shut down.")
+
+    # Stop the order timer thread (if any)
+    founding_rate_service.order_timer.stop()
+    founding_rate_service.analysis_executor.shutdown()
+    if founding_rate_service.ticker_stream is not None:
+        await founding_rate_service.ticker_stream.stop()
+
+    await bitget_client.market_cap_cache.stop()
+    if founding_rate_service.job_store is not None:
+        await founding_rate_service.job_store.close()
+
+    # Close the shared Bitget connection pool
+    await bitget_client.close()
+    print("Bitget connection pool closed.")
+
+
+async def main():
+    """Run the engine until SIGINT/SIGTERM, controlled over the engine socket."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    control_server = EngineControlServer(engine_control)
+    await open_engine()
+    await control_server.start()
+    try:
+        await stop.wait()
+    finally:
+        await control_server.close()
+        await close_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,7 +5,6 @@
 
 # Standard Library Imports
 from contextlib import asynccontextmanager
-from datetime import timedelta
 
 # Third-Party Imports
 from fastapi import FastAPI, APIRouter
@@ -13,55 +12,43 @@ from fastapi.middleware.cors import CORSMiddleware
 from pytz import timezone
 
 # Local Imports
-from src.app.founding_rate_service.main_sercice_layer import FoundinRateService
-from src.app.founding_rate_service.schedule_layer import ScheduleLayer
 from src.app.founding_rate_service.bitget_layer import BitgetClient
+from src.app.founding_rate_service.funding_rate_archive import FundingRateArchive
+from src.app.engine_control import EngineControlClient
 from src.routes.user import user_router as user
 from src.routes.auth import oauth_router as oauth
 from src.routes.administrative import administrative_router as administrative
 from src.routes.accounts import accounts_router as accounts
 from src.routes.trading_bots import trading_bots_router as trading_bots
-from src.config import DOMAIN
-
-# Initialize Scheduler and Services
-async_scheduler = ScheduleLayer("Europe/Amsterdam")
-founding_rate_service = FoundinRateService()
-bitget_client = BitgetClient()
-background_task = None
+from src.routes.funding_rates import funding_rates_router as funding_rates
+from src.config import DOMAIN, ENGINE_MODE
 
 # Lifespan Context Manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start the scheduler
-    async_scheduler.scheduler.start()
-    print("Scheduler started.")
-
-    # Initialize and start the Founding Rate Service
-    if founding_rate_service.status != 'running':
+    if ENGINE_MODE == 'external':
+        # The engine runs in its own process (python -m src.engine), timers don't share this event loop.
+        # Only for the archive routes, reading the files the engine writes
+        app.state.bitget_client = BitgetClient(funding_archive=FundingRateArchive())
+        app.state.engine_control = EngineControlClient()
         try:
-            # Calculate next execution time
-            next_execution_time = founding_rate_service.get_next_execution_time() - timedelta(minutes=5)
-            founding_rate_service.next_execution_time = next_execution_time
-            print(f"Scheduling 'innit_procces' at {next_execution_time.isoformat()} in timezone {founding_rate_service.timezone}")
-
-            # Schedule the `innit_procces` method
-            async_scheduler.schedule_process_time(next_execution_time, founding_rate_service.innit_procces)
-
-            # Update the service status
-            founding_rate_service.status = 'running'
+            yield
+        finally:
+            await app.state.engine_control.close()
+        return
 
-            print("Founding Rate Service has been started successfully.")
+    # Imported here, building the engine services is only needed when it runs in this process
+    from src import engine
 
-        except Exception as e:
-            print(f"Error starting Founding Rate Service: {e}")
-            # Optionally, handle the exception (e.g., retry, alert, etc.)
+    await engine.open_engine()
+    app.state.bitget_client = engine.bitget_client
+    app.state.founding_rate_service = engine.founding_rate_service
+    app.state.engine_control = engine.engine_control
 
     try:
         yield
     finally:
-        # Shutdown the scheduler
-        async_scheduler.scheduler.shutdown()
-        print("Scheduler shut down.")
+        await engine.close_engine()
 
 # Initialize FastAPI App
 app = FastAPI(
@@ -116,6 +103,7 @@ app.include_router(user)
 app.include_router(accounts)
 app.include_router(administrative)
 app.include_router(trading_bots)
+app.include_router(funding_rates)
 
 app.add_middleware(
     CORSMiddleware,
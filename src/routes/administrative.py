@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import Annotated
 from fastapi import Depends
 
 from src.app.security import get_current_credentials
 from src.app.database import crud
+from src.app.engine_control import EngineUnavailable
 
 administrative_router = APIRouter(
     prefix="/administrative",
@@ -24,11 +25,46 @@ async def get_joined_uers(user_credentials: Annotated[tuple[dict, str], Depends(
     users = await crud.get_joined_users(limit)
     return users
 
-@administrative_router.delete("/funding-rate/stop", description="Stop funding rate bot", tags=["Administrative"])
-async def stop_funding_rate_bot():
-    """Stop the funding rate bot."""
+async def require_staff(user_id: str):
+    """Raise 401 unless the user is an admin or a mod."""
+    user = await crud.get_user_profile(user_id=user_id)
+
+    if not user["role"] == "admin" and not user["role"] == "mod":
+        raise HTTPException(status_code=401, detail="You don't have enought permissions to do this")
+
+async def call_engine(request: Request, command: str) -> dict:
+    """Send a command to the funding rate engine, in this process or over the engine socket."""
+    try:
+        return await request.app.state.engine_control.call(command)
+    except EngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@administrative_router.get("/funding-rate/status", description="Get the status of the funding rate bot", tags=["Administrative"])
+async def get_funding_rate_status(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request):
+    _, user_id = user_credentials
+    await require_staff(user_id)
 
-    return {"status": "Service stopped"}
+    return await call_engine(request, "status")
 
+@administrative_router.get("/funding-rate/metrics", description="Get runtime metrics of the funding rate bot (connection pool, timings)", tags=["Administrative"])
+async def get_funding_rate_metrics(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request):
+    _, user_id = user_credentials
+    await require_staff(user_id)
+
+    return await call_engine(request, "metrics")
+
+@administrative_router.post("/funding-rate/start", description="Start the funding rate bot", tags=["Administrative"])
+async def start_funding_rate_bot(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request):
+    """Start the funding rate bot (with leader election: rejoin the election)."""
+    _, user_id = user_credentials
+    await require_staff(user_id)
 
+    return await call_engine(request, "start")
+
+@administrative_router.delete("/funding-rate/stop", description="Stop funding rate bot", tags=["Administrative"])
+async def stop_funding_rate_bot(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request):
+    """Stop the funding rate bot."""
+    _, user_id = user_credentials
+    await require_staff(user_id)
 
+    return await call_engine(request, "stop")
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Annotated, Literal, Optional
+from fastapi import Depends
+
+from src.app.security import get_current_credentials
+
+funding_rates_router = APIRouter(
+    prefix="/funding-rates",
+    tags=["Funding Rates"]
+)
+
+
+@funding_rates_router.get("/archive", description="### Get the symbols with an archived funding rate history", tags=["Funding Rates"])
+async def get_archived_symbols(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request):
+    archive = request.app.state.bitget_client.funding_archive
+    if archive is None:
+        raise HTTPException(status_code=404, detail="The funding rate archive is not enabled")
+
+    return archive.symbols()
+
+
+@funding_rates_router.get("/archive/{symbol}", description="### Get the archived funding rate history of a symbol\n\nServed from the local archive, without calling Bitget.\n\n **Query:**\n\n - **start_time / end_time**: epoch ms range (inclusive)\n\n - **format**: `json` (columns `funding_time` in epoch ms and `funding_rate` in %) or `binary` (little endian int64 funding times followed by float32 funding rates, row count in `X-Rows`)", tags=["Funding Rates"])
+async def get_archived_funding_rates(user_credentials: Annotated[tuple[dict, str], Depends(get_current_credentials)], request: Request, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None, format: Literal['json', 'binary'] = 'json'):
+    archive = request.app.state.bitget_client.funding_archive
+    if archive is None:
+        raise HTTPException(status_code=404, detail="The funding rate archive is not enabled")
+
+    times, rates = archive.query(symbol.upper(), start_time, end_time)
+
+    if format == 'binary':
+        return Response(
+            content=times.astype('<i8').tobytes() + rates.astype('<f4').tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Rows": str(len(times))}
+        )
+
+    return {
+        "symbol": symbol.upper(),
+        "funding_time": times.tolist(),
+        "funding_rate": [round(rate, 6) for rate in rates.tolist()]
+    }